@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of the GCRA RateLimiter as the number of distinct client IPs
+grows, next to the previous list-of-timestamps approach.
+
+    cd backend && python benchmarks/bench_rate_limiter.py
+"""
+
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rate_limiter import RateLimiter, RateLimitPolicy
+
+DISTINCT_IPS = [1000, 10000, 100000]
+REQUESTS = 300000
+LIMIT_PER_MINUTE = 100
+
+def legacy_check(attempt_timestamps, ip_address: str) -> bool:
+    """The list-based check this replaced (without the security event write)."""
+    now = datetime.now()
+    minute_ago = now - timedelta(minutes=1)
+    attempt_timestamps[ip_address] = [ts for ts in attempt_timestamps[ip_address] if ts > minute_ago]
+    if len(attempt_timestamps[ip_address]) >= LIMIT_PER_MINUTE:
+        return False
+    attempt_timestamps[ip_address].append(now)
+    return True
+
+def run_legacy(ips):
+    attempt_timestamps = defaultdict(list)
+    start = time.perf_counter()
+    for ip in ips:
+        legacy_check(attempt_timestamps, ip)
+    elapsed = time.perf_counter() - start
+    stored = sum(len(v) for v in attempt_timestamps.values())
+    return elapsed / len(ips) * 1e9, stored
+
+def run_gcra(ips):
+    limiter = RateLimiter(max_keys=100000)
+    policy = RateLimitPolicy("default", LIMIT_PER_MINUTE)
+    start = time.perf_counter()
+    for ip in ips:
+        limiter.hit(f"default:{ip}", policy)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(ips) * 1e9, len(limiter._tat)
+
+def main():
+    random.seed(1)
+    print(f"{'distinct IPs':>12} {'legacy ns':>10} {'legacy state':>13} {'gcra ns':>9} {'gcra keys':>10}")
+    for distinct in DISTINCT_IPS:
+        pool = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(distinct)]
+        # A few hot clients plus a long tail of scanners
+        ips = [pool[0] if random.random() < 0.3 else random.choice(pool) for _ in range(REQUESTS)]
+
+        legacy_ns, legacy_state = run_legacy(ips)
+        gcra_ns, gcra_keys = run_gcra(ips)
+        print(f"{distinct:>12} {legacy_ns:>10.0f} {legacy_state:>13} {gcra_ns:>9.0f} {gcra_keys:>10}")
+
+if __name__ == "__main__":
+    main()
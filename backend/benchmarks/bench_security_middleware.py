@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Compare per-request overhead of the pure ASGI SecurityMiddleware against the
+previous BaseHTTPMiddleware implementation. Rate limiting and audit hand-off
+are replaced with no-ops so only the middleware mechanics are measured.
+
+    cd backend && python benchmarks/bench_security_middleware.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from middleware.security_middleware import SecurityMiddleware, SECURITY_HEADERS
+from services.security_service import security_service
+
+REQUESTS = 20000
+
+async def allow(*args, **kwargs):
+    return True
+
+security_service.check_rate_limit = allow
+security_service.enqueue_audit_event = lambda **kwargs: None
+
+class LegacySecurityMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware version this replaced, minus rate limiting and auditing."""
+
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        client_ip = request.headers.get("x-forwarded-for") or (request.client.host if request.client else "unknown")
+        user_agent = request.headers.get("user-agent", "")
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        user_id = getattr(request.state, 'user_id', None)
+        security_headers = dict(SECURITY_HEADERS)
+        for header_name, header_value in security_headers.items():
+            response.headers[header_name] = header_value
+        return response
+
+async def homepage(request):
+    return PlainTextResponse("ok")
+
+def build_app(middleware_class):
+    app = Starlette(routes=[Route("/api/courses", homepage)])
+    return middleware_class(app)
+
+async def run(app) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/courses",
+        "raw_path": b"/api/courses",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"user-agent", b"bench")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 8001),
+    }
+
+    def make_receive():
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Client stays connected until the response is done
+            await asyncio.Event().wait()
+
+        return receive
+
+    async def send(message):
+        pass
+
+    # Warm up
+    for _ in range(500):
+        await app(dict(scope), make_receive(), send)
+
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await app(dict(scope), make_receive(), send)
+    return (time.perf_counter() - start) / REQUESTS * 1e6
+
+async def main():
+    baseline = await run(Starlette(routes=[Route("/api/courses", homepage)]))
+    legacy = await run(build_app(LegacySecurityMiddleware))
+    asgi = await run(build_app(SecurityMiddleware))
+
+    print(f"{'variant':<22} {'us/request':>12} {'overhead us':>12}")
+    print(f"{'no middleware':<22} {baseline:>12.1f} {0.0:>12.1f}")
+    print(f"{'BaseHTTPMiddleware':<22} {legacy:>12.1f} {legacy - baseline:>12.1f}")
+    print(f"{'pure ASGI':<22} {asgi:>12.1f} {asgi - baseline:>12.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark ChatService.get_user_chats latency against room count.
+Needs a reachable MongoDB (MONGO_URL); seeds a throwaway database and drops it afterwards.
+
+    cd backend && python benchmarks/bench_user_chats.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DB_NAME"] = f"bench_user_chats_{uuid.uuid4().hex[:8]}"
+
+from database.connection import connect_to_mongo, close_mongo_connection, get_database
+from database.indexes import ensure_indexes
+from services.chat_service import chat_service
+
+ROOM_COUNTS = [10, 100, 1000]
+MESSAGES_PER_ROOM = 20
+RUNS = 20
+
+async def seed(user_id: str, room_count: int):
+    db = get_database()
+    now = datetime.now()
+    rooms = []
+    messages = []
+    for i in range(room_count):
+        chat_id = str(uuid.uuid4())
+        last_message = None
+        for j in range(MESSAGES_PER_ROOM):
+            message_id = str(uuid.uuid4())
+            last_message = {
+                "_id": message_id,
+                "message_id": message_id,
+                "chat_id": chat_id,
+                "sender_id": user_id,
+                "sender_name": "Bench User",
+                "content": f"message {j}",
+                "message_type": "text",
+                "status": "sent",
+                "created_at": now - timedelta(minutes=i, seconds=MESSAGES_PER_ROOM - j),
+                "deleted_at": None
+            }
+            messages.append(last_message)
+        rooms.append({
+            "_id": chat_id,
+            "chat_id": chat_id,
+            "chat_type": "group",
+            "participants": [user_id, str(uuid.uuid4())],
+            "created_by": user_id,
+            "created_at": now,
+            "updated_at": now - timedelta(minutes=i),
+            "last_message": {k: v for k, v in last_message.items() if k != "_id"},
+            "is_active": True
+        })
+    await db.chat_rooms.insert_many(rooms)
+    await db.chat_messages.insert_many(messages)
+
+async def main():
+    await connect_to_mongo()
+    db = get_database()
+    await ensure_indexes(db)
+
+    try:
+        print(f"{'rooms':>8} {'mean ms':>10} {'p95 ms':>10}")
+        for room_count in ROOM_COUNTS:
+            user_id = str(uuid.uuid4())
+            await seed(user_id, room_count)
+
+            timings = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                chats = await chat_service.get_user_chats(user_id)
+                timings.append((time.perf_counter() - start) * 1000)
+            assert len(chats) == room_count
+
+            timings.sort()
+            mean = sum(timings) / len(timings)
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{room_count:>8} {mean:>10.2f} {p95:>10.2f}")
+    finally:
+        await db.client.drop_database(db.name)
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
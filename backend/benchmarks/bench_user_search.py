@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark UserService.search_users (search_keys index) against the previous
+four-way case-insensitive $regex scan, at up to 1M users.
+Needs a reachable MongoDB (MONGO_URL); seeds a throwaway database and drops it afterwards.
+
+    cd backend && python benchmarks/bench_user_search.py
+    BENCH_USERS=100000 python benchmarks/bench_user_search.py   # quicker run
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DB_NAME"] = f"bench_user_search_{uuid.uuid4().hex[:8]}"
+
+from database.connection import connect_to_mongo, close_mongo_connection, get_database
+from database.indexes import ensure_indexes
+from services.people_search import search_index_fields
+from services.user_service import user_service
+
+USERS = int(os.environ.get("BENCH_USERS", "1000000"))
+BATCH = 10000
+RUNS = 20
+QUERIES = ["smi", "jane smith", "acme", "engineer", "zz-no-match"]
+
+FIRST = ["jane", "john", "maria", "wei", "amara", "lucas", "sofia", "omar", "yuki", "ivan"]
+LAST = ["smith", "garcia", "chen", "okafor", "muller", "rossi", "silva", "khan", "tanaka", "novak"]
+COMPANIES = ["acme", "globex", "initech", "umbrella", "hooli", "stark", "wayne", "tyrell"]
+TITLES = ["engineer", "designer", "analyst", "manager", "consultant", "researcher"]
+
+def legacy_filter(query: str):
+    """The regex filter search_users used before search keys."""
+    return {
+        "$or": [
+            {"full_name": {"$regex": query, "$options": "i"}},
+            {"email": {"$regex": query, "$options": "i"}},
+            {"company": {"$regex": query, "$options": "i"}},
+            {"job_title": {"$regex": query, "$options": "i"}}
+        ]
+    }
+
+async def seed():
+    db = get_database()
+    rng = random.Random(1)
+    now = datetime.now()
+    for start in range(0, USERS, BATCH):
+        docs = []
+        for i in range(start, min(start + BATCH, USERS)):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            doc = {
+                "_id": f"user-{i}",
+                "user_id": f"user-{i}",
+                "email": f"{first}.{last}{i}@example.com",
+                "full_name": f"{first.title()} {last.title()}",
+                "company": rng.choice(COMPANIES),
+                "job_title": rng.choice(TITLES),
+                "role": "learner",
+                "stats": {},
+                "is_active": True,
+                "created_at": now
+            }
+            doc.update(search_index_fields(doc))
+            docs.append(doc)
+        await db.users.insert_many(docs, ordered=False)
+
+async def time_it(coro_factory):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await coro_factory()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return sum(timings) / len(timings), timings[int(len(timings) * 0.95) - 1]
+
+async def main():
+    await connect_to_mongo()
+    db = get_database()
+    await ensure_indexes(db)
+
+    try:
+        seed_start = time.perf_counter()
+        await seed()
+        print(f"seeded {USERS} users in {time.perf_counter() - seed_start:.1f}s")
+
+        print(f"{'query':>14} {'keys mean ms':>13} {'keys p95 ms':>12} {'regex mean ms':>14} {'regex p95 ms':>13}")
+        for query in QUERIES:
+            keys_mean, keys_p95 = await time_it(lambda: user_service.search_users(query, 0, 20))
+            regex_mean, regex_p95 = await time_it(
+                lambda: db.users.find(legacy_filter(query)).limit(20).to_list(20)
+            )
+            print(f"{query:>14} {keys_mean:>13.2f} {keys_p95:>12.2f} {regex_mean:>14.2f} {regex_p95:>13.2f}")
+    finally:
+        await db.client.drop_database(db.name)
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,25 +1,212 @@
+import asyncio
+import importlib.util
 import os
+import threading
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+from pymongo import monitoring
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+from typing import Any, Dict, Iterable, Optional
+
+# Wire compressors in preference order, with the module each one needs
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters fed by pymongo's pool events.
+
+    Events arrive from driver threads, so counters are updated under a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(self.open - 1, 0)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    # Remaining pool events carry nothing we count
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def stats(self, max_pool_size: int) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_pool_size": max_pool_size,
+                "open_connections": self.open,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilization": round(self.in_use / max_pool_size, 3) if max_pool_size else None,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pools_cleared": self.pools_cleared
+            }
+
+pool_stats = PoolStats()
+
+def _compressors() -> list:
+    """Configured compressors that are actually importable here."""
+    configured = os.environ.get("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+    available = []
+    for name in (part.strip() for part in configured.split(",")):
+        if name not in COMPRESSOR_MODULES:
+            continue
+        module = COMPRESSOR_MODULES[name]
+        if module is None or importlib.util.find_spec(module) is not None:
+            available.append(name)
+    return available
+
+def client_options() -> Dict[str, Any]:
+    """Motor client options from the environment."""
+    options = {
+        "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000")),
+        "waitQueueTimeoutMS": int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "event_listeners": [pool_stats],
+    }
+    compressors = _compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
 
 class MongoDB:
     client: Optional[AsyncIOMotorClient] = None
     database = None
+    options: Dict[str, Any] = {}
 
 mongodb = MongoDB()
 
+class CollectionRegistry:
+    """Collection handles shared by all services, resolved on first use.
+
+    Services read `db_collections.users` (or `db_collections["users"]`)
+    at call time instead of holding handles from import time, so importing
+    a service never touches the database and a reconnect never leaves a
+    stale handle behind.
+    """
+
+    def __init__(self):
+        self._handles: Dict[str, object] = {}
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str):
+        handle = self._handles.get(name)
+        if handle is None:
+            if mongodb.database is None:
+                raise RuntimeError(f"Collection '{name}' used before connect_to_mongo()")
+            handle = mongodb.database[name]
+            self._handles[name] = handle
+        return handle
+
+    def analytics(self, name: str):
+        """Handle for reporting reads, using MONGO_ANALYTICS_READ_PREFERENCE.
+
+        Defaults to secondaryPreferred so dashboards and rollup reads can be
+        served by replicas; on a standalone server this is the primary.
+        """
+        key = f"analytics:{name}"
+        handle = self._handles.get(key)
+        if handle is None:
+            mode = os.environ.get("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred")
+            read_preference = make_read_preference(read_pref_mode_from_name(mode), None)
+            handle = self[name].with_options(read_preference=read_preference)
+            self._handles[key] = handle
+        return handle
+
+    def reset(self):
+        """Drop cached handles, e.g. after the connection changes."""
+        self._handles.clear()
+
+    def warm_up(self, names: Iterable[str]):
+        """Resolve handles up front so the first requests don't pay for it."""
+        for name in names:
+            self[name]
+
+db_collections = CollectionRegistry()
+
+async def ping_with_retries(attempts: int, delay: float):
+    """Ping the server, backing off between attempts; raises after the last one."""
+    for attempt in range(1, attempts + 1):
+        try:
+            await mongodb.database.command("ping")
+            return
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            print(f"MongoDB ping failed (attempt {attempt}/{attempts}), retrying in {delay:.1f}s: {e}")
+            await asyncio.sleep(delay)
+            delay *= 2
+
 async def connect_to_mongo():
-    """Create database connection."""
-    mongodb.client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    """Create database connection and wait until the server answers."""
+    mongodb.options = client_options()
+    mongodb.client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"), **mongodb.options)
     mongodb.database = mongodb.client[os.environ.get("DB_NAME", "prolawh_db")]
+    db_collections.reset()
+    await ping_with_retries(
+        attempts=int(os.environ.get("MONGO_CONNECT_RETRIES", "5")),
+        delay=float(os.environ.get("MONGO_CONNECT_RETRY_DELAY_SECONDS", "1.0"))
+    )
     print("Connected to MongoDB")
 
 async def close_mongo_connection():
     """Close database connection."""
     if mongodb.client:
         mongodb.client.close()
+        db_collections.reset()
         print("Disconnected from MongoDB")
 
 def get_database():
     """Get database instance."""
-    return mongodb.database
\ No newline at end of file
+    return mongodb.database
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Get connection pool counters and the client settings in effect."""
+    stats = pool_stats.stats(mongodb.options.get("maxPoolSize", 0))
+    stats["compressors"] = mongodb.options.get("compressors", "")
+    stats["wait_queue_timeout_ms"] = mongodb.options.get("waitQueueTimeoutMS")
+    return stats
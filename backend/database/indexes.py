@@ -0,0 +1,201 @@
+import os
+from typing import Dict, List
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+# Indexes backing the queries issued by the services: {collection: [IndexModel]}
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("last_active", DESCENDING)], name="last_active"),
+        # _id second so each search tier is read in a stable order without a sort stage
+        IndexModel([("search_keys", ASCENDING), ("_id", ASCENDING)], name="search_keys_id"),
+        IndexModel([("search_exact", ASCENDING), ("_id", ASCENDING)], name="search_exact_id"),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_id"),
+    ],
+    "chat_rooms": [
+        IndexModel(
+            [("participants", ASCENDING), ("is_active", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+            name="participants_active_updated"
+        ),
+    ],
+    "chat_messages": [
+        IndexModel([("chat_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="chat_created_id"),
+    ],
+    "user_presence": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("is_online", ASCENDING), ("last_seen", DESCENDING)], name="online_last_seen"),
+    ],
+    "chat_notifications": [
+        IndexModel(
+            [("user_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)],
+            name="user_unread_created"
+        ),
+    ],
+    "courses": [
+        IndexModel([("status", ASCENDING), ("enrollment_count", DESCENDING)], name="status_enrollments"),
+        IndexModel(
+            [("status", ASCENDING), ("category", ASCENDING), ("enrollment_count", DESCENDING)],
+            name="status_category_enrollments"
+        ),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="status_created_id"),
+        # Catalog search; searches always filter on status, so it leads the key
+        IndexModel(
+            [("status", ASCENDING), ("title", TEXT), ("tags", TEXT), ("category", TEXT), ("description", TEXT)],
+            name="status_course_text",
+            weights={"title": 10, "tags": 6, "category": 4, "description": 1},
+            default_language="english"
+        ),
+    ],
+    "course_progress": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # Trending window scan for the popularity leaderboard
+        IndexModel([("enrollment_date", DESCENDING)], name="enrollment_date"),
+    ],
+    "mentors": [
+        IndexModel([("is_accepting_mentees", ASCENDING), ("specialties", ASCENDING)], name="accepting_specialties"),
+        IndexModel([("is_accepting_mentees", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="accepting_created_id"),
+    ],
+    "mentorship_connections": [
+        IndexModel([("mentor_id", ASCENDING), ("status", ASCENDING), ("requested_at", DESCENDING)], name="mentor_status_requested"),
+        IndexModel([("mentee_id", ASCENDING), ("status", ASCENDING), ("requested_at", DESCENDING)], name="mentee_status_requested"),
+    ],
+    "mentorship_sessions": [
+        IndexModel(
+            [("mentor_id", ASCENDING), ("status", ASCENDING), ("scheduled_at", ASCENDING)],
+            name="mentor_status_scheduled"
+        ),
+        IndexModel(
+            [("mentee_id", ASCENDING), ("status", ASCENDING), ("scheduled_at", ASCENDING)],
+            name="mentee_status_scheduled"
+        ),
+    ],
+    "user_roles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "audit_logs": [
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+    ],
+    "security_events": [
+        IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+        IndexModel([("severity", ASCENDING), ("timestamp", DESCENDING)], name="severity_timestamp"),
+    ],
+    "login_attempts": [
+        IndexModel([("success", ASCENDING), ("timestamp", DESCENDING)], name="success_timestamp"),
+    ],
+}
+
+# Options that change what an index does; the rest of index_information() is bookkeeping
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+def _normalize_key(key: List) -> List:
+    """Key pattern as the server reports it: text fields fold into _fts/_ftsx."""
+    normalized = []
+    for field, direction in key:
+        if direction == TEXT:
+            if ("_fts", TEXT) not in normalized:
+                normalized += [("_fts", TEXT), ("_ftsx", 1)]
+        elif field != "_ftsx":
+            normalized.append((field, int(direction) if isinstance(direction, (int, float)) else direction))
+    return normalized
+
+def index_definition(spec: Dict) -> Dict:
+    """What an index does, from an IndexModel document or an index_information() entry."""
+    raw_key = list(spec["key"].items()) if hasattr(spec["key"], "items") else list(spec["key"])
+    definition = {"key": _normalize_key(raw_key)}
+    for option in COMPARED_OPTIONS:
+        if spec.get(option) not in (None, False):
+            definition[option] = spec[option]
+
+    if ("_fts", TEXT) in definition["key"]:
+        # The server stores a weight for every text field, 1 unless given
+        weights = {field: 1 for field, direction in raw_key if direction == TEXT and field != "_fts"}
+        weights.update(spec.get("weights") or {})
+        definition["weights"] = {field: int(weight) for field, weight in weights.items()}
+        definition["default_language"] = spec.get("default_language", "english")
+    return definition
+
+async def ensure_indexes(db, dry_run: bool = False, rebuild_drifted: bool = False) -> Dict[str, Dict[str, List[str]]]:
+    """Bring each collection's indexes in line with the registry.
+
+    Safe to run on every startup. Indexes are matched by name and then by
+    key and options. Missing indexes are created. Those whose definition has
+    drifted are only reported, unless rebuild_drifted is set: then they are
+    dropped and rebuilt, which leaves a window without the index (and
+    without its uniqueness guarantee). Rebuilding is therefore an explicit
+    admin action on one instance, never part of startup. Indexes the
+    registry does not know about are only reported. With dry_run the
+    database is only inspected and the report lists what would change.
+    """
+    report = {}
+
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        registered = {index.document["name"] for index in indexes}
+
+        collection_report = {
+            "existing": [],
+            "drifted": [],
+            "created": [],
+            "pending": [],
+            "failed": [],
+            "unregistered": sorted(name for name in existing if name != "_id_" and name not in registered)
+        }
+
+        to_create = []
+        for index in indexes:
+            name = index.document["name"]
+            if name not in existing:
+                to_create.append(index)
+            elif index_definition(existing[name]) != index_definition(index.document):
+                collection_report["drifted"].append(name)
+                if rebuild_drifted:
+                    to_create.append(index)
+            else:
+                collection_report["existing"].append(name)
+
+        if dry_run:
+            collection_report["pending"] = [index.document["name"] for index in to_create]
+            report[collection_name] = collection_report
+            continue
+
+        for index in to_create:
+            name = index.document["name"]
+            try:
+                if name in collection_report["drifted"]:
+                    print(f"Rebuilding index {collection_name}.{name}: definition changed")
+                    await collection.drop_index(name)
+                await collection.create_indexes([index])
+                collection_report["created"].append(name)
+            except OperationFailure as e:
+                # Typically an equivalent index under another name, or
+                # duplicate values blocking a unique index
+                print(f"Index {collection_name}.{name} not created: {e}")
+                collection_report["failed"].append(name)
+
+        report[collection_name] = collection_report
+
+    return report
+
+async def bootstrap_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    """Apply the index registry according to INDEX_BOOTSTRAP_MODE (apply, dry_run or off).
+
+    Only missing indexes are created; drifted ones are reported for an
+    admin to rebuild (POST /api/admin/indexes/rebuild).
+    """
+    mode = os.environ.get("INDEX_BOOTSTRAP_MODE", "apply").lower()
+    if mode == "off":
+        return {}
+
+    report = await ensure_indexes(db, dry_run=(mode == "dry_run"))
+
+    totals = {
+        field: sum(len(r[field]) for r in report.values())
+        for field in ("created", "drifted", "pending", "failed", "unregistered")
+    }
+    print(f"Index bootstrap ({mode}): " + ", ".join(f"{count} {field}" for field, count in totals.items()))
+    if totals["drifted"]:
+        drifted = [f"{name}.{index}" for name, r in report.items() for index in r["drifted"]]
+        print(f"Indexes with changed definitions, not rebuilt: {', '.join(drifted)}")
+    return report
@@ -1,71 +1,115 @@
 import time
-import json
 from typing import Optional
-from fastapi import Request, Response, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Request
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from services.security_service import security_service
 from models.security import ActionType, Severity
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Content-Security-Policy": "default-src 'self'",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Permissions-Policy": "camera=(), microphone=(), geolocation=()"
+}
+
+# Raw ASGI header pairs, built once instead of per response
+SECURITY_HEADER_PAIRS = [
+    (name.lower().encode("latin-1"), value.encode("latin-1"))
+    for name, value in SECURITY_HEADERS.items()
+]
+SECURITY_HEADER_NAMES = frozenset(name for name, _ in SECURITY_HEADER_PAIRS)
+
+# Don't log every successful call to avoid spam (only important endpoints)
+IMPORTANT_ENDPOINTS = ('/api/auth/', '/api/users/', '/api/admin/')
+
+class SecurityMiddleware:
+    """Rate limiting, audit hand-off and security headers as plain ASGI middleware.
+
+    Works on the raw scope and send channel, so responses stream through
+    untouched and no extra task is spawned per request. WebSocket and
+    lifespan traffic passes straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
         start_time = time.time()
-        
+
         # Get client info
-        client_ip = self.get_client_ip(request)
-        user_agent = request.headers.get("user-agent", "")
-        method = request.method
-        endpoint = str(request.url.path)
-        
+        client_ip, user_agent = self.get_client_info(scope)
+        method = scope["method"]
+        endpoint = scope["path"]
+        status_code = 500
+
+        async def send_with_headers(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [
+                    header for header in message.get("headers", ())
+                    if header[0] not in SECURITY_HEADER_NAMES
+                ]
+                headers.extend(SECURITY_HEADER_PAIRS)
+                message["headers"] = headers
+            await send(message)
+
         # Rate limiting check
-        if not await security_service.check_rate_limit(client_ip):
-            return JSONResponse(
+        if not await security_service.check_rate_limit(client_ip, endpoint):
+            response = JSONResponse(
                 status_code=429,
                 content={"detail": "Rate limit exceeded"}
             )
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Calculate processing time
-        process_time = time.time() - start_time
-        
-        # Get user ID if authenticated
-        user_id = getattr(request.state, 'user_id', None)
-        
-        # Log API call
-        await self.log_api_call(
-            user_id=user_id,
-            method=method,
-            endpoint=endpoint,
-            status_code=response.status_code,
-            ip_address=client_ip,
-            user_agent=user_agent,
-            process_time=process_time
-        )
-        
-        # Add security headers
-        self.add_security_headers(response)
-        
-        return response
-
-    def get_client_ip(self, request: Request) -> str:
-        """Get client IP address handling proxies."""
+            await response(scope, receive, send_with_headers)
+            return
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            # Get user ID if authenticated
+            user_id = scope.get("state", {}).get("user_id")
+
+            self.log_api_call(
+                user_id=user_id,
+                method=method,
+                endpoint=endpoint,
+                status_code=status_code,
+                ip_address=client_ip,
+                user_agent=user_agent,
+                process_time=time.time() - start_time
+            )
+
+    def get_client_info(self, scope: Scope):
+        """Get client IP address (handling proxies) and user agent from raw headers."""
+        forwarded_for = None
+        real_ip = None
+        user_agent = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                forwarded_for = value
+            elif name == b"x-real-ip":
+                real_ip = value
+            elif name == b"user-agent":
+                user_agent = value.decode("latin-1")
+
         # Check for common proxy headers
-        forwarded_for = request.headers.get("x-forwarded-for")
         if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("x-real-ip")
+            return forwarded_for.decode("latin-1").split(",")[0].strip(), user_agent
         if real_ip:
-            return real_ip
-        
-        return request.client.host if request.client else "unknown"
+            return real_ip.decode("latin-1"), user_agent
 
-    async def log_api_call(
+        client = scope.get("client")
+        return (client[0] if client else "unknown"), user_agent
+
+    def log_api_call(
         self,
         user_id: Optional[str],
         method: str,
@@ -76,6 +120,9 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         process_time: float
     ):
         """Log API call for audit purposes."""
+        if status_code < 400 and not endpoint.startswith(IMPORTANT_ENDPOINTS):
+            return
+
         # Determine severity based on status code
         if status_code >= 500:
             severity = Severity.HIGH
@@ -83,49 +130,29 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             severity = Severity.MEDIUM
         else:
             severity = Severity.LOW
-        
-        # Don't log every successful call to avoid spam (only important endpoints)
-        important_endpoints = ['/api/auth/', '/api/users/', '/api/admin/']
-        
-        if (status_code >= 400 or 
-            any(endpoint.startswith(important) for important in important_endpoints)):
-            
-            await security_service.log_audit_event(
-                user_id=user_id,
-                action=ActionType.API_CALL,
-                resource="api",
-                endpoint=endpoint,
-                method=method,
-                status_code=status_code,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                severity=severity,
-                details={
-                    "process_time": process_time,
-                    "response_code": status_code
-                }
-            )
 
-    def add_security_headers(self, response: Response):
-        """Add security headers to response."""
-        security_headers = {
-            "X-Content-Type-Options": "nosniff",
-            "X-Frame-Options": "DENY",
-            "X-XSS-Protection": "1; mode=block",
-            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
-            "Content-Security-Policy": "default-src 'self'",
-            "Referrer-Policy": "strict-origin-when-cross-origin",
-            "Permissions-Policy": "camera=(), microphone=(), geolocation=()"
-        }
-        
-        for header_name, header_value in security_headers.items():
-            response.headers[header_name] = header_value
+        # Buffered and written in batches off the response path
+        security_service.enqueue_audit_event(
+            user_id=user_id,
+            action=ActionType.API_CALL,
+            resource="api",
+            endpoint=endpoint,
+            method=method,
+            status_code=status_code,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            severity=severity,
+            details={
+                "process_time": process_time,
+                "response_code": status_code
+            }
+        )
 
 class AuthMiddleware:
     """Middleware to inject user information into request state."""
-    
+
     @staticmethod
     async def add_user_to_state(request: Request, user_id: str, user_email: str):
         """Add user information to request state for logging."""
         request.state.user_id = user_id
-        request.state.user_email = user_email
\ No newline at end of file
+        request.state.user_email = user_email
@@ -78,6 +78,9 @@ class ChatCreate(BaseModel):
     chat_type: ChatType
     participants: List[str]
 
+class ChatParticipantsAdd(BaseModel):
+    user_ids: List[str]
+
 class TypingIndicator(BaseModel):
     chat_id: str
     user_id: str
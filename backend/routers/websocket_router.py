@@ -19,7 +19,7 @@ async def get_user_from_token(token: str):
             return None
         
         user_service = get_user_service()
-        user = await user_service.get_user(user_id)
+        user = await user_service.get_cached_user(user_id)
         return user
     except JWTError:
         return None
@@ -44,7 +44,7 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
             message_data = json.loads(data)
             
             # Handle message
-            await manager.handle_message(websocket, user.user_id, user.full_name, message_data)
+            await manager.handle_message(connection_id, user.user_id, user.full_name, message_data)
             
     except WebSocketDisconnect:
         await manager.disconnect(connection_id)
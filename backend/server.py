@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
@@ -11,12 +11,22 @@ from datetime import datetime
 # Import models and services (lazy loading)
 from models.user import UserCreate, UserLogin, UserResponse, UserUpdate
 from models.course import CourseCreate, CourseResponse, CourseProgress
-from models.mentorship import MentorshipRequest, SessionBooking, MentorResponse
+from models.mentorship import MentorshipRequest, SessionBooking, MentorResponse, MentorshipStatus
 from models.opportunity import JobCreate, JobResponse, ApplicationCreate
-from models.chat import ChatCreate, MessageCreate, ChatRoom, ChatMessage
-from database.connection import connect_to_mongo, close_mongo_connection
+from models.chat import ChatCreate, ChatParticipantsAdd, MessageCreate, ChatRoom, ChatMessage
+from database.connection import connect_to_mongo, close_mongo_connection, get_database, get_pool_stats, db_collections
+from database.indexes import INDEX_REGISTRY, bootstrap_indexes, ensure_indexes
 from routers.websocket_router import websocket_router
+from websocket_manager import manager
 from middleware.security_middleware import SecurityMiddleware
+from services.password_hasher import password_hasher, PasswordHasherBusy
+from services.audit_sink import audit_sink
+from services.leaderboard_service import popularity_leaderboard
+from services.rollup_service import rollup_service
+from services.learning_stats_service import learning_stats_service
+from services.concurrency import Branch, gather_branches
+from services.pagination import paginate_items
+from services.security_service import security_service
 
 # JWT settings
 SECRET_KEY = "prolawh-secret-key-2025"
@@ -29,8 +39,21 @@ security = HTTPBearer()
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    db_collections.warm_up(INDEX_REGISTRY)
+    await bootstrap_indexes(get_database())
+    await security_service.initialize_default_roles()
+    await manager.start()
+    await audit_sink.start()
+    await rollup_service.start()
+    await learning_stats_service.ensure_backfilled()
+    await popularity_leaderboard.start()
     yield
     # Shutdown
+    await manager.shutdown()
+    await audit_sink.stop()
+    await rollup_service.stop()
+    await popularity_leaderboard.stop()
+    password_hasher.shutdown()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -47,6 +70,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Security middleware
@@ -68,7 +92,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = await user_service.get_user(user_id)
+    user = await user_service.get_cached_user(user_id)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
@@ -105,16 +129,18 @@ async def register(user_data: UserCreate):
     
     try:
         user = await user_service.create_user(user_data)
-        
+
         # Create JWT token
         token_data = {"sub": user.user_id}
         token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
-        
+
         return {
             "access_token": token,
             "token_type": "bearer",
             "user": user.dict()
         }
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -123,7 +149,10 @@ async def login(login_data: UserLogin):
     """Authenticate user and return token."""
     from services.user_service import user_service
     
-    user = await user_service.authenticate_user(login_data)
+    try:
+        user = await user_service.authenticate_user(login_data)
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -149,13 +178,24 @@ async def get_current_user_profile(current_user: UserResponse = Depends(get_curr
 
 @app.get("/api/users", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     skip: int = 0, 
     limit: int = 50,
+    cursor: Optional[str] = None,
     current_user: UserResponse = Depends(get_current_user)
 ):
-    """Get all users."""
+    """Get all users.
+
+    The next page's cursor is returned in the X-Next-Cursor header.
+    """
     from services.user_service import user_service
-    return await user_service.get_all_users(skip, limit)
+    try:
+        users, next_cursor = await user_service.get_users_page(limit, cursor, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
 
 @app.get("/api/users/search", response_model=List[UserResponse])
 async def search_users(
@@ -192,22 +232,37 @@ async def update_profile(
 # ==================== COURSE ENDPOINTS ====================
 
 @app.get("/api/courses", response_model=List[CourseResponse])
-async def get_courses(skip: int = 0, limit: int = 20):
-    """Get all published courses."""
+async def get_courses(response: Response, skip: int = 0, limit: int = 20, cursor: Optional[str] = None):
+    """Get all published courses.
+
+    The next page's cursor is returned in the X-Next-Cursor header.
+    """
     from services.course_service import course_service
-    return await course_service.get_all_courses(skip, limit)
+    try:
+        courses, next_cursor = await course_service.get_courses_page(limit, cursor, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return courses
 
 @app.get("/api/courses/search", response_model=List[CourseResponse])
-async def search_courses(q: str, category: Optional[str] = None):
-    """Search courses."""
+async def search_courses(q: str, category: Optional[str] = None, skip: int = 0, limit: int = 20):
+    """Search courses, ranked by relevance."""
     from services.course_service import course_service
-    return await course_service.search_courses(q, category)
+    return await course_service.search_courses(q, category, skip, limit)
 
 @app.get("/api/courses/popular", response_model=List[CourseResponse])
-async def get_popular_courses(limit: int = 10):
-    """Get popular courses."""
+async def get_popular_courses(limit: int = 10, category: Optional[str] = None):
+    """Get the most enrolled courses, optionally within a category."""
+    from services.course_service import course_service
+    return await course_service.get_popular_courses(limit, category)
+
+@app.get("/api/courses/trending", response_model=List[CourseResponse])
+async def get_trending_courses(limit: int = 10):
+    """Get the courses with the most recent enrollments."""
     from services.course_service import course_service
-    return await course_service.get_popular_courses(limit)
+    return await course_service.get_trending_courses(limit)
 
 @app.get("/api/courses/{course_id}", response_model=CourseResponse)
 async def get_course(course_id: str):
@@ -253,13 +308,24 @@ async def get_my_courses(current_user: UserResponse = Depends(get_current_user))
 
 @app.get("/api/mentors", response_model=List[MentorResponse])
 async def get_mentors(
+    response: Response,
     specialties: Optional[List[str]] = None,
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None
 ):
-    """Get available mentors."""
+    """Get available mentors.
+
+    The next page's cursor is returned in the X-Next-Cursor header.
+    """
     from services.mentorship_service import mentorship_service
-    return await mentorship_service.get_all_mentors(specialties, skip, limit)
+    try:
+        mentors, next_cursor = await mentorship_service.get_mentors_page(specialties, limit, cursor, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return mentors
 
 @app.post("/api/mentorship/request")
 async def request_mentorship(
@@ -272,10 +338,18 @@ async def request_mentorship(
     return {"message": "Mentorship request sent", "connection": connection.dict()}
 
 @app.get("/api/my/mentorships")
-async def get_my_mentorships(current_user: UserResponse = Depends(get_current_user)):
+async def get_my_mentorships(
+    mentorship_status: Optional[MentorshipStatus] = Query(None, alias="status"),
+    skip: int = 0,
+    limit: Optional[int] = None,
+    counts_only: bool = False,
+    current_user: UserResponse = Depends(get_current_user)
+):
     """Get user's mentorship connections."""
     from services.mentorship_service import mentorship_service
-    return await mentorship_service.get_user_mentorships(current_user.user_id)
+    return await mentorship_service.get_user_mentorships(
+        current_user.user_id, status=mentorship_status, skip=skip, limit=limit, counts_only=counts_only
+    )
 
 @app.get("/api/my/sessions")
 async def get_my_sessions(current_user: UserResponse = Depends(get_current_user)):
@@ -301,12 +375,17 @@ async def book_session(
 
 @app.get("/api/opportunities")
 async def get_opportunities(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
     job_type: Optional[str] = None,
-    location: Optional[str] = None
+    location: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
-    """Get job opportunities."""
+    """Get job opportunities, newest first.
+
+    The next page's cursor is returned in the X-Next-Cursor header.
+    """
     # Mock data for now - would connect to real job database
     opportunities = [
         {
@@ -346,7 +425,17 @@ async def get_opportunities(
             "application_count": 31
         }
     ]
-    return opportunities[skip:skip+limit]
+    if not cursor:
+        opportunities = sorted(opportunities, key=lambda job: (job["posted_date"], job["job_id"]), reverse=True)[skip:]
+    try:
+        page, next_cursor = paginate_items(
+            opportunities, "posted_date", -1, limit, cursor, tiebreaker_field="job_id", sort_type=str
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 @app.get("/api/opportunities/{job_id}")
 async def get_opportunity(job_id: str):
@@ -390,24 +479,28 @@ async def get_dashboard_stats(current_user: UserResponse = Depends(get_current_u
     from services.course_service import course_service
     from services.mentorship_service import mentorship_service
     
-    # Get user courses
-    user_courses = await course_service.get_user_courses(current_user.user_id)
+    # Courses and mentorship data are independent, fetch them concurrently
+    results, degraded = await gather_branches(
+        Branch("courses", course_service.get_user_courses(current_user.user_id), fallback=[]),
+        Branch("mentorships", mentorship_service.get_user_mentorships(current_user.user_id, counts_only=True), fallback={"counts": {}}),
+        Branch("sessions", mentorship_service.get_upcoming_sessions(current_user.user_id), fallback=[])
+    )
+    user_courses = results["courses"]
     completed_courses = len([c for c in user_courses if c.get('is_completed', False)])
     
-    # Get mentorship data
-    mentorships = await mentorship_service.get_user_mentorships(current_user.user_id)
-    upcoming_sessions = await mentorship_service.get_upcoming_sessions(current_user.user_id)
-    
-    return {
+    stats = {
         "courses_completed": completed_courses,
         "courses_in_progress": len(user_courses) - completed_courses,
         "skills_verified": current_user.stats.skills_verified,
         "network_connections": current_user.stats.network_connections,
         "learning_streak": current_user.stats.learning_streak,
-        "mentorship_connections": len(mentorships.get('as_mentee', [])),
-        "upcoming_sessions": len(upcoming_sessions),
+        "mentorship_connections": results["mentorships"]["counts"].get("as_mentee", 0),
+        "upcoming_sessions": len(results["sessions"]),
         "total_learning_hours": current_user.stats.total_learning_hours
     }
+    if degraded:
+        stats["degraded"] = degraded
+    return stats
 
 @app.get("/api/dashboard/recommendations")
 async def get_recommendations(current_user: UserResponse = Depends(get_current_user)):
@@ -415,16 +508,21 @@ async def get_recommendations(current_user: UserResponse = Depends(get_current_u
     from services.ai_service import ai_service
     
     # Get AI recommendations
-    course_recommendations = await ai_service.generate_course_recommendations(current_user)
-    mentor_recommendations = await ai_service.generate_mentor_recommendations(current_user)
-    job_recommendations = await ai_service.generate_job_recommendations(current_user)
+    results, degraded = await gather_branches(
+        Branch("courses", ai_service.generate_course_recommendations(current_user), fallback=[]),
+        Branch("mentors", ai_service.generate_mentor_recommendations(current_user), fallback=[]),
+        Branch("opportunities", ai_service.generate_job_recommendations(current_user), fallback=[])
+    )
     
-    return {
-        "courses": course_recommendations,
-        "mentors": mentor_recommendations,
-        "opportunities": job_recommendations,
+    recommendations = {
+        "courses": results["courses"],
+        "mentors": results["mentors"],
+        "opportunities": results["opportunities"],
         "generated_at": datetime.now().isoformat()
     }
+    if degraded:
+        recommendations["degraded"] = degraded
+    return recommendations
 
 @app.get("/api/ai/skill-path")
 async def get_skill_development_path(
@@ -442,13 +540,18 @@ async def get_learning_analytics(current_user: UserResponse = Depends(get_curren
     from services.ai_service import ai_service
     from services.analytics_service import analytics_service
     
-    learning_patterns = await ai_service.analyze_learning_patterns(current_user)
-    user_analytics = await analytics_service.get_user_learning_analytics(current_user.user_id)
+    results, degraded = await gather_branches(
+        Branch("patterns", ai_service.analyze_learning_patterns(current_user), fallback={}),
+        Branch("analytics", analytics_service.get_user_learning_analytics(current_user.user_id), fallback={})
+    )
     
-    return {
-        "patterns": learning_patterns,
-        "analytics": user_analytics
+    learning = {
+        "patterns": results["patterns"],
+        "analytics": results["analytics"]
     }
+    if degraded:
+        learning["degraded"] = degraded
+    return learning
 
 @app.get("/api/analytics/progress-report")
 async def get_progress_report(
@@ -463,10 +566,24 @@ async def get_progress_report(
 # ==================== REAL-TIME CHAT ENDPOINTS ====================
 
 @app.get("/api/chats")
-async def get_my_chats(current_user: UserResponse = Depends(get_current_user)):
-    """Get user's chat rooms."""
+async def get_my_chats(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Get user's chat rooms.
+
+    Pass limit to page through rooms; the next page's cursor is returned in
+    the X-Next-Cursor header.
+    """
     from services.chat_service import chat_service
-    chats = await chat_service.get_user_chats(current_user.user_id)
+    try:
+        chats, next_cursor = await chat_service.get_user_chats_page(current_user.user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return [chat.dict() for chat in chats]
 
 @app.post("/api/chats")
@@ -477,18 +594,57 @@ async def create_chat(
     """Create a new chat room."""
     from services.chat_service import chat_service
     chat_room = await chat_service.create_chat_room(current_user.user_id, chat_data)
+    await manager.publish_room_membership(chat_room.chat_id, chat_room.participants)
     return {"message": "Chat created", "chat": chat_room.dict()}
 
+@app.post("/api/chats/{chat_id}/participants")
+async def add_chat_participants(
+    chat_id: str,
+    participants_data: ChatParticipantsAdd,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Add users to a chat room you belong to."""
+    from services.chat_service import chat_service
+    participants = await chat_service.add_participants(chat_id, current_user.user_id, participants_data.user_ids)
+    if participants is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    await manager.publish_room_membership(chat_id, participants)
+    return {"message": "Participants added", "participants": participants}
+
+@app.delete("/api/chats/{chat_id}/participants/{user_id}")
+async def remove_chat_participant(
+    chat_id: str,
+    user_id: str,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Leave a chat room, or remove someone from a room you created."""
+    from services.chat_service import chat_service
+    participants = await chat_service.remove_participant(chat_id, current_user.user_id, user_id)
+    if participants is None:
+        raise HTTPException(status_code=404, detail="Chat or participant not found")
+    await manager.publish_room_membership(chat_id, participants)
+    return {"message": "Participant removed", "participants": participants}
+
 @app.get("/api/chats/{chat_id}/messages")
 async def get_chat_messages(
     chat_id: str,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     current_user: UserResponse = Depends(get_current_user)
 ):
-    """Get messages from a chat room."""
+    """Get messages from a chat room.
+
+    The cursor for older messages is returned in the X-Next-Cursor header.
+    """
     from services.chat_service import chat_service
-    messages = await chat_service.get_chat_messages(chat_id, skip, limit)
+    try:
+        messages, next_cursor = await chat_service.get_chat_messages_page(chat_id, limit, cursor, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return [message.dict() for message in messages]
 
 @app.post("/api/chats/{chat_id}/messages")
@@ -532,12 +688,75 @@ async def get_admin_user(current_user: UserResponse = Depends(get_current_user))
     return current_user
 
 @app.get("/api/admin/stats")
-async def get_admin_stats(admin_user: UserResponse = Depends(get_admin_user)):
+async def get_admin_stats(days: int = 30, admin_user: UserResponse = Depends(get_admin_user)):
     """Get admin dashboard statistics."""
     from services.analytics_service import analytics_service
-    platform_stats = await analytics_service.get_platform_statistics()
+    days = max(1, min(days, 366))
+    platform_stats = await analytics_service.get_platform_statistics(days)
     return platform_stats
 
+@app.post("/api/admin/users/search-keys/backfill")
+async def backfill_user_search_keys(admin_user: UserResponse = Depends(get_admin_user)):
+    """Build people-search keys for users that predate them."""
+    from services.user_service import user_service
+    updated = await user_service.backfill_search_keys()
+    return {"message": "Search keys built", "updated": updated}
+
+@app.post("/api/admin/courses/enrollment-counts/backfill")
+async def backfill_course_enrollment_counts(admin_user: UserResponse = Depends(get_admin_user)):
+    """Recount course enrollment_count from enrollments and rebuild the leaderboard."""
+    from services.course_service import course_service
+    updated = await course_service.backfill_enrollment_counts()
+    return {"message": "Enrollment counts rebuilt", "updated": updated}
+
+@app.post("/api/admin/users/learning-stats/backfill")
+async def backfill_user_learning_stats(admin_user: UserResponse = Depends(get_admin_user)):
+    """Rebuild every user's learning aggregates from course_progress."""
+    updated = await learning_stats_service.backfill()
+    return {"message": "Learning stats rebuilt", "updated": updated}
+
+@app.post("/api/admin/stats/backfill")
+async def backfill_admin_stats(admin_user: UserResponse = Depends(get_admin_user)):
+    """Rebuild the daily statistics rollups from the source collections."""
+    totals = await rollup_service.backfill()
+    return {"message": "Rollups rebuilt", "totals": totals}
+
+@app.get("/api/admin/metrics")
+async def get_runtime_metrics(admin_user: UserResponse = Depends(get_admin_user)):
+    """Get in-process cache and runtime metrics."""
+    from services.user_service import user_cache
+    from services.course_service import catalog_cache
+    from services.contact_graph import contact_graph
+    from services.security_service import security_service
+    return {
+        "user_cache": user_cache.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "contact_graph": contact_graph.stats(),
+        "websockets": manager.stats(),
+        "audit_sink": audit_sink.stats(),
+        "counter_store": security_service.counter_store.stats(),
+        "permission_cache": security_service.permission_cache.stats(),
+        "role_permissions": len(security_service.role_permissions),
+        "rollups": rollup_service.stats(),
+        "leaderboard": popularity_leaderboard.stats(),
+        "mongo_pool": get_pool_stats()
+    }
+
+@app.get("/api/admin/indexes")
+async def get_index_report(admin_user: UserResponse = Depends(get_admin_user)):
+    """Report missing, drifted and unregistered indexes (dry run)."""
+    return await ensure_indexes(get_database(), dry_run=True)
+
+@app.post("/api/admin/indexes/rebuild")
+async def rebuild_drifted_indexes(admin_user: UserResponse = Depends(get_admin_user)):
+    """Create missing indexes and drop and rebuild drifted ones.
+
+    Run from one instance at a quiet time: a rebuilt index, including its
+    uniqueness guarantee, is absent until it finishes building.
+    """
+    return await ensure_indexes(get_database(), rebuild_drifted=True)
+
 @app.get("/api/admin/security")
 async def get_security_summary(admin_user: UserResponse = Depends(get_admin_user)):
     """Get security summary for admin."""
@@ -573,7 +792,10 @@ async def assign_user_role(
     if not role_id:
         raise HTTPException(status_code=400, detail="Role ID required")
     
-    await security_service.assign_role_to_user(user_id, role_id, admin_user.user_id)
+    try:
+        await security_service.assign_role_to_user(user_id, role_id, admin_user.user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     return {"message": "Role assigned successfully"}
 
 @app.get("/api/admin/users/{user_id}/permissions")
@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 import numpy as np
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 from models.user import UserResponse
-from database.connection import get_database
+from database.connection import db_collections
 
 class AdvancedAICareerService:
     """
@@ -20,13 +20,12 @@ class AdvancedAICareerService:
         
     def _get_collections(self):
         """Get AI-specific database collections."""
-        db = get_database()
         return (
-            db.career_trajectories,
-            db.skill_analyses, 
-            db.network_graphs,
-            db.market_trends,
-            db.behavioral_patterns
+            db_collections.career_trajectories,
+            db_collections.skill_analyses, 
+            db_collections.network_graphs,
+            db_collections.market_trends,
+            db_collections.behavioral_patterns
         )
 
     async def initialize_llm(self, api_key: str, provider: str = "openai", model: str = "gpt-4o"):
@@ -4,7 +4,7 @@ from typing import List, Dict, Optional
 from datetime import datetime
 from models.user import UserResponse, UserSkill
 from models.course import CourseResponse
-from database.connection import get_database
+from database.connection import db_collections
 
 # Set OpenAI API key (in production, use environment variable)
 # For demo purposes, we'll use mock responses
@@ -17,8 +17,7 @@ class AIRecommendationService:
 
     def _get_collections(self):
         """Get database collections."""
-        db = get_database()
-        return db.courses, db.users, db.mentors, db.opportunities
+        return db_collections.courses, db_collections.users, db_collections.mentors, db_collections.opportunities
 
     async def generate_course_recommendations(self, user: UserResponse) -> List[Dict]:
         """Generate AI-powered course recommendations for a user."""
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from models.security import AuditLog
+from database.connection import db_collections
+
+class AuditSink:
+    """Write-behind buffer for audit events.
+
+    submit() only appends to a bounded ring buffer; a background task turns
+    the buffered events into AuditLog documents and writes them with
+    insert_many once batch_size events are waiting or flush_interval
+    seconds have passed. When the buffer is full the oldest event is
+    dropped and counted.
+    """
+
+    def __init__(self, max_buffer: int = 10000, batch_size: int = 200, flush_interval: float = 1.0):
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def submit(self, event: Dict[str, Any]):
+        """Queue an audit event (AuditLog fields) without touching the database.
+
+        The event is timestamped now unless it carries a timestamp, so the
+        stored time is when it happened, not when it was flushed.
+        """
+        if len(self._buffer) >= self.max_buffer:
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append({"timestamp": datetime.now(), **event})
+        self.submitted += 1
+
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self):
+        """Start the background flusher."""
+        if self._flush_task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered."""
+        if self._flush_task is not None:
+            # Signal rather than cancel: wait_for can swallow a cancellation
+            # that races with the wakeup event
+            self._stopping = True
+            self._wakeup.set()
+            await self._flush_task
+            self._flush_task = None
+            self._wakeup = None
+        while self._buffer:
+            if not await self.flush():
+                break
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._buffer:
+                if not await self.flush() or len(self._buffer) < self.batch_size:
+                    break
+
+    async def flush(self) -> bool:
+        """Write up to one batch; returns False if the write failed."""
+        if not self._buffer:
+            return True
+
+        batch: List[Dict[str, Any]] = []
+        while self._buffer and len(batch) < self.batch_size:
+            batch.append(self._buffer.popleft())
+
+        docs = []
+        for event in batch:
+            log_id = str(uuid.uuid4())
+            try:
+                audit_doc = AuditLog(log_id=log_id, **event).dict()
+            except Exception as e:
+                print(f"Invalid audit event skipped: {e}")
+                self.failed += 1
+                continue
+            audit_doc["_id"] = log_id
+            docs.append(audit_doc)
+
+        if not docs:
+            return True
+
+        try:
+            await db_collections.audit_logs.insert_many(docs, ordered=False)
+        except Exception as e:
+            print(f"Audit flush failed, {len(docs)} events lost: {e}")
+            self.failed += len(docs)
+            return False
+
+        self.written += len(docs)
+        self.flushes += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get buffer counters."""
+        return {
+            "buffered": len(self._buffer),
+            "max_buffer": self.max_buffer,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes
+        }
+
+audit_sink = AuditSink(
+    max_buffer=int(os.environ.get("AUDIT_BUFFER_SIZE", "10000")),
+    batch_size=int(os.environ.get("AUDIT_BATCH_SIZE", "200")),
+    flush_interval=float(os.environ.get("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+)
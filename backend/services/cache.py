@@ -0,0 +1,206 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class TTLCache:
+    """In-process LRU cache whose entries expire after a fixed TTL."""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # {key: (expires_at, value)} ordered from least to most recently used
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry."""
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry."""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+class SWRCache:
+    """In-process LRU cache for async loaders with stale-while-revalidate.
+
+    An entry is served as-is for `ttl_seconds`. For a further
+    `stale_seconds` it is still served, but the first read also starts one
+    background reload. Concurrent misses on the same key share a single
+    loader call. Keys are tuples whose first item is a namespace, so
+    related entries can be invalidated together.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl_seconds: float = 30.0, stale_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        # {key: (fresh_until, stale_until, value)} ordered from least to most recently used
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Loads in progress: {key: task}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        # Bumped by every invalidation so loads that started earlier are not stored
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `key`, calling `loader()` to fill or refresh it."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            fresh_until, stale_until, value = entry
+            now = time.monotonic()
+            if now < fresh_until:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if now < stale_until:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_load(key, loader)
+                return value
+            del self._entries[key]
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start_load(key, loader)
+        else:
+            self.coalesced += 1
+        # Shielded so one cancelled request does not cancel the load for the others
+        return await asyncio.shield(task)
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        # Taken now: the task may not run before a later invalidation
+        task = asyncio.ensure_future(self._load(key, loader, self._generation))
+        self._inflight[key] = task
+
+        def _done(finished: asyncio.Task):
+            if self._inflight.get(key) is finished:
+                del self._inflight[key]
+            if not finished.cancelled():
+                # Background refreshes have no awaiter; mark the error as seen
+                finished.exception()
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], generation: int) -> Any:
+        try:
+            value = await loader()
+        except Exception as e:
+            self.load_errors += 1
+            print(f"Cache load failed for {key!r}: {e}")
+            raise
+
+        self.loads += 1
+        if generation == self._generation:
+            now = time.monotonic()
+            self._entries[key] = (now + self.ttl_seconds, now + self.ttl_seconds + self.stale_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry; the next read loads it again."""
+        self._generation += 1
+        self._inflight.pop(key, None)
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_namespace(self, namespace: str):
+        """Drop every entry whose key starts with `namespace`."""
+        self._generation += 1
+        for key in [key for key in self._inflight if key[0] == namespace]:
+            del self._inflight[key]
+        for key in [key for key in self._entries if key[0] == namespace]:
+            del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry."""
+        self._generation += 1
+        self._inflight.clear()
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
@@ -1,11 +1,15 @@
 import uuid
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from typing import Iterable, List, Optional, Dict, Set, Tuple
+from pymongo import ReturnDocument
 from models.chat import (
     ChatRoom, ChatMessage, UserPresence, ChatNotification,
     MessageCreate, ChatCreate, MessageType, ChatType, MessageStatus
 )
-from database.connection import get_database
+from database.connection import db_collections
+from services.pagination import keyset_filter, next_page_cursor
+from services.contact_graph import contact_graph
+from services.rollup_service import rollup_service
 
 class ChatService:
     def __init__(self):
@@ -13,12 +17,11 @@ class ChatService:
 
     def _get_collections(self):
         """Get chat collections from database."""
-        db = get_database()
         return (
-            db.chat_rooms,
-            db.chat_messages, 
-            db.user_presence,
-            db.chat_notifications
+            db_collections.chat_rooms,
+            db_collections.chat_messages, 
+            db_collections.user_presence,
+            db_collections.chat_notifications
         )
 
     async def create_chat_room(self, creator_id: str, chat_data: ChatCreate) -> ChatRoom:
@@ -40,33 +43,112 @@ class ChatService:
         chat_doc["_id"] = chat_id
         
         await rooms_collection.insert_one(chat_doc)
+        contact_graph.sync_room(chat_id, participants)
         return chat_room
 
+    async def add_participants(self, chat_id: str, actor_id: str, user_ids: List[str]) -> Optional[List[str]]:
+        """Add users to a chat room the actor belongs to.
+
+        Returns the room's participants afterwards, or None if the room does
+        not exist or the actor is not in it.
+        """
+        rooms_collection, _, _, _ = self._get_collections()
+        
+        room_doc = await rooms_collection.find_one_and_update(
+            {"_id": chat_id, "participants": actor_id},
+            {
+                "$addToSet": {"participants": {"$each": user_ids}},
+                "$set": {"updated_at": datetime.now()}
+            },
+            projection={"participants": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if room_doc is None:
+            return None
+        
+        participants = room_doc.get("participants", [])
+        contact_graph.sync_room(chat_id, participants)
+        return participants
+
+    async def remove_participant(self, chat_id: str, actor_id: str, user_id: str) -> Optional[List[str]]:
+        """Remove a user from a chat room; anyone may leave, only the creator removes others.
+
+        Returns the room's participants afterwards, or None if nothing matched.
+        """
+        rooms_collection, _, _, _ = self._get_collections()
+        
+        filter_query = {"_id": chat_id, "participants": user_id}
+        if actor_id != user_id:
+            filter_query["created_by"] = actor_id
+        
+        room_doc = await rooms_collection.find_one_and_update(
+            filter_query,
+            {
+                "$pull": {"participants": user_id},
+                "$set": {"updated_at": datetime.now()}
+            },
+            projection={"participants": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if room_doc is None:
+            return None
+        
+        participants = room_doc.get("participants", [])
+        contact_graph.sync_room(chat_id, participants)
+        return participants
+
+    async def ensure_contacts_loaded(self, user_id: str):
+        """Load a user's room memberships into the contact graph once."""
+        if user_id in contact_graph.loaded_users:
+            return
+        
+        rooms_collection, _, _, _ = self._get_collections()
+        
+        cursor = rooms_collection.find(
+            {"participants": user_id, "is_active": True},
+            {"participants": 1}
+        )
+        async for room_doc in cursor:
+            contact_graph.add_room(room_doc["_id"], room_doc.get("participants", []))
+        
+        contact_graph.loaded_users.add(user_id)
+
     async def get_user_chats(self, user_id: str) -> List[ChatRoom]:
         """Get all chat rooms for a user."""
-        rooms_collection, messages_collection, _, _ = self._get_collections()
+        chats, _ = await self.get_user_chats_page(user_id)
+        return chats
+
+    async def get_user_chats_page(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[ChatRoom], Optional[str]]:
+        """Get a page of a user's chat rooms, most recently updated first.
+
+        The last message comes from the copy send_message keeps on the room
+        document, so this is a single query regardless of room count.
+        Returns the rooms and the cursor for the next page (None when done).
+        """
+        rooms_collection, _, _, _ = self._get_collections()
         
-        # Get user's chat rooms
-        cursor = rooms_collection.find({
+        filter_query = {
             "participants": user_id,
             "is_active": True
-        }).sort("updated_at", -1)
+        }
+        filter_query.update(keyset_filter("updated_at", -1, cursor))
+        
+        cursor_query = rooms_collection.find(filter_query).sort([("updated_at", -1), ("_id", -1)])
+        if limit:
+            cursor_query = cursor_query.limit(limit)
         
         chats = []
-        async for chat_doc in cursor:
-            # Get last message for each chat
-            last_message_doc = await messages_collection.find_one(
-                {"chat_id": chat_doc["_id"]},
-                sort=[("created_at", -1)]
-            )
-            
-            chat_room = ChatRoom(**chat_doc)
-            if last_message_doc:
-                chat_room.last_message = ChatMessage(**last_message_doc)
-            
-            chats.append(chat_room)
+        last_doc = None
+        async for chat_doc in cursor_query:
+            chats.append(ChatRoom(**chat_doc))
+            last_doc = chat_doc
         
-        return chats
+        return chats, next_page_cursor(last_doc, len(chats), limit, "updated_at")
 
     async def send_message(self, sender_id: str, sender_name: str, message_data: MessageCreate) -> ChatMessage:
         """Send a message to a chat room."""
@@ -90,6 +172,7 @@ class ChatService:
         message_doc["_id"] = message_id
         
         await messages_collection.insert_one(message_doc)
+        rollup_service.record("chat_messages", when=message.created_at)
         
         # Update chat room's last message and updated_at
         rooms_collection, _, _, _ = self._get_collections()
@@ -107,18 +190,40 @@ class ChatService:
 
     async def get_chat_messages(self, chat_id: str, skip: int = 0, limit: int = 50) -> List[ChatMessage]:
         """Get messages from a chat room."""
+        messages, _ = await self.get_chat_messages_page(chat_id, limit, skip=skip)
+        return messages
+
+    async def get_chat_messages_page(
+        self,
+        chat_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Tuple[List[ChatMessage], Optional[str]]:
+        """Get the latest messages before the cursor, oldest first, and the cursor for older ones.
+
+        skip is only honoured without a cursor, for older clients.
+        """
         _, messages_collection, _, _ = self._get_collections()
         
-        cursor = messages_collection.find({
+        filter_query = {
             "chat_id": chat_id,
             "deleted_at": None
-        }).sort("created_at", -1).skip(skip).limit(limit)
+        }
+        filter_query.update(keyset_filter("created_at", -1, cursor))
+        
+        query = messages_collection.find(filter_query).sort([("created_at", -1), ("_id", -1)])
+        if skip and not cursor:
+            query = query.skip(skip)
         
         messages = []
-        async for message_doc in cursor:
+        last_doc = None
+        async for message_doc in query.limit(limit):
             messages.append(ChatMessage(**message_doc))
+            last_doc = message_doc
         
-        return list(reversed(messages))
+        next_cursor = next_page_cursor(last_doc, len(messages), limit, "created_at")
+        return list(reversed(messages)), next_cursor
 
     async def mark_messages_as_read(self, chat_id: str, user_id: str, message_ids: List[str]):
         """Mark messages as read by a user."""
@@ -162,6 +267,16 @@ class ChatService:
         
         return presence_map
 
+    async def filter_online(self, user_ids: Iterable[str]) -> Set[str]:
+        """Get those of user_ids whose presence record says they are online."""
+        _, _, presence_collection, _ = self._get_collections()
+        
+        cursor = presence_collection.find(
+            {"user_id": {"$in": list(user_ids)}, "is_online": True},
+            {"user_id": 1}
+        )
+        return {presence_doc["user_id"] async for presence_doc in cursor}
+
     async def get_online_users(self) -> List[str]:
         """Get list of currently online users."""
         _, _, presence_collection, _ = self._get_collections()
@@ -3,7 +3,7 @@ import json
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from emergentintegrations.llm.chat import LlmChat, UserMessage
-from database.connection import get_database
+from database.connection import db_collections
 
 class CompetitiveIntelligenceService:
     """
@@ -16,12 +16,11 @@ class CompetitiveIntelligenceService:
         
     def _get_collections(self):
         """Get competitive intelligence collections."""
-        db = get_database()
         return (
-            db.competitor_analysis,
-            db.feature_gaps,
-            db.user_feedback,
-            db.market_opportunities
+            db_collections.competitor_analysis,
+            db_collections.feature_gaps,
+            db_collections.user_feedback,
+            db_collections.market_opportunities
         )
 
     async def initialize_llm(self, api_key: str, provider: str = "openai", model: str = "gpt-4o"):
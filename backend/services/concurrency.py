@@ -0,0 +1,43 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+DEFAULT_BRANCH_TIMEOUT = float(os.environ.get("AGGREGATE_BRANCH_TIMEOUT_SECONDS", "2.0"))
+
+class Branch:
+    """One independent sub-call of an aggregate endpoint.
+
+    If the call fails or takes longer than `timeout` seconds, `fallback` is
+    used in its place so the rest of the response can still be served.
+    """
+
+    def __init__(self, name: str, awaitable: Awaitable, fallback: Any = None, timeout: Optional[float] = None):
+        self.name = name
+        self.awaitable = awaitable
+        self.fallback = fallback
+        self.timeout = DEFAULT_BRANCH_TIMEOUT if timeout is None else timeout
+
+async def _run_branch(branch: Branch) -> Tuple[Any, bool]:
+    try:
+        return await asyncio.wait_for(branch.awaitable, timeout=branch.timeout), True
+    except asyncio.TimeoutError:
+        print(f"Branch '{branch.name}' timed out after {branch.timeout}s, using fallback")
+    except Exception as e:
+        print(f"Branch '{branch.name}' failed, using fallback: {e}")
+    return branch.fallback, False
+
+async def gather_branches(*branches: Branch) -> Tuple[Dict[str, Any], List[str]]:
+    """Run branches concurrently; returns ({name: result}, names that fell back).
+
+    Total latency is that of the slowest branch (bounded by its timeout)
+    instead of the sum. Cancelling the caller cancels every branch.
+    """
+    outcomes = await asyncio.gather(*(_run_branch(branch) for branch in branches))
+
+    results = {}
+    degraded = []
+    for branch, (value, ok) in zip(branches, outcomes):
+        results[branch.name] = value
+        if not ok:
+            degraded.append(branch.name)
+    return results, degraded
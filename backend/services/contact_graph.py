@@ -0,0 +1,116 @@
+from typing import Dict, Iterable, Set
+
+class ContactGraph:
+    """In-memory map of which users share a chat room.
+
+    Edges are reference counted by shared room so removing a user from one
+    room keeps the contact if they still share another. A user's rooms are
+    loaded from the database once (see ChatService.ensure_contacts_loaded);
+    afterwards room creation and membership changes keep the graph current.
+    Only rooms with at least one loaded member are kept: evict_user drops a
+    disconnected user's rooms once no other loaded user needs them, so the
+    graph stays proportional to the users connected to this process.
+    """
+
+    def __init__(self):
+        # Room membership: {chat_id: {user_id}}
+        self.room_members: Dict[str, Set[str]] = {}
+        # Rooms each member belongs to: {user_id: {chat_id}}
+        self.user_rooms: Dict[str, Set[str]] = {}
+        # Co-participants with shared room counts: {user_id: {contact_id: shared_rooms}}
+        self.contacts: Dict[str, Dict[str, int]] = {}
+        # Users whose full room list has been loaded
+        self.loaded_users: Set[str] = set()
+
+    def _link(self, user_id: str, contact_id: str):
+        user_contacts = self.contacts.setdefault(user_id, {})
+        user_contacts[contact_id] = user_contacts.get(contact_id, 0) + 1
+
+    def _unlink(self, user_id: str, contact_id: str):
+        user_contacts = self.contacts.get(user_id)
+        if not user_contacts or contact_id not in user_contacts:
+            return
+        user_contacts[contact_id] -= 1
+        if user_contacts[contact_id] <= 0:
+            del user_contacts[contact_id]
+        if not user_contacts:
+            del self.contacts[user_id]
+
+    def add_room(self, chat_id: str, participants: Iterable[str]):
+        """Register a room; known rooms only pick up new participants."""
+        for user_id in participants:
+            self.add_participant(chat_id, user_id)
+
+    def remove_room(self, chat_id: str):
+        """Forget a room and the edges it contributed."""
+        for user_id in list(self.room_members.get(chat_id, ())):
+            self.remove_participant(chat_id, user_id)
+
+    def add_participant(self, chat_id: str, user_id: str):
+        """Add a user to a room, linking them with every existing member."""
+        members = self.room_members.setdefault(chat_id, set())
+        if user_id in members:
+            return
+        for member_id in members:
+            self._link(user_id, member_id)
+            self._link(member_id, user_id)
+        members.add(user_id)
+        self.user_rooms.setdefault(user_id, set()).add(chat_id)
+
+    def remove_participant(self, chat_id: str, user_id: str):
+        """Remove a user from a room, dropping edges no other room supports."""
+        members = self.room_members.get(chat_id)
+        if not members or user_id not in members:
+            return
+        members.discard(user_id)
+        for member_id in members:
+            self._unlink(user_id, member_id)
+            self._unlink(member_id, user_id)
+        if not members:
+            del self.room_members[chat_id]
+
+        rooms = self.user_rooms.get(user_id)
+        if rooms is not None:
+            rooms.discard(chat_id)
+            if not rooms:
+                del self.user_rooms[user_id]
+
+    def sync_room(self, chat_id: str, participants: Iterable[str]) -> bool:
+        """Set a room's members after a membership change.
+
+        Only rooms with a loaded participant are kept; returns False if the
+        room was neither tracked before nor now.
+        """
+        participants = set(participants)
+        current = set(self.room_members.get(chat_id, ()))
+        if not participants & self.loaded_users:
+            # Nobody here needs it, e.g. the only loaded member just left
+            self.remove_room(chat_id)
+            return bool(current)
+        for user_id in current - participants:
+            self.remove_participant(chat_id, user_id)
+        for user_id in participants - current:
+            self.add_participant(chat_id, user_id)
+        return True
+
+    def evict_user(self, user_id: str):
+        """Unload a user, dropping their rooms that no other loaded user shares."""
+        self.loaded_users.discard(user_id)
+        for chat_id in list(self.user_rooms.get(user_id, ())):
+            if not self.room_members.get(chat_id, set()) & self.loaded_users:
+                self.remove_room(chat_id)
+
+    def get_contacts(self, user_id: str) -> Set[str]:
+        """Get the users sharing at least one room with user_id."""
+        return set(self.contacts.get(user_id, ()))
+
+    def stats(self) -> Dict[str, int]:
+        """Get graph size counters."""
+        return {
+            "rooms": len(self.room_members),
+            "users": len(self.contacts),
+            "loaded_users": len(self.loaded_users),
+            "edges": sum(len(c) for c in self.contacts.values())
+        }
+
+contact_graph = ContactGraph()
@@ -0,0 +1,234 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type
+from services.rate_limiter import TOLERANCE_EPSILON, RateLimitPolicy, RateLimiter
+
+# GCRA in one atomic step on the Redis clock: same algorithm as RateLimiter.
+# A rejected request leaves the stored arrival time untouched, so clients
+# over the limit get through again as soon as their allowance refills.
+GCRA_SCRIPT = """
+redis.replicate_commands()
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+local ahead = math.max(tat - now, 0) + interval
+if ahead > tolerance + tonumber(ARGV[3]) then
+    return {0, tostring(ahead - tolerance)}
+end
+redis.call('SET', KEYS[1], tostring(now + ahead), 'PX', math.ceil(ahead * 1000))
+return {1, '0'}
+"""
+
+class CounterStore(ABC):
+    """Rate limits and sliding-window counters (for lockouts).
+
+    acquire() applies a RateLimitPolicy with GCRA. The counters are kept
+    per fixed window and blended with the previous window by how much of it
+    still overlaps the sliding window, which gives sliding-window semantics
+    with two numbers per key.
+    """
+
+    # True when every worker and node sees the same counts
+    shared = False
+
+    @abstractmethod
+    async def acquire(self, key: str, policy: RateLimitPolicy) -> Tuple[bool, float]:
+        """Admit one request under policy; returns (allowed, seconds until the next would be allowed).
+
+        Rejected requests are not counted.
+        """
+
+    @abstractmethod
+    async def hit(self, key: str, window_seconds: float) -> float:
+        """Count one event and return the sliding-window total including it."""
+
+    @abstractmethod
+    async def count(self, key: str, window_seconds: float) -> float:
+        """Return the sliding-window total without counting anything."""
+
+    @abstractmethod
+    async def reset(self, key: str, window_seconds: float):
+        """Forget a key's events."""
+
+    def stats(self) -> Dict[str, object]:
+        return {"backend": type(self).__name__, "shared": self.shared}
+
+def _window(now: float, window_seconds: float):
+    index = int(now // window_seconds)
+    overlap = 1.0 - (now - index * window_seconds) / window_seconds
+    return index, overlap
+
+class InMemoryCounterStore(CounterStore):
+    """Per-process counters with LRU eviction past max_keys."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self.rate_limiter = RateLimiter(max_keys=max_keys)
+        # {key: [window index, current window count, previous window count]}
+        self._counters: "OrderedDict[str, list]" = OrderedDict()
+
+    def _roll(self, key: str, index: int) -> list:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = [index, 0, 0]
+            self._counters[key] = counter
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        elif counter[0] != index:
+            previous = counter[1] if counter[0] == index - 1 else 0
+            counter[:] = [index, 0, previous]
+        self._counters.move_to_end(key)
+        return counter
+
+    async def acquire(self, key: str, policy: RateLimitPolicy) -> Tuple[bool, float]:
+        return self.rate_limiter.hit(key, policy)
+
+    async def hit(self, key: str, window_seconds: float) -> float:
+        index, overlap = _window(time.time(), window_seconds)
+        counter = self._roll(key, index)
+        counter[1] += 1
+        return counter[1] + counter[2] * overlap
+
+    async def count(self, key: str, window_seconds: float) -> float:
+        if key not in self._counters:
+            return 0.0
+        index, overlap = _window(time.time(), window_seconds)
+        counter = self._roll(key, index)
+        return counter[1] + counter[2] * overlap
+
+    async def reset(self, key: str, window_seconds: float):
+        self._counters.pop(key, None)
+
+    def stats(self) -> Dict[str, object]:
+        stats = super().stats()
+        stats.update({
+            "keys": len(self._counters),
+            "max_keys": self.max_keys,
+            "rate_limiter": self.rate_limiter.stats()
+        })
+        return stats
+
+class RedisCounterStore(CounterStore):
+    """Counters in Redis, shared by every worker and node.
+
+    Rate limits run GCRA_SCRIPT; counter INCR and EXPIRE run in one
+    MULTI/EXEC. Both are atomic across processes. Works with any client
+    exposing the redis.asyncio interface, including local stand-ins such as
+    tests/fake_redis.py.
+
+    While Redis is failing (any of error_types), every call is served by a
+    per-process InMemoryCounterStore instead, so requests keep being limited
+    per worker rather than failing.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        client,
+        key_prefix: str = "prolawh:counter:",
+        error_types: Tuple[Type[BaseException], ...] = (OSError,),
+        fallback: Optional[CounterStore] = None
+    ):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.error_types = error_types
+        self.fallback = fallback or InMemoryCounterStore()
+        self._gcra = client.register_script(GCRA_SCRIPT)
+        self.degraded = False
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCounterStore":
+        """Create a store connected to a Redis server."""
+        import redis.asyncio as redis
+        from redis.exceptions import RedisError
+        return cls(redis.from_url(url, decode_responses=True), error_types=(RedisError, OSError))
+
+    async def _with_fallback(self, remote: Callable[[], Awaitable], local: Callable[[], Awaitable]):
+        """Run remote() against Redis, or local() on the fallback store if Redis fails."""
+        try:
+            result = await remote()
+        except self.error_types as e:
+            self.errors += 1
+            if not self.degraded:
+                self.degraded = True
+                print(f"Counter store Redis error, using per-process counters until it recovers: {e}")
+            return await local()
+
+        if self.degraded:
+            self.degraded = False
+            print("Counter store Redis recovered")
+        return result
+
+    async def acquire(self, key: str, policy: RateLimitPolicy) -> Tuple[bool, float]:
+        async def remote():
+            allowed, retry_after = await self._gcra(
+                keys=[f"{self.key_prefix}{key}"],
+                args=[policy.emission_interval, policy.tolerance, TOLERANCE_EPSILON]
+            )
+            return bool(int(allowed)), float(retry_after)
+
+        allowed, retry_after = await self._with_fallback(remote, lambda: self.fallback.acquire(key, policy))
+        if allowed:
+            self.allowed += 1
+            return True, 0.0
+        self.limited += 1
+        return False, retry_after
+
+    def _keys(self, key: str, index: int):
+        return f"{self.key_prefix}{key}:{index}", f"{self.key_prefix}{key}:{index - 1}"
+
+    async def hit(self, key: str, window_seconds: float) -> float:
+        async def remote():
+            index, overlap = _window(time.time(), window_seconds)
+            current_key, previous_key = self._keys(key, index)
+
+            pipe = self.client.pipeline(transaction=True)
+            pipe.incr(current_key)
+            pipe.expire(current_key, int(window_seconds * 2) + 1)
+            pipe.get(previous_key)
+            current, _, previous = await pipe.execute()
+            return int(current) + int(previous or 0) * overlap
+
+        return await self._with_fallback(remote, lambda: self.fallback.hit(key, window_seconds))
+
+    async def count(self, key: str, window_seconds: float) -> float:
+        async def remote():
+            index, overlap = _window(time.time(), window_seconds)
+            current, previous = await self.client.mget(*self._keys(key, index))
+            return int(current or 0) + int(previous or 0) * overlap
+
+        return await self._with_fallback(remote, lambda: self.fallback.count(key, window_seconds))
+
+    async def reset(self, key: str, window_seconds: float):
+        async def remote():
+            index, _ = _window(time.time(), window_seconds)
+            await self.client.delete(*self._keys(key, index))
+
+        # Also forget whatever was counted locally during an outage
+        await self.fallback.reset(key, window_seconds)
+        await self._with_fallback(remote, lambda: self.fallback.reset(key, window_seconds))
+
+    def stats(self) -> Dict[str, object]:
+        stats = super().stats()
+        stats.update({
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "errors": self.errors,
+            "degraded": self.degraded
+        })
+        return stats
+
+def create_counter_store() -> CounterStore:
+    """Create the store configured by RATE_LIMIT_BACKEND_URL (in-memory when unset)."""
+    url = os.environ.get("RATE_LIMIT_BACKEND_URL")
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisCounterStore.from_url(url)
+    return InMemoryCounterStore(max_keys=int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000")))
@@ -1,8 +1,26 @@
+import os
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
 from models.course import Course, CourseCreate, CourseResponse, CourseProgress
-from database.connection import get_database
+from database.connection import db_collections
+from services.rollup_service import rollup_service
+from services.pagination import keyset_filter, next_page_cursor
+from services.learning_stats_service import learning_stats_service
+from services.cache import SWRCache
+from services.leaderboard_service import COURSE_PROJECTION, popularity_leaderboard
+
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_QUERY_LENGTH = 200
+
+# Public catalog reads: ("course", course_id), ("courses", limit, cursor, skip),
+# and, when the leaderboard cannot answer, ("popular", limit, category) and ("trending",)
+catalog_cache = SWRCache(
+    max_size=int(os.environ.get("CATALOG_CACHE_MAX_SIZE", "2000")),
+    ttl_seconds=float(os.environ.get("CATALOG_CACHE_TTL_SECONDS", "30")),
+    stale_seconds=float(os.environ.get("CATALOG_CACHE_STALE_SECONDS", "300"))
+)
 
 class CourseService:
     def __init__(self):
@@ -10,8 +28,7 @@ class CourseService:
 
     def _get_collections(self):
         """Get course collections from database."""
-        db = get_database()
-        return db.courses, db.course_progress
+        return db_collections.courses, db_collections.course_progress
 
     async def create_course(self, course_data: CourseCreate, instructor_name: str) -> CourseResponse:
         """Create a new course."""
@@ -34,11 +51,24 @@ class CourseService:
         course_doc["_id"] = course_id
         
         await courses_collection.insert_one(course_doc)
+        rollup_service.record("courses_created", when=course.created_at)
+        self.invalidate_catalog(course_id)
         
         return CourseResponse(**course.dict())
 
+    def invalidate_catalog(self, course_id: Optional[str] = None):
+        """Drop cached catalog reads after a course write."""
+        if course_id:
+            catalog_cache.invalidate(("course", course_id))
+        catalog_cache.invalidate_namespace("courses")
+        catalog_cache.invalidate_namespace("popular")
+        catalog_cache.invalidate_namespace("trending")
+
     async def get_course(self, course_id: str) -> Optional[CourseResponse]:
-        """Get course by ID."""
+        """Get course by ID (cached)."""
+        return await catalog_cache.get_or_load(("course", course_id), lambda: self._load_course(course_id))
+
+    async def _load_course(self, course_id: str) -> Optional[CourseResponse]:
         courses_collection, _ = self._get_collections()
         course_doc = await courses_collection.find_one({"_id": course_id})
         if not course_doc:
@@ -47,41 +77,81 @@ class CourseService:
 
     async def get_all_courses(self, skip: int = 0, limit: int = 20) -> List[CourseResponse]:
         """Get all courses with pagination."""
+        courses, _ = await self.get_courses_page(limit, skip=skip)
+        return courses
+
+    async def get_courses_page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Tuple[List[CourseResponse], Optional[str]]:
+        """Get a page of published courses, newest first, and the cursor for the next page.
+
+        skip is only honoured without a cursor, for older clients. Pages are cached.
+        """
+        courses, next_cursor = await catalog_cache.get_or_load(
+            ("courses", limit, cursor, skip),
+            lambda: self._load_courses_page(limit, cursor, skip)
+        )
+        return list(courses), next_cursor
+
+    async def _load_courses_page(
+        self,
+        limit: int,
+        cursor: Optional[str],
+        skip: int
+    ) -> Tuple[List[CourseResponse], Optional[str]]:
         courses_collection, _ = self._get_collections()
-        cursor = courses_collection.find({"status": "published"}).skip(skip).limit(limit)
+        filter_query = {"status": "published"}
+        filter_query.update(keyset_filter("created_at", -1, cursor))
+        
+        query = courses_collection.find(filter_query).sort([("created_at", -1), ("_id", -1)])
+        if skip and not cursor:
+            query = query.skip(skip)
+        
         courses = []
-        async for course_doc in cursor:
+        last_doc = None
+        async for course_doc in query.limit(limit):
             courses.append(CourseResponse(**course_doc))
-        return courses
+            last_doc = course_doc
+        return courses, next_page_cursor(last_doc, len(courses), limit, "created_at")
 
-    async def search_courses(self, query: str, category: Optional[str] = None) -> List[CourseResponse]:
-        """Search courses by title, description, or tags."""
+    async def search_courses(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> List[CourseResponse]:
+        """Search published courses, best matches first.
+
+        Uses the weighted text index over title, tags, category and
+        description, so words are stemmed and results ranked by relevance.
+        """
         courses_collection, _ = self._get_collections()
-        filter_query = {
-            "$and": [
-                {"status": "published"},
-                {
-                    "$or": [
-                        {"title": {"$regex": query, "$options": "i"}},
-                        {"description": {"$regex": query, "$options": "i"}},
-                        {"tags": {"$in": [query]}}
-                    ]
-                }
-            ]
-        }
+        query = query.strip()[:SEARCH_MAX_QUERY_LENGTH]
+        if not query:
+            return []
         
+        filter_query = {"status": "published", "$text": {"$search": query}}
         if category:
-            filter_query["$and"].append({"category": category})
+            filter_query["category"] = category
         
-        cursor = courses_collection.find(filter_query)
+        cursor = (
+            courses_collection.find(filter_query, {"score": {"$meta": "textScore"}})
+            .sort([("score", {"$meta": "textScore"})])
+            .skip(max(skip, 0))
+            .limit(max(1, min(limit, SEARCH_MAX_LIMIT)))
+        )
         courses = []
         async for course_doc in cursor:
             courses.append(CourseResponse(**course_doc))
         return courses
 
     async def enroll_user(self, user_id: str, course_id: str) -> CourseProgress:
-        """Enroll user in a course."""
-        _, progress_collection = self._get_collections()
+        """Enroll user in a course and count it towards the course's popularity."""
+        courses_collection, progress_collection = self._get_collections()
         progress = CourseProgress(
             user_id=user_id,
             course_id=course_id
@@ -91,6 +161,19 @@ class CourseService:
         progress_doc["_id"] = f"{user_id}_{course_id}"
         
         await progress_collection.insert_one(progress_doc)
+        rollup_service.record("enrollments", when=progress.enrollment_date)
+        await learning_stats_service.record_enrollment(user_id)
+        
+        course_doc = await courses_collection.find_one_and_update(
+            {"_id": course_id},
+            {"$inc": {"enrollment_count": 1}},
+            projection=COURSE_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        # Only the course page: lists and rankings pick the count up within their TTL
+        catalog_cache.invalidate(("course", course_id))
+        if course_doc:
+            popularity_leaderboard.record_enrollment(course_doc)
         return progress
 
     async def get_user_progress(self, user_id: str, course_id: str) -> Optional[CourseProgress]:
@@ -103,15 +186,50 @@ class CourseService:
 
     async def update_progress(self, user_id: str, course_id: str, lesson_id: str, time_spent: int):
         """Update user's course progress."""
-        _, progress_collection = self._get_collections()
-        await progress_collection.update_one(
+        courses_collection, progress_collection = self._get_collections()
+        now = datetime.now()
+        progress_doc = await progress_collection.find_one_and_update(
             {"_id": f"{user_id}_{course_id}"},
             {
                 "$addToSet": {"completed_lessons": lesson_id},
                 "$inc": {"time_spent_minutes": time_spent},
-                "$set": {"last_accessed": datetime.now()}
-            }
+                "$set": {"last_accessed": now}
+            },
+            projection={"completed_lessons": 1, "is_completed": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not progress_doc:
+            return
+        
+        completed_lessons = progress_doc.get("completed_lessons", [])
+        await learning_stats_service.record_activity(
+            user_id, time_spent, new_lesson=lesson_id not in completed_lessons, when=now
+        )
+        if progress_doc.get("is_completed"):
+            return
+        
+        # Mark the course completed once every lesson is done
+        course_doc = await courses_collection.find_one({"_id": course_id}, {"modules.lessons.lesson_id": 1})
+        lesson_ids = {
+            lesson["lesson_id"]
+            for module in (course_doc or {}).get("modules", [])
+            for lesson in module.get("lessons", [])
+        }
+        if not lesson_ids:
+            return
+        
+        completed = lesson_ids.intersection(completed_lessons + [lesson_id])
+        update = {"completion_percentage": len(completed) * 100 // len(lesson_ids)}
+        if len(completed) == len(lesson_ids):
+            update.update({"is_completed": True, "completion_date": now})
+        
+        result = await progress_collection.update_one(
+            {"_id": f"{user_id}_{course_id}", "is_completed": {"$ne": True}},
+            {"$set": update}
         )
+        if result.modified_count and update.get("is_completed"):
+            rollup_service.record("completions", when=now)
+            await learning_stats_service.record_completion(user_id, when=now)
 
     async def get_user_courses(self, user_id: str) -> List[dict]:
         """Get all courses user is enrolled in with progress."""
@@ -141,13 +259,65 @@ class CourseService:
             result.append(doc)
         return result
 
-    async def get_popular_courses(self, limit: int = 10) -> List[CourseResponse]:
-        """Get popular courses based on enrollment count."""
+    async def get_popular_courses(self, limit: int = 10, category: Optional[str] = None) -> List[CourseResponse]:
+        """Get the most enrolled courses, overall or within a category.
+
+        Served from the in-memory leaderboard; larger lists, or any before the
+        leaderboard has loaded, fall back to a cached query.
+        """
+        if popularity_leaderboard.loaded and limit <= popularity_leaderboard.size:
+            return popularity_leaderboard.top(limit, category)
+        courses = await catalog_cache.get_or_load(
+            ("popular", limit, category), lambda: self._load_popular_courses(limit, category)
+        )
+        return list(courses)
+
+    async def _load_popular_courses(self, limit: int, category: Optional[str]) -> List[CourseResponse]:
         courses_collection, _ = self._get_collections()
-        cursor = courses_collection.find({"status": "published"}).sort("enrollment_count", -1).limit(limit)
+        filter_query = {"status": "published"}
+        if category:
+            filter_query["category"] = category
+        cursor = courses_collection.find(filter_query, COURSE_PROJECTION).sort("enrollment_count", -1).limit(limit)
         courses = []
         async for course_doc in cursor:
             courses.append(CourseResponse(**course_doc))
         return courses
 
+    async def get_trending_courses(self, limit: int = 10) -> List[CourseResponse]:
+        """Get the courses with the most enrollments in the trending window (see leaderboard)."""
+        if popularity_leaderboard.loaded and limit <= popularity_leaderboard.size:
+            return popularity_leaderboard.trending(limit)
+        courses, _ = await catalog_cache.get_or_load(("trending",), popularity_leaderboard.load_trending)
+        return courses[:limit]
+
+    async def backfill_enrollment_counts(self, batch_size: int = 1000) -> int:
+        """Set every course's enrollment_count from course_progress; returns how many courses were updated.
+
+        enrollment_count was not maintained before enrollments incremented it.
+        """
+        courses_collection, progress_collection = self._get_collections()
+        counts = {}
+        async for doc in progress_collection.aggregate([{"$group": {"_id": "$course_id", "count": {"$sum": 1}}}]):
+            counts[doc["_id"]] = doc["count"]
+        
+        updated = 0
+        operations = []
+        async for course_doc in courses_collection.find({}, {"enrollment_count": 1}):
+            count = counts.get(course_doc["_id"], 0)
+            if course_doc.get("enrollment_count") == count:
+                continue
+            operations.append(UpdateOne({"_id": course_doc["_id"]}, {"$set": {"enrollment_count": count}}))
+            if len(operations) >= batch_size:
+                await courses_collection.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        
+        if operations:
+            await courses_collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+        
+        await popularity_leaderboard.refresh()
+        self.invalidate_catalog()
+        return updated
+
 course_service = CourseService()
\ No newline at end of file
@@ -0,0 +1,193 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from models.course import CourseResponse
+from database.connection import db_collections
+
+# Published course fields the rankings are served from
+COURSE_PROJECTION = {"modules": 0}
+
+class PopularityLeaderboard:
+    """Ready-made top-N course rankings held in memory.
+
+    Keeps three boards of course ids, most popular first: overall and per
+    category by enrollment_count, and trending by enrollments in the last
+    `trending_days`. Every enrollment re-ranks the enrolled course in place
+    (a single O(N) insert per board), and a background task rebuilds the
+    boards from the database every `refresh_interval` seconds so that other
+    processes' enrollments, publishing changes and the trending window
+    moving forward are picked up.
+    """
+
+    def __init__(self, size: int = 50, refresh_interval: float = 60.0, trending_days: int = 7):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.trending_days = trending_days
+        # Snapshots of every ranked course: {course_id: CourseResponse}
+        self._courses: Dict[str, CourseResponse] = {}
+        self._overall: List[str] = []
+        self._by_category: Dict[str, List[str]] = {}
+        self._trending: List[str] = []
+        # Enrollments inside the trending window: {course_id: count}
+        self._trending_counts: Dict[str, int] = defaultdict(int)
+        self.loaded_at: Optional[datetime] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self.enrollments = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    async def start(self):
+        """Load the boards and start the background refresher."""
+        if self._refresh_task is None:
+            await self.refresh()
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._refresh_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresher."""
+        if self._refresh_task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._refresh_task
+            self._refresh_task = None
+            self._wakeup = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._stopping:
+                await self.refresh()
+
+    async def refresh(self) -> bool:
+        """Rebuild every board from the database; on failure the current boards are kept."""
+        try:
+            courses = db_collections.analytics("courses")
+            published = {"status": "published"}
+            categories = await courses.distinct("category", published)
+
+            overall, (trending, trending_counts), *category_boards = await asyncio.gather(
+                self._top_courses(published),
+                self.load_trending(),
+                *(self._top_courses({**published, "category": category}) for category in categories)
+            )
+        except Exception as e:
+            print(f"Leaderboard refresh failed, keeping current rankings: {e}")
+            self.failed_refreshes += 1
+            return False
+
+        snapshots = {}
+        for board in [overall, trending, *category_boards]:
+            for course in board:
+                snapshots[course.course_id] = course
+
+        # Swapped in together, with no await in between, so readers never see a mix
+        self._courses = snapshots
+        self._overall = [course.course_id for course in overall]
+        self._trending = [course.course_id for course in trending]
+        self._trending_counts = trending_counts
+        self._by_category = {
+            category: [course.course_id for course in board]
+            for category, board in zip(categories, category_boards)
+        }
+        self.loaded_at = datetime.now()
+        self.refreshes += 1
+        return True
+
+    async def _top_courses(self, filter_query: Dict) -> List[CourseResponse]:
+        cursor = (
+            db_collections.analytics("courses")
+            .find(filter_query, COURSE_PROJECTION)
+            .sort("enrollment_count", -1)
+            .limit(self.size)
+        )
+        return [CourseResponse(**course_doc) async for course_doc in cursor]
+
+    async def load_trending(self):
+        """Top published courses by recent enrollments, and the counts behind them."""
+        since = datetime.now() - timedelta(days=self.trending_days)
+        pipeline = [
+            {"$match": {"enrollment_date": {"$gte": since}}},
+            {"$group": {"_id": "$course_id", "count": {"$sum": 1}}}
+        ]
+        counts: Dict[str, int] = defaultdict(int)
+        async for doc in db_collections.analytics("course_progress").aggregate(pipeline):
+            counts[doc["_id"]] = doc["count"]
+
+        # Extra candidates in case some of the busiest are not published
+        candidates = sorted(counts, key=counts.get, reverse=True)[:self.size * 2]
+        cursor = db_collections.analytics("courses").find(
+            {"_id": {"$in": candidates}, "status": "published"}, COURSE_PROJECTION
+        )
+        courses = [CourseResponse(**course_doc) async for course_doc in cursor]
+        courses.sort(key=lambda course: counts[course.course_id], reverse=True)
+        return courses[:self.size], counts
+
+    def record_enrollment(self, course_doc: Dict[str, Any]):
+        """Re-rank a course after an enrollment, given its document with the new enrollment_count."""
+        if course_doc.get("status") != "published":
+            return
+        course = CourseResponse(**course_doc)
+        course_id = course.course_id
+        self._courses[course_id] = course
+        self._trending_counts[course_id] += 1
+        self.enrollments += 1
+
+        def by_enrollments(ranked_id: str) -> int:
+            return self._courses[ranked_id].enrollment_count
+
+        self._rank(self._overall, course_id, by_enrollments)
+        self._rank(self._by_category.setdefault(course.category, []), course_id, by_enrollments)
+        self._rank(self._trending, course_id, self._trending_counts.__getitem__)
+
+    def _rank(self, board: List[str], course_id: str, score: Callable[[str], int]):
+        """Move or insert `course_id` to its place in `board`, keeping at most `size` entries."""
+        if course_id in board:
+            board.remove(course_id)
+        value = score(course_id)
+        position = len(board)
+        while position > 0 and score(board[position - 1]) < value:
+            position -= 1
+        if position < self.size:
+            board.insert(position, course_id)
+            del board[self.size:]
+
+    def top(self, limit: int, category: Optional[str] = None) -> List[CourseResponse]:
+        """Most enrolled courses, overall or within a category."""
+        board = self._overall if category is None else self._by_category.get(category, [])
+        return [self._courses[course_id] for course_id in board[:limit]]
+
+    def trending(self, limit: int) -> List[CourseResponse]:
+        """Courses with the most enrollments in the trending window."""
+        return [self._courses[course_id] for course_id in self._trending[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get leaderboard counters."""
+        return {
+            "size": self.size,
+            "categories": len(self._by_category),
+            "trending_days": self.trending_days,
+            "refresh_interval_seconds": self.refresh_interval,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed_refreshes,
+            "enrollments": self.enrollments
+        }
+
+popularity_leaderboard = PopularityLeaderboard(
+    size=int(os.environ.get("LEADERBOARD_SIZE", "50")),
+    refresh_interval=float(os.environ.get("LEADERBOARD_REFRESH_SECONDS", "60")),
+    trending_days=int(os.environ.get("TRENDING_WINDOW_DAYS", "7"))
+)
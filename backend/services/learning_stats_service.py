@@ -0,0 +1,245 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from pymongo import ReplaceOne
+from database.connection import db_collections
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def _day_key(when: datetime) -> str:
+    return when.strftime("%Y-%m-%d")
+
+def week_key(when: datetime) -> str:
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def month_key(when: datetime) -> str:
+    return when.strftime("%Y-%m")
+
+def _add_to_map(field: str, key: str, amount: int) -> Dict:
+    """Pipeline $set entry adding `amount` to `field.key`, creating either if missing."""
+    return {f"{field}.{key}": {"$add": [{"$ifNull": [f"${field}.{key}", 0]}, amount]}}
+
+# course_progress fields backfill() reads
+PROGRESS_PROJECTION = {
+    "user_id": 1, "enrollment_date": 1, "last_accessed": 1, "time_spent_minutes": 1,
+    "completed_lessons": 1, "is_completed": 1, "completion_date": 1
+}
+
+def _streaks(days: Iterable[str]) -> Dict[str, int]:
+    """Current (ending on the last day) and longest runs of consecutive days."""
+    current = longest = 0
+    previous = None
+    for day in sorted(set(days)):
+        date = datetime.strptime(day, "%Y-%m-%d")
+        current = current + 1 if previous is not None and date - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = date
+    return {"current_streak": current, "longest_streak": longest}
+
+def stats_from_progress(progress_docs: List[Dict]) -> Dict:
+    """Build a user's aggregate document from their course_progress documents.
+
+    course_progress only keeps per-course totals, so each course's minutes
+    and lessons are credited to the day it was last accessed (or enrolled),
+    and active days and streaks count the days some course was enrolled in,
+    accessed or completed.
+    """
+    stats = defaultdict(int)
+    maps = defaultdict(lambda: defaultdict(int))
+    days = set()
+    last_active = None
+
+    for progress in progress_docs:
+        enrolled, accessed, completed = (
+            progress.get("enrollment_date"), progress.get("last_accessed"), progress.get("completion_date")
+        )
+        minutes = progress.get("time_spent_minutes", 0)
+        lessons = len(progress.get("completed_lessons", []))
+        stats["courses_enrolled"] += 1
+        stats["total_minutes"] += minutes
+        stats["lessons_completed"] += lessons
+        # At least one progress update per completed lesson
+        stats["activity_count"] += max(lessons, 1 if minutes else 0)
+
+        credited = accessed or enrolled
+        if credited is not None:
+            for field, key in (
+                ("by_weekday", WEEKDAYS[credited.weekday()]),
+                ("by_week", week_key(credited)),
+                ("by_month", month_key(credited))
+            ):
+                maps[f"minutes_{field}"][key] += minutes
+                maps[f"lessons_{field}"][key] += lessons
+
+        if progress.get("is_completed"):
+            stats["courses_completed"] += 1
+            if completed is not None:
+                maps["completions_by_week"][week_key(completed)] += 1
+                maps["completions_by_month"][month_key(completed)] += 1
+
+        for when in (enrolled, accessed, completed):
+            if when is not None:
+                days.add(_day_key(when))
+                last_active = max(last_active, when) if last_active else when
+
+    doc = {**stats, **{field: dict(counts) for field, counts in maps.items()}}
+    doc["active_days"] = len(days)
+    doc.update(_streaks(days))
+    if last_active is not None:
+        doc["last_active"] = last_active
+        doc["last_active_day"] = _day_key(last_active)
+    return doc
+
+class LearningStatsService:
+    """Per-user learning aggregates kept up to date as progress is recorded.
+
+    Each user has one user_learning_stats document holding the streak,
+    totals and small per-weekday/week/month maps. Writes are single
+    pipeline updates, so the analytics endpoints read one document instead
+    of scanning course_progress history.
+    """
+
+    def _get_collection(self):
+        """Get learning stats collection."""
+        return db_collections.user_learning_stats
+
+    async def record_activity(
+        self,
+        user_id: str,
+        minutes: int,
+        new_lesson: bool,
+        when: Optional[datetime] = None
+    ):
+        """Record a progress update: time spent and whether a new lesson was completed."""
+        collection = self._get_collection()
+        when = when or datetime.now()
+        today = _day_key(when)
+        yesterday = _day_key(when - timedelta(days=1))
+        lessons = 1 if new_lesson else 0
+        weekday = WEEKDAYS[when.weekday()]
+
+        await collection.update_one(
+            {"_id": user_id},
+            [
+                {"$set": {
+                    # Same day keeps the streak, the next day extends it, a gap resets it
+                    "current_streak": {"$switch": {
+                        "branches": [
+                            {"case": {"$eq": ["$last_active_day", today]}, "then": "$current_streak"},
+                            {"case": {"$eq": ["$last_active_day", yesterday]}, "then": {"$add": ["$current_streak", 1]}}
+                        ],
+                        "default": 1
+                    }},
+                    "active_days": {"$add": [
+                        {"$ifNull": ["$active_days", 0]},
+                        {"$cond": [{"$eq": ["$last_active_day", today]}, 0, 1]}
+                    ]},
+                    "last_active_day": today,
+                    "last_active": when,
+                    "total_minutes": {"$add": [{"$ifNull": ["$total_minutes", 0]}, minutes]},
+                    "lessons_completed": {"$add": [{"$ifNull": ["$lessons_completed", 0]}, lessons]},
+                    "activity_count": {"$add": [{"$ifNull": ["$activity_count", 0]}, 1]},
+                    **_add_to_map("minutes_by_weekday", weekday, minutes),
+                    **_add_to_map("lessons_by_weekday", weekday, lessons),
+                    **_add_to_map("minutes_by_week", week_key(when), minutes),
+                    **_add_to_map("lessons_by_week", week_key(when), lessons),
+                    **_add_to_map("minutes_by_month", month_key(when), minutes),
+                    **_add_to_map("lessons_by_month", month_key(when), lessons)
+                }},
+                {"$set": {
+                    "longest_streak": {"$max": [{"$ifNull": ["$longest_streak", 0]}, "$current_streak"]}
+                }}
+            ],
+            upsert=True
+        )
+
+    async def record_enrollment(self, user_id: str):
+        """Count a new course enrollment."""
+        collection = self._get_collection()
+        await collection.update_one({"_id": user_id}, {"$inc": {"courses_enrolled": 1}}, upsert=True)
+
+    async def record_completion(self, user_id: str, when: Optional[datetime] = None):
+        """Count a completed course."""
+        collection = self._get_collection()
+        when = when or datetime.now()
+        await collection.update_one(
+            {"_id": user_id},
+            {"$inc": {
+                "courses_completed": 1,
+                f"completions_by_week.{week_key(when)}": 1,
+                f"completions_by_month.{month_key(when)}": 1
+            }},
+            upsert=True
+        )
+
+    async def get_stats(self, user_id: str) -> Dict:
+        """Get a user's aggregate document (empty if they have no activity yet)."""
+        collection = self._get_collection()
+        stats = await collection.find_one({"_id": user_id}) or {}
+
+        # A streak only counts while it is still unbroken
+        if stats.get("last_active_day") not in (
+            _day_key(datetime.now()), _day_key(datetime.now() - timedelta(days=1))
+        ):
+            stats["current_streak"] = 0
+        return stats
+
+    async def backfill(self, batch_size: int = 1000) -> int:
+        """Rebuild every user's aggregates from course_progress; returns how many users were written.
+
+        For first deployment or repair: existing aggregate documents are
+        replaced (see stats_from_progress for what can be recovered), so run
+        it when progress writes are quiet.
+        """
+        collection = self._get_collection()
+        cursor = db_collections.course_progress.find({}, PROGRESS_PROJECTION).sort("user_id", 1)
+
+        written = 0
+        operations = []
+        user_id, user_docs = None, []
+
+        def flush_user():
+            if user_docs:
+                operations.append(ReplaceOne({"_id": user_id}, stats_from_progress(user_docs), upsert=True))
+
+        async for progress_doc in cursor:
+            if progress_doc.get("user_id") != user_id:
+                flush_user()
+                user_id, user_docs = progress_doc.get("user_id"), []
+            user_docs.append(progress_doc)
+            if len(operations) >= batch_size:
+                await collection.bulk_write(operations, ordered=False)
+                written += len(operations)
+                operations = []
+        flush_user()
+
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+        return written
+
+    async def ensure_backfilled(self) -> bool:
+        """Run backfill() once per database, on first start; returns whether it ran.
+
+        Without it users with earlier progress would show no hours,
+        completions or streak until their next activity. A failure is logged
+        and startup carries on; it is retried on the next start.
+        """
+        manifest_collection = db_collections.seed_manifest
+        try:
+            if await manifest_collection.find_one({"_id": "learning_stats"}) is not None:
+                return False
+            written = await self.backfill()
+            await manifest_collection.update_one(
+                {"_id": "learning_stats"},
+                {"$set": {"backfilled_at": datetime.now(), "users": written}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Learning stats backfill failed, will retry on next start: {e}")
+            return False
+        print(f"Learning stats backfilled from course_progress: {written} users")
+        return True
+
+learning_stats_service = LearningStatsService()
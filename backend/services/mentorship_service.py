@@ -1,19 +1,34 @@
+import os
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from models.mentorship import (
     MentorProfile, MentorshipConnection, MentorshipSession,
     MentorshipRequest, SessionBooking, MentorResponse,
     MentorshipStatus, SessionStatus
 )
-from database.connection import get_database
+from database.connection import db_collections
+from services.rollup_service import rollup_service
+from services.pagination import keyset_filter, next_page_cursor
+
+# Connections per partition in one get_user_mentorships page. Both partitions
+# come back in a single $facet document, which must stay under 16MB.
+MENTORSHIP_PAGE_LIMIT = int(os.environ.get("MENTORSHIP_PAGE_LIMIT", "50"))
+MENTORSHIP_MAX_PAGE_LIMIT = int(os.environ.get("MENTORSHIP_MAX_PAGE_LIMIT", "200"))
 
 class MentorshipService:
-    def __init__(self):
-        self.db = get_database()
-        self.mentors_collection = self.db.mentors
-        self.connections_collection = self.db.mentorship_connections
-        self.sessions_collection = self.db.mentorship_sessions
+    # Resolved per use so the module can be imported before connect_to_mongo()
+    @property
+    def mentors_collection(self):
+        return db_collections.mentors
+
+    @property
+    def connections_collection(self):
+        return db_collections.mentorship_connections
+
+    @property
+    def sessions_collection(self):
+        return db_collections.mentorship_sessions
 
     async def create_mentor_profile(self, user_id: str, profile_data: dict) -> MentorProfile:
         """Create a mentor profile."""
@@ -40,21 +55,42 @@ class MentorshipService:
 
     async def get_all_mentors(self, specialties: Optional[List[str]] = None, skip: int = 0, limit: int = 20) -> List[MentorResponse]:
         """Get all mentors with optional specialty filtering."""
+        mentors, _ = await self.get_mentors_page(specialties, limit, skip=skip)
+        return mentors
+
+    async def get_mentors_page(
+        self,
+        specialties: Optional[List[str]] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Tuple[List[MentorResponse], Optional[str]]:
+        """Get a page of mentors accepting mentees, newest first, and the cursor for the next page.
+
+        skip is only honoured without a cursor, for older clients.
+        """
         filter_query = {"is_accepting_mentees": True}
         
         if specialties:
             filter_query["specialties"] = {"$in": specialties}
+        filter_query.update(keyset_filter("created_at", -1, cursor))
         
-        # Join with users collection to get user details
+        # Page first so only this page's mentors are joined with users
         pipeline = [
             {"$match": filter_query},
+            {"$sort": {"created_at": -1, "_id": -1}}
+        ]
+        if skip and not cursor:
+            pipeline.append({"$skip": skip})
+        pipeline += [
+            {"$limit": limit},
             {"$lookup": {
                 "from": "users",
                 "localField": "user_id",
                 "foreignField": "_id",
                 "as": "user"
             }},
-            {"$unwind": "$user"},
+            {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
             {"$project": {
                 "mentor_id": "$_id",
                 "user_id": 1,
@@ -66,16 +102,21 @@ class MentorshipService:
                 "total_sessions": 1,
                 "hourly_rate": 1,
                 "bio": 1,
-                "is_accepting_mentees": 1
-            }},
-            {"$skip": skip},
-            {"$limit": limit}
+                "is_accepting_mentees": 1,
+                "created_at": 1
+            }}
         ]
         
         mentors = []
+        last_doc = None
+        returned = 0
         async for mentor_doc in self.mentors_collection.aggregate(pipeline):
-            mentors.append(MentorResponse(**mentor_doc))
-        return mentors
+            # The cursor follows every matched mentor, even one whose user is gone
+            returned += 1
+            last_doc = mentor_doc
+            if "full_name" in mentor_doc:
+                mentors.append(MentorResponse(**mentor_doc))
+        return mentors, next_page_cursor(last_doc, returned, limit, "created_at")
 
     async def request_mentorship(self, mentee_id: str, request: MentorshipRequest) -> MentorshipConnection:
         """Create a mentorship request."""
@@ -93,6 +134,7 @@ class MentorshipService:
         connection_doc["_id"] = connection_id
         
         await self.connections_collection.insert_one(connection_doc)
+        rollup_service.record("mentorship_requests", when=connection.requested_at)
         return connection
 
     async def accept_mentorship(self, connection_id: str) -> Optional[MentorshipConnection]:
@@ -136,23 +178,56 @@ class MentorshipService:
         session_doc["_id"] = session_id
         
         await self.sessions_collection.insert_one(session_doc)
+        rollup_service.record("mentorship_sessions", when=session.created_at)
         return session
 
-    async def get_user_mentorships(self, user_id: str) -> dict:
-        """Get user's mentorship connections as mentor and mentee."""
-        # As mentor
-        mentor_connections = []
-        async for doc in self.connections_collection.find({"mentor_id": user_id}):
-            mentor_connections.append(MentorshipConnection(**doc))
-        
-        # As mentee
-        mentee_connections = []
-        async for doc in self.connections_collection.find({"mentee_id": user_id}):
-            mentee_connections.append(MentorshipConnection(**doc))
+    async def get_user_mentorships(
+        self,
+        user_id: str,
+        status: Optional[MentorshipStatus] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        counts_only: bool = False
+    ) -> dict:
+        """Get user's mentorship connections as mentor and mentee in one query.
+
+        Each partition is sorted newest first and paged with skip/limit.
+        limit defaults to MENTORSHIP_PAGE_LIMIT and is capped at
+        MENTORSHIP_MAX_PAGE_LIMIT, so a user's whole history is never packed
+        into one result document. Counts always cover the whole partition.
+        With counts_only the connections themselves are not fetched.
+        """
+        match = {"$or": [{"mentor_id": user_id}, {"mentee_id": user_id}]}
+        if status:
+            match["status"] = status
+        skip = max(skip, 0)
+        limit = max(1, min(limit or MENTORSHIP_PAGE_LIMIT, MENTORSHIP_MAX_PAGE_LIMIT))
+        
+        facets = {}
+        for partition, field in (("as_mentor", "mentor_id"), ("as_mentee", "mentee_id")):
+            facets[f"{partition}_count"] = [{"$match": {field: user_id}}, {"$count": "count"}]
+            if not counts_only:
+                stages = [{"$match": {field: user_id}}, {"$sort": {"requested_at": -1, "_id": -1}}]
+                if skip:
+                    stages.append({"$skip": skip})
+                stages.append({"$limit": limit})
+                facets[partition] = stages
+        
+        result = {}
+        async for doc in self.connections_collection.aggregate([{"$match": match}, {"$facet": facets}]):
+            result = doc
+        
+        counts = {
+            partition: (result.get(f"{partition}_count") or [{"count": 0}])[0]["count"]
+            for partition in ("as_mentor", "as_mentee")
+        }
+        if counts_only:
+            return {"counts": counts}
         
         return {
-            "as_mentor": mentor_connections,
-            "as_mentee": mentee_connections
+            "as_mentor": [MentorshipConnection(**doc) for doc in result.get("as_mentor", [])],
+            "as_mentee": [MentorshipConnection(**doc) for doc in result.get("as_mentee", [])],
+            "counts": counts
         }
 
     async def get_upcoming_sessions(self, user_id: str) -> List[MentorshipSession]:
@@ -0,0 +1,111 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+def encode_cursor(sort_value: Any, tiebreaker: Any) -> str:
+    """Encode the last item's sort key and unique tiebreaker as an opaque token."""
+    if isinstance(sort_value, datetime):
+        payload = {"t": "dt", "v": sort_value.isoformat(), "id": tiebreaker}
+    else:
+        payload = {"t": "raw", "v": sort_value, "id": tiebreaker}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+# Cursor values must be plain scalars so they can never carry a query operator
+_SCALAR_TYPES = (str, int, float)
+
+def decode_cursor(token: str, sort_type: type = datetime, tiebreaker_type: type = str) -> Tuple[Any, Any]:
+    """Decode a cursor token into (sort_value, tiebreaker).
+
+    sort_type and tiebreaker_type are the types the sort and tiebreaker
+    fields hold; datetimes travel as "dt" values. Raises ValueError for
+    malformed or forged tokens, including any value that is not a scalar of
+    the expected type.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        kind, sort_value, tiebreaker = payload["t"], payload["v"], payload["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if sort_type is datetime:
+        if kind != "dt" or not isinstance(sort_value, str):
+            raise ValueError("Invalid cursor")
+        try:
+            sort_value = datetime.fromisoformat(sort_value)
+        except ValueError as e:
+            raise ValueError("Invalid cursor") from e
+    elif kind != "raw" or not _is_scalar(sort_value, sort_type):
+        raise ValueError("Invalid cursor")
+
+    if not _is_scalar(tiebreaker, tiebreaker_type):
+        raise ValueError("Invalid cursor")
+    return sort_value, tiebreaker
+
+def _is_scalar(value: Any, expected: type) -> bool:
+    # bool is an int subclass, but never a valid sort key here
+    return isinstance(value, _SCALAR_TYPES) and not isinstance(value, bool) and isinstance(value, expected)
+
+def keyset_filter(
+    sort_field: str,
+    direction: int,
+    cursor: Optional[str],
+    tiebreaker_field: str = "_id",
+    sort_type: type = datetime
+) -> dict:
+    """Build the filter selecting documents strictly after the cursor.
+
+    direction is 1 for ascending and -1 for descending; the tiebreaker is
+    ordered the same way as the sort field. sort_type is the type the sort
+    field holds (see decode_cursor).
+    """
+    if not cursor:
+        return {}
+
+    sort_value, tiebreaker = decode_cursor(cursor, sort_type)
+    op = "$gt" if direction == 1 else "$lt"
+    if sort_field == tiebreaker_field:
+        return {tiebreaker_field: {op: tiebreaker}}
+
+    return {
+        "$or": [
+            {sort_field: {op: sort_value}},
+            {sort_field: sort_value, tiebreaker_field: {op: tiebreaker}}
+        ]
+    }
+
+def next_page_cursor(last_doc: Optional[dict], returned: int, limit: Optional[int], sort_field: str, tiebreaker_field: str = "_id") -> Optional[str]:
+    """Cursor for the page after last_doc, or None when the page was not full."""
+    if not limit or last_doc is None or returned < limit:
+        return None
+    return encode_cursor(last_doc.get(sort_field), last_doc[tiebreaker_field])
+
+def paginate_items(
+    items: List[dict],
+    sort_field: str,
+    direction: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    tiebreaker_field: str = "_id",
+    sort_type: type = datetime,
+    tiebreaker_type: type = str
+) -> Tuple[List[dict], Optional[str]]:
+    """Keyset-paginate an in-memory list the same way keyset_filter does a query.
+
+    sort_type and tiebreaker_type are the types the items hold (see
+    decode_cursor); a cursor of any other shape raises ValueError.
+    """
+    reverse = direction == -1
+    ordered = sorted(items, key=lambda item: (item[sort_field], item[tiebreaker_field]), reverse=reverse)
+
+    if cursor:
+        after = decode_cursor(cursor, sort_type, tiebreaker_type)
+        if reverse:
+            ordered = [item for item in ordered if (item[sort_field], item[tiebreaker_field]) < after]
+        else:
+            ordered = [item for item in ordered if (item[sort_field], item[tiebreaker_field]) > after]
+
+    page = ordered[:limit]
+    return page, next_page_cursor(page[-1] if page else None, len(page), limit, sort_field, tiebreaker_field)
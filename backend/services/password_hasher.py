@@ -0,0 +1,90 @@
+import asyncio
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict
+from passlib.context import CryptContext
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify jobs are already queued."""
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded thread pool."""
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 64):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hasher"
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many authentication requests, try again shortly")
+
+        loop = asyncio.get_running_loop()
+        job = self._get_executor().submit(func, *args)
+        self.in_flight += 1
+        # The slot is released when the job itself ends, not when the request
+        # does: a cancelled request leaves a started bcrypt job running
+        job.add_done_callback(lambda finished: self._release(loop, finished))
+        return await asyncio.wrap_future(job)
+
+    def _release(self, loop: asyncio.AbstractEventLoop, job: Future):
+        # Runs on the worker thread, or on the loop if a queued job was cancelled
+        try:
+            loop.call_soon_threadsafe(self._job_done, job)
+        except RuntimeError:
+            # Event loop already closed at shutdown
+            pass
+
+    def _job_done(self, job: Future):
+        self.in_flight -= 1
+        if job.cancelled() or job.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the worker pool."""
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password on the worker pool."""
+        return await self._run(pwd_context.verify, password, hashed_password)
+
+    def shutdown(self):
+        """Stop the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool utilization counters."""
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "queue_depth": max(self.in_flight - self.max_workers, 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
+
+password_hasher = PasswordHasher(
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "4")),
+    max_pending=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "64"))
+)
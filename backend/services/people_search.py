@@ -0,0 +1,79 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+# Prefix keys are stored from MIN_PREFIX up to MAX_PREFIX characters per token
+MIN_PREFIX = 2
+MAX_PREFIX = 16
+MAX_QUERY_TOKENS = 5
+
+# Fields that feed search_keys, most important first (also the ranking order)
+SEARCH_FIELDS = ("full_name", "email", "job_title", "company")
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+def normalize(text: Optional[str]) -> str:
+    """Lower-case and strip accents so "José" and "jose" match."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split normalized text into alphanumeric tokens."""
+    return [token for token in _TOKEN_SPLIT.split(normalize(text)) if token]
+
+def _field_tokens(field: str, value: Optional[str]) -> List[str]:
+    tokens = tokenize(value)
+    if field == "email" and value:
+        # The whole local part as well, so "jsmith" finds j.smith@...
+        local = normalize(value).split("@", 1)[0]
+        tokens.append(_TOKEN_SPLIT.sub("", local))
+    return tokens
+
+def build_search_keys(doc: Dict) -> List[str]:
+    """Prefix keys for every token of the searchable fields of a user document."""
+    keys = set()
+    for field in SEARCH_FIELDS:
+        for token in _field_tokens(field, doc.get(field)):
+            for length in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1):
+                keys.add(token[:length])
+    return sorted(keys)
+
+def build_exact_keys(doc: Dict) -> List[str]:
+    """Whole-token keys of the searchable fields, cut to MAX_PREFIX like query keys."""
+    keys = set()
+    for field in SEARCH_FIELDS:
+        for token in _field_tokens(field, doc.get(field)):
+            if len(token) >= MIN_PREFIX:
+                keys.add(token[:MAX_PREFIX])
+    return sorted(keys)
+
+def search_index_fields(doc: Dict) -> Dict[str, List[str]]:
+    """The stored search fields for a user document: prefix keys and exact keys."""
+    return {"search_keys": build_search_keys(doc), "search_exact": build_exact_keys(doc)}
+
+def query_keys(query: str) -> List[str]:
+    """Index keys for a search query; empty if nothing is long enough to search."""
+    tokens = [token[:MAX_PREFIX] for token in tokenize(query) if len(token) >= MIN_PREFIX]
+    # Longest tokens first: the most selective key drives the index scan
+    return sorted(set(tokens), key=len, reverse=True)[:MAX_QUERY_TOKENS]
+
+def match_score(doc: Dict, query: str) -> float:
+    """Rank a candidate: exact token matches beat prefix matches, earlier fields beat later ones."""
+    field_tokens = [(weight, _field_tokens(field, doc.get(field))) for weight, field in zip((8, 6, 4, 2), SEARCH_FIELDS)]
+
+    score = 0.0
+    for key in query_keys(query):
+        best = 0.0
+        for weight, tokens in field_tokens:
+            if key in tokens:
+                best = max(best, weight * 2)
+            elif any(token.startswith(key) for token in tokens):
+                best = max(best, weight)
+        score += best
+
+    # A query that is the start of the whole name ("jane sm") ranks first
+    if normalize(doc.get("full_name")).startswith(" ".join(tokenize(query))):
+        score += 1
+    return score
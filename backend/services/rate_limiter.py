@@ -0,0 +1,84 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Absorbs float rounding when a key sits exactly at its burst allowance
+TOLERANCE_EPSILON = 1e-9
+
+class RateLimitPolicy:
+    """Allow `limit` requests per `period_seconds`, with bursts up to `burst`."""
+
+    def __init__(self, name: str, limit: int, period_seconds: float = 60.0, burst: Optional[int] = None):
+        self.name = name
+        self.limit = limit
+        self.period_seconds = period_seconds
+        self.burst = burst or limit
+        # GCRA parameters: one request "costs" emission_interval seconds and a
+        # key may run up to tolerance seconds ahead of real time
+        self.emission_interval = period_seconds / limit
+        self.tolerance = self.emission_interval * self.burst
+
+class RateLimiter:
+    """GCRA (token bucket equivalent) limiter with bounded, LRU-evicted state.
+
+    Each key stores a single float, its theoretical arrival time, so checks
+    are O(1) and memory is fixed per key. A key whose arrival time is in the
+    past holds no state worth keeping, so evicting idle keys is lossless.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # {key: theoretical arrival time} ordered from least to most recently used
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+
+    def hit(self, key: str, policy: RateLimitPolicy, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Record a request; returns (allowed, seconds until the next one would be allowed)."""
+        if now is None:
+            now = time.monotonic()
+
+        # How far ahead of now the key would run after this request; computed
+        # from the difference so a fresh key costs exactly one interval
+        ahead = max(self._tat.get(key, now) - now, 0.0) + policy.emission_interval
+
+        if ahead > policy.tolerance + TOLERANCE_EPSILON:
+            self.limited += 1
+            if key in self._tat:
+                self._tat.move_to_end(key)
+            return False, ahead - policy.tolerance
+
+        self._tat[key] = now + ahead
+        self._tat.move_to_end(key)
+        if len(self._tat) > self.max_keys:
+            self._tat.popitem(last=False)
+            self.evictions += 1
+
+        self.allowed += 1
+        return True, 0.0
+
+    def stats(self) -> Dict[str, int]:
+        """Get limiter counters."""
+        return {
+            "tracked_keys": len(self._tat),
+            "max_keys": self.max_keys,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evictions": self.evictions
+        }
+
+DEFAULT_POLICY = RateLimitPolicy("default", int(os.environ.get("RATE_LIMIT_PER_MINUTE", "100")))
+
+# Per-route policies, first matching path prefix wins
+ROUTE_POLICIES: List[Tuple[str, RateLimitPolicy]] = [
+    ("/api/auth/", RateLimitPolicy("auth", int(os.environ.get("AUTH_RATE_LIMIT_PER_MINUTE", "20")))),
+]
+
+def policy_for_path(path: str) -> RateLimitPolicy:
+    """Get the rate limit policy that applies to a request path."""
+    for prefix, policy in ROUTE_POLICIES:
+        if path.startswith(prefix):
+            return policy
+    return DEFAULT_POLICY
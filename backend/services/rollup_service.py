@@ -0,0 +1,226 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from pymongo import UpdateOne
+from database.connection import db_collections
+
+# Daily counters kept in daily_rollups
+METRICS = (
+    "new_users",
+    "courses_created",
+    "enrollments",
+    "completions",
+    "mentorship_requests",
+    "mentorship_sessions",
+    "chat_messages",
+)
+
+# Running all-time totals live next to the daily documents
+TOTALS_ID = "totals"
+
+# Source collection and timestamp field each metric is rebuilt from by backfill()
+BACKFILL_SOURCES = {
+    "new_users": ("users", "created_at", {}),
+    "courses_created": ("courses", "created_at", {}),
+    "enrollments": ("course_progress", "enrollment_date", {}),
+    "completions": ("course_progress", "completion_date", {"is_completed": True}),
+    "mentorship_requests": ("mentorship_connections", "requested_at", {}),
+    "mentorship_sessions": ("mentorship_sessions", "created_at", {}),
+    "chat_messages": ("chat_messages", "created_at", {}),
+}
+
+def day_key(when: datetime) -> str:
+    """Rollup document id for the day containing `when`."""
+    return when.strftime("%Y-%m-%d")
+
+class RollupService:
+    """Pre-aggregated daily platform counters.
+
+    Writers call record(), which only bumps an in-memory pending count. A
+    background task folds pending counts into one daily_rollups document
+    per day plus a running totals document using $inc upserts, so reading
+    platform statistics touches at most one document per day requested
+    instead of scanning the source collections.
+    """
+
+    def __init__(self, flush_interval: float = 5.0):
+        self.flush_interval = flush_interval
+        # {day: {metric: count}} not yet written
+        self._pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.recorded = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def record(self, metric: str, amount: int = 1, when: Optional[datetime] = None):
+        """Count `amount` events of `metric` without touching the database."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown rollup metric: {metric}")
+        self._pending[day_key(when or datetime.now())][metric] += amount
+        self.recorded += amount
+
+    async def start(self):
+        """Build the rollups if they have never been built, then start the background flusher."""
+        if self._flush_task is None:
+            await self.ensure_backfilled()
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out pending counts."""
+        if self._flush_task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._flush_task
+            self._flush_task = None
+            self._wakeup = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """Write pending counts; on failure they are kept for the next flush."""
+        if not self._pending:
+            return True
+
+        pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+
+        totals: Dict[str, int] = defaultdict(int)
+        operations = []
+        for day, counts in pending.items():
+            for metric, count in counts.items():
+                totals[metric] += count
+            operations.append(UpdateOne(
+                {"_id": day},
+                {"$inc": dict(counts), "$setOnInsert": {"date": datetime.strptime(day, "%Y-%m-%d")}},
+                upsert=True
+            ))
+        operations.append(UpdateOne({"_id": TOTALS_ID}, {"$inc": dict(totals)}, upsert=True))
+
+        try:
+            await db_collections.daily_rollups.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"Rollup flush failed, will retry: {e}")
+            self.failed_flushes += 1
+            for day, counts in pending.items():
+                for metric, count in counts.items():
+                    self._pending[day][metric] += count
+            return False
+
+        self.flushes += 1
+        return True
+
+    async def get_totals(self) -> Dict[str, int]:
+        """Get all-time totals, including counts not flushed yet."""
+        doc = await db_collections.analytics("daily_rollups").find_one({"_id": TOTALS_ID}) or {}
+        totals = {metric: doc.get(metric, 0) for metric in METRICS}
+        for counts in self._pending.values():
+            for metric, count in counts.items():
+                totals[metric] += count
+        return totals
+
+    async def get_daily(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Get one row of counters per day for the last `days` days, oldest first."""
+        today = datetime.now()
+        keys = [day_key(today - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+
+        stored = {}
+        cursor = db_collections.analytics("daily_rollups").find({"_id": {"$gte": keys[0], "$lte": keys[-1]}})
+        async for doc in cursor:
+            stored[doc["_id"]] = doc
+
+        rows = []
+        for key in keys:
+            doc = stored.get(key, {})
+            pending = self._pending.get(key, {})
+            row = {"date": key}
+            for metric in METRICS:
+                row[metric] = doc.get(metric, 0) + pending.get(metric, 0)
+            rows.append(row)
+        return rows
+
+    async def backfill(self) -> Dict[str, int]:
+        """Rebuild every rollup document from the source collections.
+
+        Meant for first deployment or repair; it scans each source collection
+        once with a $group by day and overwrites the stored counters. Pending
+        counts are dropped because the scan already sees their documents; run
+        it when writes are quiet, as events recorded during the scan can be
+        counted twice.
+        """
+        self._pending = defaultdict(lambda: defaultdict(int))
+        daily: Dict[str, Dict[str, int]] = defaultdict(dict)
+        totals: Dict[str, int] = {}
+
+        for metric, (collection_name, field, match) in BACKFILL_SOURCES.items():
+            pipeline = [
+                {"$match": {**match, field: {"$type": "date"}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${field}"}},
+                    "count": {"$sum": 1}
+                }}
+            ]
+            total = 0
+            async for doc in db_collections[collection_name].aggregate(pipeline):
+                daily[doc["_id"]][metric] = doc["count"]
+                total += doc["count"]
+            totals[metric] = total
+
+        operations = [
+            UpdateOne(
+                {"_id": day},
+                {"$set": {
+                    **{metric: counts.get(metric, 0) for metric in METRICS},
+                    "date": datetime.strptime(day, "%Y-%m-%d")
+                }},
+                upsert=True
+            )
+            for day, counts in daily.items()
+        ]
+        operations.append(UpdateOne({"_id": TOTALS_ID}, {"$set": totals}, upsert=True))
+        await db_collections.daily_rollups.delete_many({"_id": {"$nin": list(daily) + [TOTALS_ID]}})
+        await db_collections.daily_rollups.bulk_write(operations, ordered=False)
+        return totals
+
+    async def ensure_backfilled(self) -> bool:
+        """Run backfill() when there is no totals document yet; returns whether it ran.
+
+        This covers first deployment on an existing database, where the
+        totals would otherwise start from zero. A failure is logged and
+        startup carries on.
+        """
+        try:
+            if await db_collections.daily_rollups.find_one({"_id": TOTALS_ID}, {"_id": 1}) is not None:
+                return False
+            totals = await self.backfill()
+        except Exception as e:
+            print(f"Rollup backfill failed, statistics will only count new events: {e}")
+            return False
+        print(f"Rollups backfilled from the source collections: {totals}")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get flusher counters."""
+        return {
+            "pending_days": len(self._pending),
+            "flush_interval_seconds": self.flush_interval,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes
+        }
+
+rollup_service = RollupService(
+    flush_interval=float(os.environ.get("ROLLUP_FLUSH_INTERVAL_SECONDS", "5.0"))
+)
@@ -1,31 +1,101 @@
+import os
+import time
 import uuid
 import hashlib
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
-from collections import defaultdict
+from typing import List, Optional, Dict, Any, Tuple
+from pymongo import UpdateOne
 from models.security import (
     AuditLog, SecurityEvent, Permission, Role, UserRole,
     AccessControl, LoginAttempt, SecuritySettings, ActionType, Severity
 )
 from models.user import UserRole as UserRoleEnum
-from database.connection import get_database
+from database.connection import db_collections
+from services.audit_sink import audit_sink
+from services.cache import TTLCache
+from services.rate_limiter import policy_for_path
+from services.counter_store import create_counter_store
+
+# Bump when DEFAULT_PERMISSIONS or DEFAULT_ROLES change so startup seeds them
+# again. Seeding only inserts missing documents; it never overwrites roles
+# or permissions an admin has edited.
+SEED_VERSION = 1
+
+# Edits to documents seeded by earlier versions, applied once when upgrading
+# past that version: {version: [(collection name, filter, update)]}
+SEED_MIGRATIONS: Dict[int, List[Tuple[str, Dict, Dict]]] = {}
+
+DEFAULT_PERMISSIONS = [
+    {"_id": "read_courses", "name": "Read Courses", "description": "View courses", "resource": "course", "action": "read"},
+    {"_id": "enroll_course", "name": "Enroll in Course", "description": "Enroll in courses", "resource": "course", "action": "enroll"},
+    {"_id": "create_course", "name": "Create Course", "description": "Create new courses", "resource": "course", "action": "create"},
+    {"_id": "manage_users", "name": "Manage Users", "description": "Manage user accounts", "resource": "user", "action": "manage"},
+    {"_id": "view_analytics", "name": "View Analytics", "description": "Access analytics data", "resource": "analytics", "action": "read"},
+    {"_id": "mentor_access", "name": "Mentor Access", "description": "Access mentorship features", "resource": "mentorship", "action": "mentor"},
+    {"_id": "admin_access", "name": "Admin Access", "description": "Full system access", "resource": "system", "action": "admin"},
+]
+
+DEFAULT_ROLES = [
+    {
+        "_id": "learner",
+        "name": "Learner",
+        "description": "Standard learner role",
+        "permissions": ["read_courses", "enroll_course"],
+        "is_system_role": True
+    },
+    {
+        "_id": "mentor",
+        "name": "Mentor",
+        "description": "Mentor role with additional privileges",
+        "permissions": ["read_courses", "enroll_course", "mentor_access"],
+        "is_system_role": True
+    },
+    {
+        "_id": "instructor",
+        "name": "Instructor",
+        "description": "Course instructor role",
+        "permissions": ["read_courses", "enroll_course", "create_course", "mentor_access"],
+        "is_system_role": True
+    },
+    {
+        "_id": "admin",
+        "name": "Administrator",
+        "description": "Full system administrator",
+        "permissions": ["read_courses", "enroll_course", "create_course", "manage_users", "view_analytics", "mentor_access", "admin_access"],
+        "is_system_role": True
+    }
+]
 
 class SecurityService:
     def __init__(self):
-        self.failed_attempts = defaultdict(int)  # ip -> count
-        self.attempt_timestamps = defaultdict(list)  # ip -> [timestamps]
+        self.settings = SecuritySettings()
+        # GCRA rate limits and sliding-window lockout counters, per process or shared
+        self.counter_store = create_counter_store()
+        self.rate_limit_events = TTLCache(max_size=10000, ttl_seconds=60)
+        # {role_id: frozenset of permissions}, reloaded after role_table_ttl so
+        # role edits made by other workers are picked up
+        self.role_permissions: Dict[str, frozenset] = {}
+        self.role_permissions_loaded_at: Optional[float] = None
+        self.role_table_ttl = float(os.environ.get("ROLE_TABLE_TTL_SECONDS", "300"))
+        # Role ids with no role document, remembered until the next table
+        # reload so a dangling assignment is not looked up on every check
+        self.missing_roles = TTLCache(max_size=1000, ttl_seconds=self.role_table_ttl)
+        # {user_id: frozenset of permissions}
+        self.permission_cache = TTLCache(
+            max_size=int(os.environ.get("PERMISSION_CACHE_MAX_SIZE", "10000")),
+            ttl_seconds=float(os.environ.get("PERMISSION_CACHE_TTL_SECONDS", "60"))
+        )
 
     def _get_collections(self):
         """Get security collections."""
-        db = get_database()
         return (
-            db.audit_logs,
-            db.security_events,
-            db.permissions,
-            db.roles,
-            db.user_roles,
-            db.access_control,
-            db.login_attempts
+            db_collections.audit_logs,
+            db_collections.security_events,
+            db_collections.permissions,
+            db_collections.roles,
+            db_collections.user_roles,
+            db_collections.access_control,
+            db_collections.login_attempts
         )
 
     async def log_audit_event(
@@ -67,6 +137,35 @@ class SecurityService:
         
         await audit_collection.insert_one(audit_doc)
 
+    def enqueue_audit_event(
+        self,
+        user_id: Optional[str],
+        action: ActionType,
+        resource: str,
+        resource_id: Optional[str] = None,
+        details: Dict[str, Any] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        method: Optional[str] = None,
+        status_code: Optional[int] = None,
+        severity: Severity = Severity.LOW
+    ):
+        """Queue an audit event for a batched write instead of inserting inline."""
+        audit_sink.submit({
+            "user_id": user_id,
+            "action": action,
+            "resource": resource,
+            "resource_id": resource_id,
+            "details": details or {},
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "endpoint": endpoint,
+            "method": method,
+            "status_code": status_code,
+            "severity": severity
+        })
+
     async def log_security_event(
         self,
         event_type: str,
@@ -96,32 +195,27 @@ class SecurityService:
         
         await events_collection.insert_one(event_doc)
 
-    async def check_rate_limit(self, ip_address: str, limit_per_minute: int = 100) -> bool:
-        """Check if IP address is within rate limits."""
-        now = datetime.now()
-        minute_ago = now - timedelta(minutes=1)
-        
-        # Clean old timestamps
-        self.attempt_timestamps[ip_address] = [
-            ts for ts in self.attempt_timestamps[ip_address] 
-            if ts > minute_ago
-        ]
-        
-        # Check current count
-        current_count = len(self.attempt_timestamps[ip_address])
-        
-        if current_count >= limit_per_minute:
-            await self.log_security_event(
-                event_type="rate_limit_exceeded",
-                severity=Severity.MEDIUM,
-                description=f"Rate limit exceeded for IP {ip_address}",
-                ip_address=ip_address,
-                metadata={"attempts": current_count, "limit": limit_per_minute}
-            )
+    async def check_rate_limit(self, ip_address: str, path: str = "") -> bool:
+        """Check if IP address is within the rate limit for the requested route."""
+        policy = policy_for_path(path)
+        key = f"{policy.name}:{ip_address}"
+        
+        # GCRA either per process or, with a shared store, across every worker and node
+        allowed, retry_after = await self.counter_store.acquire(f"rate:{key}", policy)
+        
+        if not allowed:
+            # One security event per key per window rather than per rejected request
+            if self.rate_limit_events.get(key) is None:
+                self.rate_limit_events.set(key, True, ttl_seconds=policy.period_seconds)
+                await self.log_security_event(
+                    event_type="rate_limit_exceeded",
+                    severity=Severity.MEDIUM,
+                    description=f"Rate limit exceeded for IP {ip_address}",
+                    ip_address=ip_address,
+                    metadata={"policy": policy.name, "limit": policy.limit, "retry_after": round(retry_after, 2)}
+                )
             return False
         
-        # Add current attempt
-        self.attempt_timestamps[ip_address].append(now)
         return True
 
     async def record_login_attempt(
@@ -152,88 +246,129 @@ class SecurityService:
         await attempts_collection.insert_one(attempt_doc)
         
         # Track failed attempts for account lockout
+        lockout_key = f"lockout:{email}"
+        lockout_window = self.settings.lockout_duration_minutes * 60
         if not success:
-            self.failed_attempts[email] += 1
+            attempts = await self.counter_store.hit(lockout_key, lockout_window)
             
-            if self.failed_attempts[email] >= 5:  # Configurable
+            if attempts >= self.settings.max_failed_attempts:
                 await self.log_security_event(
                     event_type="account_lockout",
                     severity=Severity.HIGH,
                     description=f"Account locked due to failed login attempts: {email}",
                     ip_address=ip_address,
-                    metadata={"email": email, "attempts": self.failed_attempts[email]}
+                    metadata={"email": email, "attempts": int(attempts)}
                 )
         else:
             # Reset failed attempts on successful login
-            self.failed_attempts[email] = 0
+            await self.counter_store.reset(lockout_key, lockout_window)
 
     async def is_account_locked(self, email: str) -> bool:
-        """Check if account is locked due to failed attempts."""
-        return self.failed_attempts[email] >= 5
+        """Check if account is locked due to recent failed attempts."""
+        attempts = await self.counter_store.count(
+            f"lockout:{email}",
+            self.settings.lockout_duration_minutes * 60
+        )
+        return attempts >= self.settings.max_failed_attempts
 
     async def initialize_default_roles(self):
-        """Initialize default system roles."""
+        """Seed missing default permissions and system roles, skipping work already done.
+
+        Existing documents are left as they are, so admin edits to system
+        roles survive a reseed; SEED_MIGRATIONS newer than the stored seed
+        version are applied once.
+        """
         _, _, permissions_collection, roles_collection, _, _, _ = self._get_collections()
+        manifest_collection = db_collections.seed_manifest
+        
+        manifest = await manifest_collection.find_one({"_id": "security_roles"})
+        seeded_version = manifest.get("version", 0) if manifest else 0
+        if seeded_version != SEED_VERSION:
+            # One bulk upsert per collection instead of a find/insert per document
+            await permissions_collection.bulk_write([
+                UpdateOne(
+                    {"_id": permission["_id"]},
+                    {"$setOnInsert": {k: v for k, v in permission.items() if k != "_id"}},
+                    upsert=True
+                )
+                for permission in DEFAULT_PERMISSIONS
+            ], ordered=False)
+            
+            now = datetime.now()
+            await roles_collection.bulk_write([
+                UpdateOne(
+                    {"_id": role["_id"]},
+                    {"$setOnInsert": {**{k: v for k, v in role.items() if k != "_id"}, "created_at": now}},
+                    upsert=True
+                )
+                for role in DEFAULT_ROLES
+            ], ordered=False)
+            
+            for version in sorted(SEED_MIGRATIONS):
+                if seeded_version < version <= SEED_VERSION:
+                    for collection_name, filter_query, update in SEED_MIGRATIONS[version]:
+                        await db_collections[collection_name].update_many(filter_query, update)
+            
+            await manifest_collection.update_one(
+                {"_id": "security_roles"},
+                {"$set": {"version": SEED_VERSION, "seeded_at": now}},
+                upsert=True
+            )
         
-        # Default permissions
-        default_permissions = [
-            {"_id": "read_courses", "name": "Read Courses", "description": "View courses", "resource": "course", "action": "read"},
-            {"_id": "enroll_course", "name": "Enroll in Course", "description": "Enroll in courses", "resource": "course", "action": "enroll"},
-            {"_id": "create_course", "name": "Create Course", "description": "Create new courses", "resource": "course", "action": "create"},
-            {"_id": "manage_users", "name": "Manage Users", "description": "Manage user accounts", "resource": "user", "action": "manage"},
-            {"_id": "view_analytics", "name": "View Analytics", "description": "Access analytics data", "resource": "analytics", "action": "read"},
-            {"_id": "mentor_access", "name": "Mentor Access", "description": "Access mentorship features", "resource": "mentorship", "action": "mentor"},
-            {"_id": "admin_access", "name": "Admin Access", "description": "Full system access", "resource": "system", "action": "admin"},
-        ]
-        
-        # Insert permissions if they don't exist
-        for permission in default_permissions:
-            existing = await permissions_collection.find_one({"_id": permission["_id"]})
-            if not existing:
-                await permissions_collection.insert_one(permission)
-        
-        # Default roles
-        default_roles = [
-            {
-                "_id": "learner",
-                "name": "Learner",
-                "description": "Standard learner role",
-                "permissions": ["read_courses", "enroll_course"],
-                "is_system_role": True
-            },
-            {
-                "_id": "mentor",
-                "name": "Mentor",
-                "description": "Mentor role with additional privileges",
-                "permissions": ["read_courses", "enroll_course", "mentor_access"],
-                "is_system_role": True
-            },
-            {
-                "_id": "instructor",
-                "name": "Instructor",
-                "description": "Course instructor role",
-                "permissions": ["read_courses", "enroll_course", "create_course", "mentor_access"],
-                "is_system_role": True
-            },
-            {
-                "_id": "admin",
-                "name": "Administrator",
-                "description": "Full system administrator",
-                "permissions": ["read_courses", "enroll_course", "create_course", "manage_users", "view_analytics", "mentor_access", "admin_access"],
-                "is_system_role": True
-            }
+        await self.load_role_permissions()
+
+    async def load_role_permissions(self):
+        """Load the role -> permissions table and drop cached user permissions."""
+        _, _, _, roles_collection, _, _, _ = self._get_collections()
+        
+        role_permissions = {}
+        async for role_doc in roles_collection.find({}, {"permissions": 1}):
+            role_permissions[role_doc["_id"]] = frozenset(role_doc.get("permissions", []))
+        
+        self.role_permissions = role_permissions
+        self.role_permissions_loaded_at = time.monotonic()
+        self.missing_roles.clear()
+        self.permission_cache.clear()
+
+    async def _get_role_permissions(self) -> Dict[str, frozenset]:
+        """Get the role table, reloading it when missing or stale."""
+        if (
+            self.role_permissions_loaded_at is None
+            or time.monotonic() - self.role_permissions_loaded_at > self.role_table_ttl
+        ):
+            await self.load_role_permissions()
+        return self.role_permissions
+
+    async def _resolve_roles(self, role_ids: List[str]) -> Dict[str, frozenset]:
+        """Get the role table, looking up any of role_ids it does not hold yet.
+
+        Roles created since the table was loaded are added to it without
+        dropping any cached permissions; ids with no role document are
+        remembered in missing_roles until the table is next reloaded.
+        """
+        role_permissions = await self._get_role_permissions()
+        unknown = [
+            role_id for role_id in role_ids
+            if role_id not in role_permissions and self.missing_roles.get(role_id) is None
         ]
-        
-        # Insert roles if they don't exist
-        for role in default_roles:
-            existing = await roles_collection.find_one({"_id": role["_id"]})
-            if not existing:
-                role["created_at"] = datetime.now()
-                await roles_collection.insert_one(role)
+        if unknown:
+            _, _, _, roles_collection, _, _, _ = self._get_collections()
+            async for role_doc in roles_collection.find({"_id": {"$in": unknown}}, {"permissions": 1}):
+                role_permissions[role_doc["_id"]] = frozenset(role_doc.get("permissions", []))
+            for role_id in unknown:
+                if role_id not in role_permissions:
+                    self.missing_roles.set(role_id, True)
+        return role_permissions
 
     async def assign_role_to_user(self, user_id: str, role_id: str, assigned_by: str):
-        """Assign a role to a user."""
-        _, _, _, _, user_roles_collection, _, _ = self._get_collections()
+        """Assign a role to a user; raises ValueError if the role does not exist."""
+        _, _, _, roles_collection, user_roles_collection, _, _ = self._get_collections()
+        
+        role_doc = await roles_collection.find_one({"_id": role_id}, {"permissions": 1})
+        if role_doc is None:
+            raise ValueError(f"Role not found: {role_id}")
+        self.role_permissions[role_id] = frozenset(role_doc.get("permissions", []))
+        self.missing_roles.invalidate(role_id)
         
         # Remove existing role assignment
         await user_roles_collection.delete_many({"user_id": user_id})
@@ -250,6 +385,11 @@ class SecurityService:
         
         await user_roles_collection.insert_one(user_role_doc)
         
+        # Role changes must not be masked by a cached profile or permission set
+        from services.user_service import user_service
+        user_service.invalidate_cached_user(user_id)
+        self.permission_cache.invalidate(user_id)
+        
         await self.log_audit_event(
             user_id=assigned_by,
             action=ActionType.UPDATE,
@@ -259,31 +399,39 @@ class SecurityService:
             severity=Severity.MEDIUM
         )
 
-    async def get_user_permissions(self, user_id: str) -> List[str]:
-        """Get all permissions for a user based on their roles."""
-        _, _, permissions_collection, roles_collection, user_roles_collection, _, _ = self._get_collections()
-        
-        # Get user's roles
-        user_roles_cursor = user_roles_collection.find({"user_id": user_id})
-        role_ids = []
-        async for user_role_doc in user_roles_cursor:
-            role_ids.append(user_role_doc["role_id"])
+    async def get_user_permission_set(self, user_id: str) -> frozenset:
+        """Get a user's permissions from their roles, cached per user.
+
+        Role assignments made on this worker take effect at once. Those made
+        on another worker, revocations included, only take effect here once
+        the cached entry expires (PERMISSION_CACHE_TTL_SECONDS, 60 by
+        default); edits to a role's permissions once the role table is
+        reloaded (ROLE_TABLE_TTL_SECONDS).
+        """
+        permissions = self.permission_cache.get(user_id)
+        if permissions is not None:
+            return permissions
         
-        if not role_ids:
-            return []
+        _, _, _, _, user_roles_collection, _, _ = self._get_collections()
         
-        # Get permissions from roles
-        roles_cursor = roles_collection.find({"_id": {"$in": role_ids}})
-        permissions = set()
-        async for role_doc in roles_cursor:
-            permissions.update(role_doc.get("permissions", []))
+        # Get user's roles
+        role_ids = [
+            user_role_doc["role_id"]
+            async for user_role_doc in user_roles_collection.find({"user_id": user_id}, {"role_id": 1})
+        ]
         
-        return list(permissions)
+        role_permissions = await self._resolve_roles(role_ids)
+        permissions = frozenset().union(*(role_permissions.get(role_id, ()) for role_id in role_ids))
+        self.permission_cache.set(user_id, permissions)
+        return permissions
+
+    async def get_user_permissions(self, user_id: str) -> List[str]:
+        """Get all permissions for a user based on their roles."""
+        return list(await self.get_user_permission_set(user_id))
 
     async def has_permission(self, user_id: str, permission: str) -> bool:
         """Check if user has a specific permission."""
-        user_permissions = await self.get_user_permissions(user_id)
-        return permission in user_permissions
+        return permission in await self.get_user_permission_set(user_id)
 
     async def get_security_summary(self) -> Dict[str, Any]:
         """Get security summary dashboard."""
@@ -297,13 +445,11 @@ class SecurityService:
             recent_events.append(SecurityEvent(**event_doc))
         
         # Failed login attempts (last 24 hours)
-        failed_attempts_cursor = attempts_collection.find({
+        failed_attempts_count = await attempts_collection.count_documents({
             "success": False,
             "timestamp": {"$gte": yesterday}
         })
         
-        failed_attempts_count = await failed_attempts_cursor.count()
-        
         # High severity events
         high_severity_count = await events_collection.count_documents({
             "severity": {"$in": ["high", "critical"]},
@@ -315,7 +461,10 @@ class SecurityService:
             "failed_login_attempts_24h": failed_attempts_count,
             "high_severity_events_24h": high_severity_count,
             "total_audit_logs": await audit_collection.count_documents({}),
-            "account_lockouts": len([k for k, v in self.failed_attempts.items() if v >= 5])
+            "account_lockouts": await events_collection.count_documents({
+                "event_type": "account_lockout",
+                "timestamp": {"$gte": yesterday}
+            })
         }
 
 def get_security_service():
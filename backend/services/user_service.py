@@ -1,20 +1,35 @@
+import os
 import uuid
 from datetime import datetime
-from typing import List, Optional
-from passlib.context import CryptContext
+from typing import List, Optional, Tuple
 from jose import JWTError, jwt
 from models.user import UserProfile, UserCreate, UserUpdate, UserResponse, UserLogin
-from database.connection import get_database
+from database.connection import db_collections
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.errors import DuplicateKeyError
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from services.cache import TTLCache
+from services.password_hasher import password_hasher
+from services.rollup_service import rollup_service
+from services.pagination import keyset_filter, next_page_cursor
+from services.people_search import SEARCH_FIELDS, query_keys, match_score, search_index_fields
 
 # JWT settings
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Candidates fetched from the index before ranking; also the most results a search pages through
+SEARCH_CANDIDATE_LIMIT = int(os.environ.get("USER_SEARCH_CANDIDATE_LIMIT", "500"))
+
+# Stored fields user responses never need
+USER_PROJECTION = {"search_keys": 0, "search_exact": 0, "hashed_password": 0}
+
+# Resolved users for authenticated requests: {user_id: UserResponse}
+user_cache = TTLCache(
+    max_size=int(os.environ.get("USER_CACHE_MAX_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+)
+
 # Global user service instance (will be initialized when needed)
 user_service = None
 
@@ -24,15 +39,14 @@ class UserService:
 
     def _get_collection(self):
         """Get users collection from database."""
-        db = get_database()
-        return db.users
+        return db_collections.users
 
     async def create_user(self, user_data: UserCreate) -> UserResponse:
         """Create a new user."""
         collection = self._get_collection()
         try:
             # Hash password
-            hashed_password = pwd_context.hash(user_data.password)
+            hashed_password = await password_hasher.hash(user_data.password)
             
             # Create user profile
             user_id = str(uuid.uuid4())
@@ -47,9 +61,11 @@ class UserService:
             user_doc = user_profile.dict()
             user_doc["hashed_password"] = hashed_password
             user_doc["_id"] = user_id
+            user_doc.update(search_index_fields(user_doc))
             
             # Insert into database
             await collection.insert_one(user_doc)
+            rollup_service.record("new_users", when=user_profile.created_at)
             
             return UserResponse(**user_profile.dict())
         except DuplicateKeyError:
@@ -62,7 +78,7 @@ class UserService:
         if not user_doc:
             return None
             
-        if not pwd_context.verify(login_data.password, user_doc["hashed_password"]):
+        if not await password_hasher.verify(login_data.password, user_doc["hashed_password"]):
             return None
             
         return UserResponse(**user_doc)
@@ -75,6 +91,21 @@ class UserService:
             return None
         return UserResponse(**user_doc)
 
+    async def get_cached_user(self, user_id: str) -> Optional[UserResponse]:
+        """Get user by ID, serving repeat lookups from the in-process cache."""
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+
+        user = await self.get_user(user_id)
+        if user is not None:
+            user_cache.set(user_id, user)
+        return user
+
+    def invalidate_cached_user(self, user_id: str):
+        """Drop a user from the cache after their document changes."""
+        user_cache.invalidate(user_id)
+
     async def get_user_by_email(self, email: str) -> Optional[UserResponse]:
         """Get user by email."""
         collection = self._get_collection()
@@ -84,20 +115,42 @@ class UserService:
         return UserResponse(**user_doc)
 
     async def update_user(self, user_id: str, user_data: UserUpdate) -> Optional[UserResponse]:
-        """Update user profile."""
+        """Update user profile.
+
+        Edits to a searchable field rebuild the search keys from the merged
+        document in the same write. That write only applies if the other
+        searchable fields still hold the values read, and is retried if a
+        concurrent update changed them.
+        """
         collection = self._get_collection()
         update_data = {k: v for k, v in user_data.dict().items() if v is not None}
         update_data["updated_at"] = datetime.now()
         
-        result = await collection.update_one(
-            {"_id": user_id},
-            {"$set": update_data}
-        )
+        while True:
+            filter_query = {"_id": user_id}
+            changes = dict(update_data)
+            if any(field in update_data for field in SEARCH_FIELDS):
+                current = await collection.find_one(filter_query, {field: 1 for field in SEARCH_FIELDS})
+                if current is None:
+                    return None
+                changes.update(search_index_fields({**current, **update_data}))
+                filter_query.update({
+                    field: current.get(field) for field in SEARCH_FIELDS if field not in update_data
+                })
+            
+            user_doc = await collection.find_one_and_update(
+                filter_query,
+                {"$set": changes},
+                projection=USER_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+            if user_doc is not None or len(filter_query) == 1:
+                break
         
-        if result.matched_count == 0:
+        self.invalidate_cached_user(user_id)
+        if user_doc is None:
             return None
-            
-        return await self.get_user(user_id)
+        return UserResponse(**user_doc)
 
     async def update_last_active(self, user_id: str):
         """Update user's last active timestamp."""
@@ -106,33 +159,100 @@ class UserService:
             {"_id": user_id},
             {"$set": {"last_active": datetime.now()}}
         )
+        self.invalidate_cached_user(user_id)
 
     async def get_all_users(self, skip: int = 0, limit: int = 50) -> List[UserResponse]:
         """Get all users with pagination."""
+        users, _ = await self.get_users_page(limit, skip=skip)
+        return users
+
+    async def get_users_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Tuple[List[UserResponse], Optional[str]]:
+        """Get a page of users, newest first, and the cursor for the next page.
+
+        skip is only honoured without a cursor, for older clients.
+        """
         collection = self._get_collection()
-        cursor = collection.find({}).skip(skip).limit(limit)
+        query = collection.find(
+            keyset_filter("created_at", -1, cursor),
+            USER_PROJECTION
+        ).sort([("created_at", -1), ("_id", -1)])
+        if skip and not cursor:
+            query = query.skip(skip)
+        
         users = []
-        async for user_doc in cursor:
+        last_doc = None
+        async for user_doc in query.limit(limit):
             users.append(UserResponse(**user_doc))
-        return users
+            last_doc = user_doc
+        return users, next_page_cursor(last_doc, len(users), limit, "created_at")
 
     async def search_users(self, query: str, skip: int = 0, limit: int = 20) -> List[UserResponse]:
-        """Search users by name or email."""
+        """Search users by name, email, job title or company, best matches first.
+
+        Every query word must be a prefix of some word in those fields.
+        Users for whom every query word is a whole word come first, then the
+        prefix-only matches; each tier is ranked by match_score. Candidates
+        come from the search_exact and search_keys indexes, so the query is
+        never interpreted as a regex. Both tiers are read in _id order up to
+        SEARCH_CANDIDATE_LIMIT in total whatever the page, so every page is a
+        slice of the same ranked list.
+        """
         collection = self._get_collection()
-        filter_query = {
-            "$or": [
-                {"full_name": {"$regex": query, "$options": "i"}},
-                {"email": {"$regex": query, "$options": "i"}},
-                {"company": {"$regex": query, "$options": "i"}},
-                {"job_title": {"$regex": query, "$options": "i"}}
-            ]
-        }
+        keys = query_keys(query)
+        if not keys:
+            return []
         
-        cursor = collection.find(filter_query).skip(skip).limit(limit)
-        users = []
-        async for user_doc in cursor:
-            users.append(UserResponse(**user_doc))
-        return users
+        skip = max(skip, 0)
+        limit = max(1, min(limit, 100))
+        if skip >= SEARCH_CANDIDATE_LIMIT:
+            return []
+        
+        exact_cursor = collection.find(
+            {"search_exact": {"$all": keys}}, USER_PROJECTION
+        ).sort("_id", 1).limit(SEARCH_CANDIDATE_LIMIT)
+        exact = [user_doc async for user_doc in exact_cursor]
+        
+        prefix = []
+        remaining = SEARCH_CANDIDATE_LIMIT - len(exact)
+        if remaining > 0:
+            prefix_cursor = collection.find(
+                {"search_keys": {"$all": keys}, "_id": {"$nin": [user_doc["_id"] for user_doc in exact]}},
+                USER_PROJECTION
+            ).sort("_id", 1).limit(remaining)
+            prefix = [user_doc async for user_doc in prefix_cursor]
+        
+        def rank(user_doc):
+            return (-match_score(user_doc, query), user_doc.get("full_name", ""), user_doc["_id"])
+        
+        ranked = sorted(exact, key=rank) + sorted(prefix, key=rank)
+        return [UserResponse(**user_doc) for user_doc in ranked[skip:skip + limit]]
+
+    async def backfill_search_keys(self, batch_size: int = 1000) -> int:
+        """Build search keys for users created before they existed; returns how many were updated."""
+        collection = self._get_collection()
+        projection = {field: 1 for field in SEARCH_FIELDS}
+        
+        updated = 0
+        operations = []
+        async for user_doc in collection.find({"search_exact": {"$exists": False}}, projection):
+            operations.append(UpdateOne(
+                {"_id": user_doc["_id"]},
+                {"$set": search_index_fields(user_doc)}
+            ))
+            if len(operations) >= batch_size:
+                await collection.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+        return updated
 
 def get_user_service():
     """Get or create user service instance."""
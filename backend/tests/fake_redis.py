@@ -0,0 +1,146 @@
+import asyncio
+import math
+import time
+from typing import Dict, List, Optional, Set
+from services.counter_store import GCRA_SCRIPT
+
+class FakePubSub:
+    """The part of redis.asyncio's PubSub that RedisBroker uses."""
+
+    def __init__(self, server: "FakeRedis", ignore_subscribe_messages: bool = False):
+        self.server = server
+        self.channels: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self.channels.add(channel)
+            self.server.subscribers.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, *channels: str):
+        for channel in channels:
+            self.channels.discard(channel)
+            self.server.subscribers.get(channel, set()).discard(self)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def close(self):
+        await self.unsubscribe(*list(self.channels))
+
+class FakePipeline:
+    """MULTI/EXEC pipeline: queued commands run together on execute()."""
+
+    def __init__(self, server: "FakeRedis"):
+        self.server = server
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+        return queue
+
+    async def execute(self) -> List:
+        self.server._check()
+        return [getattr(self.server, f"_{name}")(*args) for name, args in self.commands]
+
+class FakeRedis:
+    """In-process stand-in for a redis.asyncio client shared by several "workers".
+
+    Give every component under test the same instance to simulate one Redis
+    server behind multiple processes. Scripts registered with
+    register_script run a Python equivalent of the Lua source (checked
+    against the real script in test_gcra_script.py); `clock` is the
+    server's TIME and can be replaced to control time in tests. Set `down`
+    to make key and script commands fail as if the server were unreachable.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.subscribers: Dict[str, Set[FakePubSub]] = {}
+        # {key: (value, expires_at or None)}
+        self.data: Dict[str, tuple] = {}
+        self.scripts = {GCRA_SCRIPT: self._gcra}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("Connection refused")
+
+    # Pub/sub
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        return FakePubSub(self, ignore_subscribe_messages)
+
+    async def publish(self, channel: str, data: str) -> int:
+        receivers = list(self.subscribers.get(channel, ()))
+        for pubsub in receivers:
+            pubsub.queue.put_nowait({"type": "message", "channel": channel, "data": data})
+        return len(receivers)
+
+    # Keys
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self.data[key]
+            return None
+        return value
+
+    def _set(self, key: str, value, px: Optional[int] = None):
+        self.data[key] = (str(value), None if px is None else self.clock() + px / 1000)
+        return True
+
+    def _incr(self, key: str) -> int:
+        value = int(self._get(key) or 0) + 1
+        expires_at = self.data.get(key, (None, None))[1]
+        self.data[key] = (str(value), expires_at)
+        return value
+
+    def _expire(self, key: str, seconds: int) -> bool:
+        value = self._get(key)
+        if value is None:
+            return False
+        self.data[key] = (value, self.clock() + seconds)
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        self._check()
+        return self._get(key)
+
+    async def mget(self, *keys: str) -> List[Optional[str]]:
+        self._check()
+        return [self._get(key) for key in keys]
+
+    async def delete(self, *keys: str) -> int:
+        self._check()
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    # Scripts
+
+    def register_script(self, script: str):
+        implementation = self.scripts[script]
+
+        async def run(keys=(), args=()):
+            self._check()
+            return implementation(list(keys), list(args))
+        return run
+
+    def _gcra(self, keys: List[str], args: List) -> List:
+        interval, tolerance, epsilon = (float(arg) for arg in args)
+        now = self.clock()
+        stored = self._get(keys[0])
+        tat = float(stored) if stored is not None else now
+        ahead = max(tat - now, 0) + interval
+        if ahead > tolerance + epsilon:
+            return [0, str(ahead - tolerance)]
+        self._set(keys[0], now + ahead, px=math.ceil(ahead * 1000))
+        return [1, "0"]
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from services import audit_sink as audit_sink_module
+from services.audit_sink import AuditSink
+
+class FakeAuditLogs:
+    def __init__(self):
+        self.batches = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.batches.append(docs)
+
+class FakeCollections:
+    def __init__(self):
+        self.audit_logs = FakeAuditLogs()
+
+@pytest.fixture
+def audit_logs(monkeypatch):
+    collections = FakeCollections()
+    monkeypatch.setattr(audit_sink_module, "db_collections", collections)
+    return collections.audit_logs
+
+def event(n: int) -> dict:
+    return {"action": "read", "resource": "course", "resource_id": str(n)}
+
+def test_full_buffer_drops_the_oldest_events(audit_logs):
+    sink = AuditSink(max_buffer=3, batch_size=10)
+    for n in range(5):
+        sink.submit(event(n))
+    assert sink.dropped == 2
+
+    assert asyncio.run(sink.flush())
+    assert [doc["resource_id"] for doc in audit_logs.batches[0]] == ["2", "3", "4"]
+    assert sink.stats()["written"] == 3
+
+def test_events_are_written_in_batches(audit_logs):
+    sink = AuditSink(batch_size=2)
+    for n in range(5):
+        sink.submit(event(n))
+    asyncio.run(sink.stop())
+
+    assert [len(batch) for batch in audit_logs.batches] == [2, 2, 1]
+    assert all(doc["_id"] == doc["log_id"] for batch in audit_logs.batches for doc in batch)
+    assert sink.flushes == 3
+
+def test_stored_timestamp_is_the_submit_time(audit_logs):
+    sink = AuditSink()
+    submitted_at = datetime.now()
+    sink.submit(event(1))
+
+    async def flush_later():
+        await asyncio.sleep(0.2)
+        await sink.flush()
+
+    asyncio.run(flush_later())
+    stored = audit_logs.batches[0][0]["timestamp"]
+    assert abs(stored - submitted_at) < timedelta(seconds=0.1)
+
+def test_invalid_events_are_skipped(audit_logs):
+    sink = AuditSink()
+    sink.submit({"action": "not-an-action", "resource": "course"})
+    sink.submit(event(1))
+    assert asyncio.run(sink.flush())
+    assert len(audit_logs.batches[0]) == 1
+    assert sink.failed == 1
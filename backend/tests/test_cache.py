@@ -0,0 +1,126 @@
+import asyncio
+import time
+from services.cache import SWRCache, TTLCache
+
+def test_ttl_cache_hit_and_expiry():
+    cache = TTLCache(max_size=10, ttl_seconds=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_ttl_cache_per_entry_ttl_and_invalidation():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set("short", 1, ttl_seconds=0.01)
+    cache.set("long", 2)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    cache.invalidate("long")
+    assert cache.get("long") is None
+    cache.set("x", 1)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.invalidations == 2
+
+class Loader:
+    """Counts calls and returns the current value after an optional delay."""
+
+    def __init__(self, value="v1", delay: float = 0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+def test_swr_concurrent_misses_share_one_load():
+    async def run():
+        cache = SWRCache(ttl_seconds=60)
+        loader = Loader(delay=0.02)
+        results = await asyncio.gather(*(cache.get_or_load(("courses", 1), loader) for _ in range(5)))
+        assert results == ["v1"] * 5
+        assert loader.calls == 1
+        assert cache.coalesced == 4
+        assert await cache.get_or_load(("courses", 1), loader) == "v1"
+        assert cache.hits == 1
+
+    asyncio.run(run())
+
+def test_swr_serves_stale_value_while_reloading():
+    async def run():
+        cache = SWRCache(ttl_seconds=0.02, stale_seconds=60)
+        loader = Loader()
+        await cache.get_or_load(("courses", 1), loader)
+        await asyncio.sleep(0.03)
+
+        loader.value = "v2"
+        assert await cache.get_or_load(("courses", 1), loader) == "v1"
+        assert await cache.get_or_load(("courses", 1), loader) == "v1"
+        await asyncio.sleep(0.01)
+        assert loader.calls == 2
+        assert await cache.get_or_load(("courses", 1), loader) == "v2"
+        assert cache.stale_hits == 2
+
+    asyncio.run(run())
+
+def test_swr_load_started_before_invalidation_is_not_stored():
+    async def run():
+        cache = SWRCache(ttl_seconds=60)
+        loader = Loader(delay=0.02)
+        pending = asyncio.ensure_future(cache.get_or_load(("courses", 1), loader))
+        await asyncio.sleep(0)
+        cache.invalidate(("courses", 1))
+        assert await pending == "v1"
+        assert len(cache) == 0
+
+        loader.value = "v2"
+        assert await cache.get_or_load(("courses", 1), loader) == "v2"
+        assert loader.calls == 2
+
+    asyncio.run(run())
+
+def test_swr_invalidate_namespace_keeps_other_namespaces():
+    async def run():
+        cache = SWRCache(ttl_seconds=60)
+        for key in [("courses", 1), ("courses", 2), ("popular", 10)]:
+            await cache.get_or_load(key, Loader())
+        cache.invalidate_namespace("courses")
+        assert len(cache) == 1
+        assert cache.invalidations == 2
+
+    asyncio.run(run())
+
+def test_swr_errors_reach_every_waiter_and_are_not_cached():
+    async def run():
+        cache = SWRCache(ttl_seconds=60)
+        loader = Loader(RuntimeError("database down"), delay=0.01)
+        results = await asyncio.gather(
+            cache.get_or_load(("courses", 1), loader),
+            cache.get_or_load(("courses", 1), loader),
+            return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert cache.load_errors == 1
+        assert len(cache) == 0
+
+        loader.value = "v1"
+        assert await cache.get_or_load(("courses", 1), loader) == "v1"
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from services.concurrency import Branch, gather_branches
+
+async def value_after(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+async def fail():
+    raise RuntimeError("backend down")
+
+def test_all_branches_succeeding_return_their_values():
+    results, degraded = asyncio.run(gather_branches(
+        Branch("courses", value_after(["c1"]), fallback=[]),
+        Branch("counts", value_after({"active": 2}), fallback={"counts": {}})
+    ))
+
+    assert results == {"courses": ["c1"], "counts": {"active": 2}}
+    assert degraded == []
+
+def test_timed_out_branch_uses_its_fallback_without_holding_up_the_rest():
+    started = time.monotonic()
+    results, degraded = asyncio.run(gather_branches(
+        Branch("slow", value_after(["late"], delay=5), fallback=[], timeout=0.05),
+        Branch("fast", value_after(["on time"]), fallback=[])
+    ))
+
+    assert results == {"slow": [], "fast": ["on time"]}
+    assert degraded == ["slow"]
+    assert time.monotonic() - started < 1
+
+def test_raising_branch_uses_its_fallback():
+    results, degraded = asyncio.run(gather_branches(
+        Branch("broken", fail(), fallback={"counts": {}}),
+        Branch("fine", value_after(3), fallback=0)
+    ))
+
+    assert results == {"broken": {"counts": {}}, "fine": 3}
+    assert degraded == ["broken"]
+
+def test_each_failing_branch_gets_its_own_fallback():
+    results, degraded = asyncio.run(gather_branches(
+        Branch("courses", fail(), fallback=[]),
+        Branch("mentorships", value_after(None, delay=5), fallback={"counts": {}}, timeout=0.05),
+        Branch("sessions", fail())
+    ))
+
+    assert results == {"courses": [], "mentorships": {"counts": {}}, "sessions": None}
+    assert degraded == ["courses", "mentorships", "sessions"]
@@ -0,0 +1,53 @@
+from services.contact_graph import ContactGraph
+
+def test_edges_are_reference_counted_by_room():
+    graph = ContactGraph()
+    graph.add_room("r1", ["a", "b"])
+    graph.add_room("r2", ["a", "b", "c"])
+    assert graph.get_contacts("a") == {"b", "c"}
+
+    graph.remove_participant("r2", "b")
+    # a and b still share r1
+    assert graph.get_contacts("a") == {"b", "c"}
+    assert graph.get_contacts("b") == {"a"}
+
+    graph.remove_room("r1")
+    assert graph.get_contacts("a") == {"c"}
+    assert graph.get_contacts("b") == set()
+
+def test_adding_a_member_twice_does_not_double_count():
+    graph = ContactGraph()
+    graph.add_room("r1", ["a", "b"])
+    graph.add_participant("r1", "b")
+    graph.remove_participant("r1", "b")
+    assert graph.get_contacts("a") == set()
+
+def test_sync_room_ignores_rooms_nobody_loaded_needs():
+    graph = ContactGraph()
+    assert graph.sync_room("r1", ["x", "y"]) is False
+    assert graph.stats()["rooms"] == 0
+
+    graph.loaded_users.add("a")
+    assert graph.sync_room("r1", ["a", "b"]) is True
+    assert graph.sync_room("r1", ["a", "c"]) is True
+    assert graph.get_contacts("a") == {"c"}
+    assert graph.get_contacts("b") == set()
+
+    # The only loaded member leaves: the room is no longer tracked
+    graph.sync_room("r1", ["c"])
+    assert graph.stats() == {"rooms": 0, "users": 0, "loaded_users": 1, "edges": 0}
+
+def test_evict_user_keeps_rooms_other_loaded_users_share():
+    graph = ContactGraph()
+    graph.loaded_users.update({"a", "b"})
+    graph.add_room("shared", ["a", "b"])
+    graph.add_room("only_a", ["a", "x"])
+
+    graph.evict_user("a")
+    assert graph.get_contacts("b") == {"a"}
+    assert "only_a" not in graph.room_members
+    assert graph.get_contacts("x") == set()
+
+    graph.evict_user("b")
+    assert graph.stats() == {"rooms": 0, "users": 0, "loaded_users": 0, "edges": 0}
+    assert graph.user_rooms == {}
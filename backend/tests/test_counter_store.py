@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fake_redis import FakeRedis
+from services import counter_store as counter_store_module
+from services.counter_store import CounterStore, InMemoryCounterStore, RedisCounterStore
+from services.rate_limiter import RateLimitPolicy
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_counter_store_is_abstract():
+    with pytest.raises(TypeError):
+        CounterStore()
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_sliding_window_counters(shared, monkeypatch):
+    clock = Clock(6000.0)  # the start of a 60s window
+    monkeypatch.setattr(counter_store_module, "time", SimpleNamespace(time=clock))
+    store = RedisCounterStore(FakeRedis(clock=clock)) if shared else InMemoryCounterStore()
+
+    async def run():
+        assert await store.hit("lockout:a", 60) == 1
+        assert await store.hit("lockout:a", 60) == 2
+        assert await store.count("lockout:b", 60) == 0
+
+        # Later in the same window
+        clock.now = 6030.0
+        assert await store.count("lockout:a", 60) == 2
+
+        # Halfway into the next window, half of the previous one still counts
+        clock.now = 6090.0
+        assert await store.count("lockout:a", 60) == 1
+        assert await store.hit("lockout:a", 60) == 2
+
+        # Two windows on, everything has slid out
+        clock.now = 6240.0
+        assert await store.count("lockout:a", 60) == 0
+
+        await store.hit("lockout:a", 60)
+        await store.reset("lockout:a", 60)
+        assert await store.count("lockout:a", 60) == 0
+
+    asyncio.run(run())
+
+def test_shared_gcra_is_one_budget_across_workers():
+    clock = Clock()
+    server = FakeRedis(clock=clock)
+    worker_a, worker_b = RedisCounterStore(server), RedisCounterStore(server)
+    policy = RateLimitPolicy("test", limit=2, period_seconds=1, burst=2)
+
+    async def run():
+        assert (await worker_a.acquire("rate:ip", policy))[0] is True
+        assert (await worker_b.acquire("rate:ip", policy))[0] is True
+        allowed, retry_after = await worker_a.acquire("rate:ip", policy)
+        assert allowed is False
+        assert retry_after == pytest.approx(0.5)
+
+    asyncio.run(run())
+
+def test_shared_gcra_does_not_count_rejected_requests():
+    clock = Clock()
+    store = RedisCounterStore(FakeRedis(clock=clock))
+    policy = RateLimitPolicy("test", limit=1, period_seconds=1, burst=1)
+
+    async def run():
+        assert (await store.acquire("rate:ip", policy))[0] is True
+        # A client hammering over the limit...
+        for step in range(1, 100):
+            clock.now = 1000.0 + step * 0.01
+            assert (await store.acquire("rate:ip", policy))[0] is False
+        # ...still gets through once its allowance refills
+        clock.now = 1001.0
+        assert (await store.acquire("rate:ip", policy))[0] is True
+
+    asyncio.run(run())
+    assert store.stats()["limited"] == 99
+
+def test_local_gcra_does_not_count_rejected_requests():
+    store = InMemoryCounterStore()
+    policy = RateLimitPolicy("test", limit=1, period_seconds=0.05, burst=1)
+
+    async def run():
+        assert (await store.acquire("rate:ip", policy))[0] is True
+        for _ in range(50):
+            assert (await store.acquire("rate:ip", policy))[0] is False
+        await asyncio.sleep(0.06)
+        assert (await store.acquire("rate:ip", policy))[0] is True
+
+    asyncio.run(run())
+    assert store.stats()["rate_limiter"]["limited"] == 50
+
+def test_redis_outage_falls_back_to_local_limits():
+    server = FakeRedis(clock=Clock())
+    store = RedisCounterStore(server)
+    policy = RateLimitPolicy("test", limit=2, period_seconds=60, burst=2)
+
+    async def run():
+        server.down = True
+        # Still limited, now per process, instead of erroring
+        assert [(await store.acquire("rate:ip", policy))[0] for _ in range(3)] == [True, True, False]
+        assert await store.hit("lockout:a", 60) == 1
+        assert await store.count("lockout:a", 60) == 1
+        await store.reset("lockout:a", 60)
+        assert store.stats()["degraded"] is True
+
+        server.down = False
+        assert (await store.acquire("rate:ip", policy))[0] is True
+        assert store.stats()["degraded"] is False
+
+    asyncio.run(run())
+    assert store.errors == 6
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime
+from services import course_service as course_module
+from services.cache import SWRCache
+from services.course_service import SEARCH_MAX_LIMIT, SEARCH_MAX_QUERY_LENGTH, course_service
+
+class RecordingCursor:
+    """find() cursor that records how it was built and yields no documents."""
+
+    def __init__(self, filter_query, projection):
+        self.filter_query = filter_query
+        self.projection = projection
+        self.sort_spec = self.skip_count = self.limit_count = None
+
+    def sort(self, spec):
+        self.sort_spec = spec
+        return self
+
+    def skip(self, count):
+        self.skip_count = count
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+class RecordingCollection:
+    def __init__(self):
+        self.cursors = []
+
+    def find(self, filter_query, projection=None):
+        self.cursors.append(RecordingCursor(filter_query, projection))
+        return self.cursors[-1]
+
+class RecordingDatabase:
+    def __init__(self):
+        self.courses = RecordingCollection()
+        self.course_progress = RecordingCollection()
+
+def search(monkeypatch, *args, **kwargs) -> RecordingCursor:
+    database = RecordingDatabase()
+    monkeypatch.setattr(course_module, "db_collections", database)
+    assert asyncio.run(course_service.search_courses(*args, **kwargs)) == []
+    return database.courses.cursors[0]
+
+def test_search_runs_a_ranked_text_query_on_published_courses(monkeypatch):
+    cursor = search(monkeypatch, "  contract law  ", category="Law", skip=-5, limit=10)
+
+    # status leads, matching the status_course_text index prefix
+    assert list(cursor.filter_query) == ["status", "$text", "category"]
+    assert cursor.filter_query == {"status": "published", "$text": {"$search": "contract law"}, "category": "Law"}
+    assert cursor.projection == {"score": {"$meta": "textScore"}}
+    assert cursor.sort_spec == [("score", {"$meta": "textScore"})]
+    assert cursor.skip_count == 0
+    assert cursor.limit_count == 10
+
+def test_search_caps_limit_and_query_length(monkeypatch):
+    cursor = search(monkeypatch, "x" * (SEARCH_MAX_QUERY_LENGTH + 50), limit=SEARCH_MAX_LIMIT * 10)
+
+    assert cursor.limit_count == SEARCH_MAX_LIMIT
+    assert cursor.filter_query["$text"]["$search"] == "x" * SEARCH_MAX_QUERY_LENGTH
+    assert search(monkeypatch, "tax", limit=0).limit_count == 1
+
+def test_blank_search_does_not_query(monkeypatch):
+    database = RecordingDatabase()
+    monkeypatch.setattr(course_module, "db_collections", database)
+
+    assert asyncio.run(course_service.search_courses("   ")) == []
+    assert database.courses.cursors == []
+
+class CourseCollection:
+    """The document operations enroll_user and get_course use."""
+
+    def __init__(self, *docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = doc
+
+    async def find_one(self, filter_query, projection=None):
+        doc = self.docs.get(filter_query["_id"])
+        return dict(doc) if doc else None
+
+    async def find_one_and_update(self, filter_query, update, projection=None, return_document=None):
+        doc = self.docs.get(filter_query["_id"])
+        if doc is None:
+            return None
+        for field, amount in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + amount
+        return dict(doc)
+
+def test_enrolling_refreshes_the_cached_course(monkeypatch):
+    course = {
+        "_id": "c1", "course_id": "c1", "title": "Contracts", "description": "Basics",
+        "instructor_name": "I", "difficulty": "beginner", "category": "Law", "tags": [],
+        "total_duration_hours": 1.0, "rating": 0.0, "enrollment_count": 4, "price": 0.0,
+        "status": "draft", "created_at": datetime(2025, 1, 1)
+    }
+    database = RecordingDatabase()
+    database.courses = CourseCollection(course)
+    database.course_progress = CourseCollection()
+    monkeypatch.setattr(course_module, "db_collections", database)
+    monkeypatch.setattr(course_module, "catalog_cache", SWRCache(max_size=10, ttl_seconds=60, stale_seconds=60))
+    monkeypatch.setattr(course_module.rollup_service, "record", lambda *args, **kwargs: None)
+
+    async def record_enrollment(user_id):
+        pass
+
+    monkeypatch.setattr(course_module.learning_stats_service, "record_enrollment", record_enrollment)
+
+    async def run():
+        before = await course_service.get_course("c1")
+        await course_service.enroll_user("u1", "c1")
+        return before, await course_service.get_course("c1")
+
+    before, after = asyncio.run(run())
+
+    assert before.enrollment_count == 4
+    assert after.enrollment_count == 5
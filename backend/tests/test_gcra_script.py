@@ -0,0 +1,78 @@
+"""Runs the Lua GCRA_SCRIPT under Lua 5.1, the interpreter Redis embeds.
+
+Needs the optional lupa package; skipped without it. Every other Redis
+test goes through the Python equivalent in fake_redis.py, which is checked
+against the script here.
+"""
+import random
+import pytest
+from fake_redis import FakeRedis
+from services.counter_store import GCRA_SCRIPT, TOLERANCE_EPSILON
+from services.rate_limiter import RateLimitPolicy, RateLimiter
+
+lua51 = pytest.importorskip("lupa.lua51")
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+class LuaRedis:
+    """Just enough of Redis to run GCRA_SCRIPT: TIME, GET and SET ... PX."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+        self.runtime = lua51.LuaRuntime()
+        self.runtime.globals().redis = self.runtime.table_from({
+            "call": self._call,
+            "replicate_commands": lambda: True
+        })
+
+    def _call(self, command, *args):
+        if command == "TIME":
+            micros = round(self.clock() * 1000000)
+            return self.runtime.table_from([str(micros // 1000000), str(micros % 1000000)])
+        if command == "GET":
+            return self.data.get(args[0])
+        if command == "SET":
+            key, value, option, milliseconds = args
+            assert option == "PX" and int(milliseconds) > 0
+            self.data[key] = value
+            return "OK"
+        raise AssertionError(f"unexpected command {command}")
+
+    def run_script(self, keys, args):
+        lua_globals = self.runtime.globals()
+        # Redis passes every argument as a string
+        lua_globals.KEYS = self.runtime.table_from(keys)
+        lua_globals.ARGV = self.runtime.table_from([repr(arg) for arg in args])
+        allowed, retry_after = self.runtime.execute(GCRA_SCRIPT).values()
+        return int(allowed), float(retry_after)
+
+@pytest.mark.parametrize("limit, period, burst", [(1, 1, 1), (10, 60, 10), (100, 60, 5)])
+def test_script_matches_rate_limiter_and_fake(limit, period, burst):
+    policy = RateLimitPolicy("test", limit=limit, period_seconds=period, burst=burst)
+    args = [policy.emission_interval, policy.tolerance, TOLERANCE_EPSILON]
+    clock = Clock()
+    lua, fake, limiter = LuaRedis(clock), FakeRedis(clock=clock), RateLimiter()
+    rng = random.Random(limit * 1000 + burst)
+
+    outcomes = []
+    for _ in range(300):
+        # Whole microseconds, as Redis TIME reports them
+        clock.now += rng.choice([0, 1, 3, 50, 400]) / 64 * policy.emission_interval
+        clock.now = round(clock.now, 6)
+        allowed, retry_after = lua.run_script(["key"], args)
+        fake_allowed, fake_retry = fake._gcra(["key"], args)
+        expected_allowed, expected_retry = limiter.hit("key", policy, now=clock.now)
+
+        assert bool(allowed) == bool(fake_allowed) == expected_allowed
+        assert retry_after == pytest.approx(float(fake_retry), abs=1e-6)
+        assert retry_after == pytest.approx(expected_retry, abs=1e-6)
+        outcomes.append(expected_allowed)
+
+    # The sequences exercise both outcomes
+    assert True in outcomes and False in outcomes
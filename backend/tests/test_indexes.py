@@ -0,0 +1,81 @@
+import asyncio
+from pymongo.errors import OperationFailure
+from database.indexes import INDEX_REGISTRY, ensure_indexes, index_definition
+
+class FakeCollection:
+    def __init__(self, info):
+        self.info = info
+        self.dropped = []
+
+    async def index_information(self):
+        return dict(self.info)
+
+    async def drop_index(self, name):
+        self.dropped.append(name)
+        self.info.pop(name)
+
+    async def create_indexes(self, indexes):
+        for index in indexes:
+            document = index.document
+            if document["name"] in self.info:
+                raise OperationFailure("index exists")
+            self.info[document["name"]] = {"key": list(document["key"].items()), "v": 2}
+
+def registered(collection, name):
+    return next(index for index in INDEX_REGISTRY[collection] if index.document["name"] == name)
+
+def test_text_index_matches_server_format():
+    stored = {
+        "key": [("status", 1), ("_fts", "text"), ("_ftsx", 1)],
+        "v": 2,
+        "weights": {"category": 4, "description": 1, "tags": 6, "title": 10},
+        "default_language": "english",
+        "language_override": "language",
+        "textIndexVersion": 3
+    }
+    expected = registered("courses", "status_course_text").document
+    assert index_definition(stored) == index_definition(expected)
+
+    stored["weights"] = {"title": 1}
+    assert index_definition(stored) != index_definition(expected)
+
+def test_unique_option_is_compared():
+    expected = registered("users", "email_unique").document
+    assert index_definition({"key": [("email", 1)], "v": 2, "unique": True}) == index_definition(expected)
+    assert index_definition({"key": [("email", 1)], "v": 2}) != index_definition(expected)
+
+def test_drift_is_reported_and_only_rebuilt_on_request():
+    collections = {
+        "chat_rooms": FakeCollection({
+            "_id_": {"key": [("_id", 1)]},
+            # Bootstrapped before _id was added to the key
+            "participants_active_updated": {"key": [("participants", 1), ("is_active", 1), ("updated_at", -1)]}
+        }),
+        "chat_messages": FakeCollection({
+            "_id_": {"key": [("_id", 1)]},
+            "by_sender": {"key": [("sender_id", 1)]}
+        })
+    }
+    db = {name: collections.get(name) or FakeCollection({"_id_": {"key": [("_id", 1)]}}) for name in INDEX_REGISTRY}
+
+    preview = asyncio.run(ensure_indexes(db, dry_run=True))
+    assert preview["chat_rooms"]["drifted"] == ["participants_active_updated"]
+    assert preview["chat_rooms"]["pending"] == []
+    assert preview["chat_messages"]["pending"] == ["chat_created_id"]
+    assert preview["chat_messages"]["unregistered"] == ["by_sender"]
+
+    # Startup: missing indexes are created, drifted ones left alone
+    report = asyncio.run(ensure_indexes(db))
+    assert report["chat_messages"]["created"] == ["chat_created_id"]
+    assert report["chat_rooms"]["drifted"] == ["participants_active_updated"]
+    assert report["chat_rooms"]["created"] == []
+    assert collections["chat_rooms"].dropped == []
+    assert "by_sender" in collections["chat_messages"].info
+
+    rebuilt = asyncio.run(ensure_indexes(db, rebuild_drifted=True))
+    assert rebuilt["chat_rooms"]["created"] == ["participants_active_updated"]
+    assert collections["chat_rooms"].info["participants_active_updated"]["key"][-1] == ("_id", -1)
+
+    again = asyncio.run(ensure_indexes(db))
+    assert again["chat_rooms"]["drifted"] == []
+    assert again["chat_rooms"]["created"] == []
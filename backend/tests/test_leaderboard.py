@@ -0,0 +1,63 @@
+from services.leaderboard_service import PopularityLeaderboard
+
+def course(course_id: str, enrollments: int, category: str = "dev", status: str = "published") -> dict:
+    return {
+        "course_id": course_id,
+        "title": course_id,
+        "description": "",
+        "instructor_name": "",
+        "difficulty": "beginner",
+        "category": category,
+        "tags": [],
+        "total_duration_hours": 1.0,
+        "rating": 4.5,
+        "enrollment_count": enrollments,
+        "price": 0.0,
+        "status": status
+    }
+
+def ids(courses) -> list:
+    return [c.course_id for c in courses]
+
+def test_enrollments_rerank_overall_and_category_boards():
+    board = PopularityLeaderboard(size=3)
+    board.record_enrollment(course("a", 5))
+    board.record_enrollment(course("b", 3))
+    board.record_enrollment(course("c", 1, category="design"))
+    assert ids(board.top(10)) == ["a", "b", "c"]
+
+    board.record_enrollment(course("b", 6))
+    assert ids(board.top(10)) == ["b", "a", "c"]
+    assert ids(board.top(10, category="dev")) == ["b", "a"]
+    assert ids(board.top(10, category="design")) == ["c"]
+    assert ids(board.top(1)) == ["b"]
+
+def test_boards_keep_only_size_entries():
+    board = PopularityLeaderboard(size=2)
+    for course_id, enrollments in [("a", 5), ("b", 4), ("c", 1)]:
+        board.record_enrollment(course(course_id, enrollments))
+    assert ids(board.top(10)) == ["a", "b"]
+
+    board.record_enrollment(course("c", 9))
+    assert ids(board.top(10)) == ["c", "a"]
+
+def test_ties_keep_the_earlier_course_first():
+    board = PopularityLeaderboard(size=5)
+    board.record_enrollment(course("a", 2))
+    board.record_enrollment(course("b", 2))
+    assert ids(board.top(10)) == ["a", "b"]
+
+def test_trending_counts_enrollments_in_the_window():
+    board = PopularityLeaderboard(size=5)
+    board.record_enrollment(course("popular", 100))
+    for enrollments in (1, 2):
+        board.record_enrollment(course("rising", enrollments))
+    assert ids(board.trending(10)) == ["rising", "popular"]
+    assert ids(board.top(10)) == ["popular", "rising"]
+
+def test_unpublished_courses_are_not_ranked():
+    board = PopularityLeaderboard(size=5)
+    board.record_enrollment(course("draft", 50, status="draft"))
+    assert board.top(10) == []
+    assert board.trending(10) == []
+    assert board.stats()["enrollments"] == 0
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+import database.connection as connection
+from services.learning_stats_service import LearningStatsService, stats_from_progress
+
+MONDAY = datetime(2025, 1, 6, 10)
+
+@pytest.fixture
+def service(monkeypatch):
+    """A service over an in-memory database that runs pipeline updates."""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    monkeypatch.setattr(connection.mongodb, "database", mongomock_motor.AsyncMongoMockClient()["test"])
+    monkeypatch.setattr(connection.db_collections, "_handles", {})
+    return LearningStatsService()
+
+def progress(user_id, enrolled, accessed=None, minutes=0, lessons=0, completed=None):
+    return {
+        "user_id": user_id, "enrollment_date": enrolled, "last_accessed": accessed or enrolled,
+        "time_spent_minutes": minutes, "completed_lessons": [f"l{i}" for i in range(lessons)],
+        "is_completed": completed is not None, "completion_date": completed
+    }
+
+def test_same_day_keeps_next_day_extends_and_gap_resets_streak(service):
+    async def run():
+        await service.record_activity("u", 10, True, when=MONDAY)
+        await service.record_activity("u", 5, False, when=MONDAY + timedelta(hours=2))
+        await service.record_activity("u", 5, True, when=MONDAY + timedelta(days=1))
+        after_run = await service._get_collection().find_one({"_id": "u"})
+        await service.record_activity("u", 1, False, when=MONDAY + timedelta(days=4))
+        return after_run, await service._get_collection().find_one({"_id": "u"})
+
+    after_run, after_gap = asyncio.run(run())
+
+    assert after_run["current_streak"] == 2
+    assert after_run["longest_streak"] == 2
+    assert after_run["active_days"] == 2
+    assert after_run["activity_count"] == 3
+    assert after_gap["current_streak"] == 1
+    assert after_gap["longest_streak"] == 2
+    assert after_gap["active_days"] == 3
+    assert after_gap["last_active_day"] == "2025-01-10"
+
+def test_activity_is_added_to_the_day_maps(service):
+    async def run():
+        await service.record_activity("u", 10, True, when=MONDAY)
+        await service.record_activity("u", 5, False, when=MONDAY)
+        await service.record_activity("u", 20, True, when=MONDAY + timedelta(days=7))
+        return await service._get_collection().find_one({"_id": "u"})
+
+    stats = asyncio.run(run())
+
+    assert stats["minutes_by_weekday"] == {"Monday": 35}
+    assert stats["lessons_by_weekday"] == {"Monday": 2}
+    assert stats["minutes_by_week"] == {"2025-W02": 15, "2025-W03": 20}
+    assert stats["lessons_by_week"] == {"2025-W02": 1, "2025-W03": 1}
+    assert stats["minutes_by_month"] == {"2025-01": 35}
+    assert stats["total_minutes"] == 35
+    assert stats["lessons_completed"] == 2
+
+def test_stats_from_progress_credits_each_course_to_its_last_access():
+    stats = stats_from_progress([
+        progress("u", MONDAY, MONDAY + timedelta(days=1), minutes=30, lessons=3, completed=MONDAY + timedelta(days=1)),
+        progress("u", MONDAY + timedelta(days=2), minutes=10, lessons=0),
+        progress("u", MONDAY + timedelta(days=10))
+    ])
+
+    assert stats["courses_enrolled"] == 3
+    assert stats["courses_completed"] == 1
+    assert stats["completions_by_week"] == {"2025-W02": 1}
+    assert stats["total_minutes"] == 40
+    assert stats["lessons_completed"] == 3
+    assert stats["activity_count"] == 4
+    assert stats["minutes_by_weekday"] == {"Tuesday": 30, "Wednesday": 10, "Thursday": 0}
+    assert stats["lessons_by_week"] == {"2025-W02": 3, "2025-W03": 0}
+    # Monday to Wednesday, then a lone day after the gap
+    assert stats["active_days"] == 4
+    assert stats["longest_streak"] == 3
+    assert stats["current_streak"] == 1
+    assert stats["last_active_day"] == "2025-01-16"
+
+def test_backfill_writes_one_document_per_user_that_later_activity_extends(service):
+    async def run():
+        await connection.db_collections.course_progress.insert_many([
+            progress("a", MONDAY, minutes=15, lessons=1),
+            progress("b", MONDAY, minutes=5),
+            progress("a", MONDAY + timedelta(days=1), minutes=10, lessons=2)
+        ])
+        written = await service.backfill(batch_size=1)
+        await service.record_activity("a", 5, True, when=MONDAY + timedelta(days=2))
+        return written, await service._get_collection().find_one({"_id": "a"})
+
+    written, stats = asyncio.run(run())
+
+    assert written == 2
+    assert stats["current_streak"] == 3
+    assert stats["active_days"] == 3
+    assert stats["total_minutes"] == 30
+    assert stats["lessons_completed"] == 4
+    assert stats["minutes_by_weekday"] == {"Monday": 15, "Tuesday": 10, "Wednesday": 5}
+
+def test_ensure_backfilled_runs_once(service):
+    async def run():
+        await connection.db_collections.course_progress.insert_one(progress("a", MONDAY, minutes=15))
+        first = await service.ensure_backfilled()
+        await service._get_collection().delete_many({})
+        second = await service.ensure_backfilled()
+        return first, second, await service._get_collection().count_documents({})
+
+    assert asyncio.run(run()) == (True, False, 0)
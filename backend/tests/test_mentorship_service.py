@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime
+from services import mentorship_service as mentorship_module
+from services.mentorship_service import mentorship_service
+from models.mentorship import MentorshipStatus
+
+class RecordingDatabase:
+    """Collections whose aggregate() records the pipeline and returns no documents."""
+
+    def __init__(self):
+        self.pipelines = []
+
+    def __getattr__(self, name):
+        return self
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+def test_mentorship_pages_sort_with_an_id_tiebreaker(monkeypatch):
+    database = RecordingDatabase()
+    monkeypatch.setattr(mentorship_module, "db_collections", database)
+
+    result = asyncio.run(mentorship_service.get_user_mentorships("u1", status=MentorshipStatus.ACTIVE, skip=20, limit=10))
+
+    assert result["counts"] == {"as_mentor": 0, "as_mentee": 0}
+    match, facet = database.pipelines[0]
+    assert match["$match"]["status"] == MentorshipStatus.ACTIVE
+    for partition, field in (("as_mentor", "mentor_id"), ("as_mentee", "mentee_id")):
+        assert facet["$facet"][partition] == [
+            {"$match": {field: "u1"}},
+            {"$sort": {"requested_at": -1, "_id": -1}},
+            {"$skip": 20},
+            {"$limit": 10}
+        ]
+
+def test_my_mentorships_route_takes_the_status_query_parameter(monkeypatch):
+    from starlette.testclient import TestClient
+    from models.user import UserResponse, UserRole, UserStats
+    import server
+
+    calls = []
+
+    async def get_user_mentorships(user_id, **kwargs):
+        calls.append((user_id, kwargs))
+        return {"counts": {}}
+
+    async def current_user():
+        return UserResponse(
+            user_id="u1", email="u1@example.com", full_name="U", role=UserRole.LEARNER,
+            stats=UserStats(), is_active=True, created_at=datetime.now()
+        )
+
+    monkeypatch.setattr(mentorship_service, "get_user_mentorships", get_user_mentorships)
+    monkeypatch.setitem(server.app.dependency_overrides, server.get_current_user, current_user)
+    client = TestClient(server.app)
+
+    assert client.get("/api/my/mentorships", params={"status": "pending"}).status_code == 200
+    assert client.get("/api/my/mentorships", params={"status": "unknown"}).status_code == 422
+
+    assert calls == [("u1", {"status": MentorshipStatus.PENDING, "skip": 0, "limit": None, "counts_only": False})]
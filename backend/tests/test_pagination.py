@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+import pytest
+from services.pagination import decode_cursor, encode_cursor, keyset_filter, paginate_items
+
+def forge(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def test_round_trip():
+    when = datetime(2025, 1, 2, 3, 4, 5)
+    assert decode_cursor(encode_cursor(when, "abc")) == (when, "abc")
+    assert decode_cursor(encode_cursor(5, "abc"), sort_type=int) == (5, "abc")
+
+def test_keyset_filter_after_cursor():
+    when = datetime(2025, 1, 2)
+    assert keyset_filter("created_at", -1, encode_cursor(when, "x")) == {
+        "$or": [
+            {"created_at": {"$lt": when}},
+            {"created_at": when, "_id": {"$lt": "x"}}
+        ]
+    }
+    assert keyset_filter("created_at", -1, None) == {}
+
+@pytest.mark.parametrize("payload", [
+    {"t": "raw", "v": {"$ne": None}, "id": "x"},
+    {"t": "dt", "v": {"$gt": ""}, "id": "x"},
+    {"t": "dt", "v": "2025-01-02T00:00:00", "id": {"$ne": None}},
+    {"t": "dt", "v": "2025-01-02T00:00:00", "id": ["x"]},
+    {"t": "dt", "v": "2025-01-02T00:00:00", "id": True},
+    {"t": "raw", "v": "2025-01-02T00:00:00", "id": "x"},
+    {"t": "dt", "v": "not a date", "id": "x"},
+    {"t": "dt", "v": "2025-01-02T00:00:00"},
+    ["dt", "2025-01-02T00:00:00", "x"],
+])
+def test_forged_cursors_are_rejected(payload):
+    with pytest.raises(ValueError):
+        keyset_filter("created_at", -1, forge(payload))
+
+def test_garbage_token_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor("%%%not-base64")
+
+JOBS = [{"job_id": f"job-{n}", "posted_date": f"2025-01-{n:02d}T00:00:00"} for n in range(1, 6)]
+
+def test_paginate_items_walks_every_item_once():
+    seen, cursor = [], None
+    while True:
+        page, cursor = paginate_items(JOBS, "posted_date", -1, 2, cursor, tiebreaker_field="job_id", sort_type=str)
+        seen.extend(job["job_id"] for job in page)
+        if cursor is None:
+            break
+    assert seen == [f"job-{n}" for n in range(5, 0, -1)]
+
+@pytest.mark.parametrize("payload", [
+    {"t": "raw", "v": 5, "id": "job-1"},
+    {"t": "dt", "v": "2025-01-02T00:00:00", "id": "job-1"},
+    {"t": "raw", "v": "2025-01-02T00:00:00", "id": 7},
+])
+def test_paginate_items_rejects_mistyped_cursors(payload):
+    with pytest.raises(ValueError):
+        paginate_items(JOBS, "posted_date", -1, 2, forge(payload), tiebreaker_field="job_id", sort_type=str)
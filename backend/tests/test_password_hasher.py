@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import pytest
+from services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+def fail():
+    raise ValueError("bad hash")
+
+async def settle(hasher: PasswordHasher, timeout: float = 1.0):
+    """Wait until every job has released its slot."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while hasher.in_flight:
+        assert asyncio.get_running_loop().time() < deadline, "jobs never finished"
+        await asyncio.sleep(0.01)
+
+def test_counts_successes_and_failures_separately():
+    hasher = PasswordHasher(max_workers=1)
+
+    async def run():
+        assert await hasher._run(lambda: "ok") == "ok"
+        with pytest.raises(ValueError):
+            await hasher._run(fail)
+        await settle(hasher)
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+    stats = hasher.stats()
+    assert stats["completed"] == 1
+    assert stats["failed"] == 1
+    assert stats["in_flight"] == 0
+
+def test_rejects_jobs_past_max_pending():
+    hasher = PasswordHasher(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def run():
+        jobs = [asyncio.ensure_future(hasher._run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher._run(lambda: "ok")
+        release.set()
+        assert await asyncio.gather(*jobs) == [True, True]
+        await settle(hasher)
+        assert await hasher._run(lambda: "ok") == "ok"
+
+    try:
+        asyncio.run(run())
+    finally:
+        release.set()
+        hasher.shutdown()
+    assert hasher.rejected == 1
+
+def test_cancelled_request_keeps_its_slot_until_the_job_ends():
+    hasher = PasswordHasher(max_workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait()
+        return "hash"
+
+    async def run():
+        request = asyncio.ensure_future(hasher._run(slow_hash))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+        # The bcrypt job is still running, so the slot is still taken
+        assert hasher.in_flight == 1
+        with pytest.raises(PasswordHasherBusy):
+            await hasher._run(lambda: "ok")
+
+        release.set()
+        await settle(hasher)
+        assert await hasher._run(lambda: "ok") == "ok"
+
+    try:
+        asyncio.run(run())
+    finally:
+        release.set()
+        hasher.shutdown()
+
+def test_busy_hasher_maps_to_429(monkeypatch):
+    from starlette.testclient import TestClient
+    from services.user_service import user_service
+    import server
+
+    async def busy(*args):
+        raise PasswordHasherBusy("Too many authentication requests, try again shortly")
+
+    monkeypatch.setattr(user_service, "create_user", busy)
+    monkeypatch.setattr(user_service, "authenticate_user", busy)
+    client = TestClient(server.app)
+    credentials = {"email": "a@example.com", "password": "pw123456"}
+    for path, body in [("/api/auth/register", {**credentials, "full_name": "A"}), ("/api/auth/login", credentials)]:
+        response = client.post(path, json=body)
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
@@ -0,0 +1,33 @@
+from services.people_search import (
+    MAX_PREFIX, build_exact_keys, build_search_keys, match_score, query_keys, search_index_fields
+)
+
+JANE = {"full_name": "José Smith", "email": "j.smith@example.com", "job_title": "Data Engineer", "company": "Acme"}
+
+def test_search_keys_are_normalized_prefixes():
+    keys = build_search_keys(JANE)
+    assert {"jo", "jos", "jose", "sm", "smith", "jsmith", "da", "acme"} <= set(keys)
+    # Single characters are never keys
+    assert "j" not in keys
+
+def test_exact_keys_are_whole_tokens():
+    assert build_exact_keys(JANE) == sorted({"jose", "smith", "example", "com", "jsmith", "data", "engineer", "acme"})
+    assert set(search_index_fields(JANE)) == {"search_keys", "search_exact"}
+
+def test_long_tokens_are_cut_like_query_keys():
+    doc = {"full_name": "Supercalifragilisticexpialidocious"}
+    assert max(map(len, build_search_keys(doc))) == MAX_PREFIX
+    assert query_keys(doc["full_name"]) == build_exact_keys(doc)
+
+def test_query_keys_drop_short_tokens_and_put_longest_first():
+    assert query_keys("a Jo Smith") == ["smith", "jo"]
+    assert query_keys("x") == []
+
+def test_exact_beats_prefix_and_name_beats_company():
+    exact_name = {"full_name": "Ann Lee"}
+    prefix_name = {"full_name": "Annabel Lee"}
+    exact_company = {"full_name": "Bob Stone", "company": "Ann"}
+    assert match_score(exact_name, "ann") > match_score(prefix_name, "ann") > match_score(exact_company, "ann")
+
+def test_full_name_prefix_bonus():
+    assert match_score({"full_name": "Jane Smith"}, "jane sm") > match_score({"full_name": "Smith Jane"}, "jane sm")
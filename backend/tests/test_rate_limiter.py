@@ -0,0 +1,58 @@
+import pytest
+from services.rate_limiter import RateLimitPolicy, RateLimiter, policy_for_path
+
+def test_burst_then_limited():
+    limiter = RateLimiter()
+    policy = RateLimitPolicy("test", limit=60, period_seconds=60, burst=5)
+    results = [limiter.hit("k", policy, now=100.0)[0] for _ in range(6)]
+    assert results == [True] * 5 + [False]
+
+def test_refills_one_request_per_emission_interval():
+    limiter = RateLimiter()
+    policy = RateLimitPolicy("test", limit=60, period_seconds=60, burst=2)
+    limiter.hit("k", policy, now=0.0)
+    limiter.hit("k", policy, now=0.0)
+    assert limiter.hit("k", policy, now=0.5)[0] is False
+    assert limiter.hit("k", policy, now=1.0)[0] is True
+    assert limiter.hit("k", policy, now=1.0)[0] is False
+
+def test_retry_after_is_time_until_next_allowed():
+    limiter = RateLimiter()
+    policy = RateLimitPolicy("test", limit=10, period_seconds=10, burst=1)
+    assert limiter.hit("k", policy, now=0.0) == (True, 0.0)
+    allowed, retry_after = limiter.hit("k", policy, now=0.25)
+    assert allowed is False
+    assert retry_after == pytest.approx(0.75)
+    assert limiter.hit("k", policy, now=0.25 + retry_after)[0] is True
+
+def test_rejected_requests_do_not_extend_the_wait():
+    limiter = RateLimiter()
+    policy = RateLimitPolicy("test", limit=1, period_seconds=1, burst=1)
+    limiter.hit("k", policy, now=0.0)
+    for _ in range(100):
+        limiter.hit("k", policy, now=0.5)
+    assert limiter.hit("k", policy, now=1.0)[0] is True
+
+def test_keys_are_independent_and_lru_evicted():
+    limiter = RateLimiter(max_keys=2)
+    policy = RateLimitPolicy("test", limit=1, period_seconds=60)
+    limiter.hit("a", policy, now=0.0)
+    limiter.hit("b", policy, now=0.0)
+    assert limiter.hit("a", policy, now=0.0)[0] is False
+    # a was used last, so adding c evicts b
+    limiter.hit("c", policy, now=0.0)
+    assert limiter.stats()["evictions"] == 1
+    assert limiter.hit("b", policy, now=0.0)[0] is True
+    assert limiter.stats()["tracked_keys"] == 2
+
+def test_route_policies():
+    assert policy_for_path("/api/auth/login").name == "auth"
+    assert policy_for_path("/api/courses").name == "default"
+
+def test_exact_burst_boundary_is_not_lost_to_rounding():
+    limiter = RateLimiter()
+    policy = RateLimitPolicy("test", limit=1, period_seconds=0.05, burst=1)
+    # Large clock values make now + interval - now inexact
+    assert limiter.hit("k", policy, now=123456.789)[0] is True
+    assert limiter.hit("k", policy, now=123456.789)[0] is False
+    assert limiter.hit("fresh", policy, now=987654.321)[0] is True
@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+from services import security_service as security_module
+from services.security_service import SecurityService
+
+def matches(doc: dict, filter_query: dict) -> bool:
+    return all(
+        doc.get(field) in value["$in"] if isinstance(value, dict) else doc.get(field) == value
+        for field, value in filter_query.items()
+    )
+
+class FakeCollection:
+    """Equality filters with $set/$setOnInsert updates: what role seeding and lookups use."""
+
+    def __init__(self):
+        self.docs = {}
+        self.finds = 0
+
+    def _update(self, filter_query, update, upsert=False, many=False):
+        matched = [doc for doc in self.docs.values() if matches(doc, filter_query)]
+        if not matched and upsert:
+            doc = {**filter_query, **update.get("$setOnInsert", {}), **update.get("$set", {})}
+            self.docs[doc["_id"]] = doc
+            return
+        for doc in matched if many else matched[:1]:
+            doc.update(update.get("$set", {}))
+
+    async def find_one(self, filter_query, projection=None):
+        return next((dict(doc) for doc in self.docs.values() if matches(doc, filter_query)), None)
+
+    async def update_one(self, filter_query, update, upsert=False):
+        self._update(filter_query, update, upsert)
+
+    async def update_many(self, filter_query, update):
+        self._update(filter_query, update, many=True)
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self._update(operation._filter, operation._doc, operation._upsert)
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def delete_many(self, filter_query):
+        for key in [key for key, doc in self.docs.items() if matches(doc, filter_query)]:
+            del self.docs[key]
+
+    async def find(self, filter_query=None, projection=None):
+        self.finds += 1
+        for doc in list(self.docs.values()):
+            if matches(doc, filter_query or {}):
+                yield dict(doc)
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name):
+        return self[name]
+
+@pytest.fixture
+def db(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(security_module, "db_collections", database)
+    return database
+
+def test_reseed_keeps_customized_system_roles(db, monkeypatch):
+    service = SecurityService()
+    asyncio.run(service.initialize_default_roles())
+    assert "mentor_access" in db.roles.docs["mentor"]["permissions"]
+
+    # An admin narrows the mentor role and renames a permission
+    db.roles.docs["mentor"]["permissions"] = ["read_courses"]
+    db.permissions.docs["read_courses"]["name"] = "Browse catalog"
+    del db.roles.docs["learner"]
+
+    monkeypatch.setattr(security_module, "SEED_VERSION", 2)
+    asyncio.run(service.initialize_default_roles())
+
+    assert db.roles.docs["mentor"]["permissions"] == ["read_courses"]
+    assert db.permissions.docs["read_courses"]["name"] == "Browse catalog"
+    # Missing documents are still created
+    assert db.roles.docs["learner"]["permissions"] == ["read_courses", "enroll_course"]
+    assert db.seed_manifest.docs["security_roles"]["version"] == 2
+    assert service.role_permissions["mentor"] == frozenset({"read_courses"})
+
+def test_seed_migrations_run_once_per_version(db, monkeypatch):
+    service = SecurityService()
+    asyncio.run(service.initialize_default_roles())
+
+    monkeypatch.setattr(security_module, "SEED_VERSION", 2)
+    monkeypatch.setattr(security_module, "SEED_MIGRATIONS", {
+        1: [("roles", {"_id": "learner"}, {"$set": {"description": "never applied"}})],
+        2: [("roles", {"_id": "mentor"}, {"$set": {"description": "Mentors and coaches"}})],
+    })
+    asyncio.run(service.initialize_default_roles())
+    assert db.roles.docs["mentor"]["description"] == "Mentors and coaches"
+    assert db.roles.docs["learner"]["description"] == "Standard learner role"
+
+    # Already at version 2: the migration does not run again
+    db.roles.docs["mentor"]["description"] = "Edited later"
+    asyncio.run(service.initialize_default_roles())
+    assert db.roles.docs["mentor"]["description"] == "Edited later"
+
+def seeded_service(db) -> SecurityService:
+    service = SecurityService()
+    asyncio.run(service.initialize_default_roles())
+    return service
+
+def test_dangling_role_is_looked_up_once_and_keeps_the_cache(db):
+    service = seeded_service(db)
+    asyncio.run(db.user_roles.insert_one({"_id": "alice_mentor", "user_id": "alice", "role_id": "mentor"}))
+    for user_id in ("bob", "carol"):
+        asyncio.run(db.user_roles.insert_one({"_id": f"{user_id}_ghost", "user_id": user_id, "role_id": "ghost"}))
+
+    assert asyncio.run(service.has_permission("alice", "mentor_access"))
+    role_finds = db.roles.finds
+    assert not asyncio.run(service.has_permission("bob", "read_courses"))
+    assert not asyncio.run(service.has_permission("carol", "read_courses"))
+
+    # One lookup for the unknown role, and no reload wiping other users' entries
+    assert db.roles.finds == role_finds + 1
+    assert service.permission_cache.get("alice") == frozenset(db.roles.docs["mentor"]["permissions"])
+
+def test_role_created_after_the_table_loaded_is_picked_up(db):
+    service = seeded_service(db)
+    asyncio.run(db.roles.insert_one({"_id": "reviewer", "permissions": ["view_analytics"]}))
+    asyncio.run(db.user_roles.insert_one({"_id": "dana_reviewer", "user_id": "dana", "role_id": "reviewer"}))
+    assert asyncio.run(service.has_permission("dana", "view_analytics"))
+
+def test_assigning_an_unknown_role_is_rejected(db):
+    service = seeded_service(db)
+    with pytest.raises(ValueError):
+        asyncio.run(service.assign_role_to_user("erin", "ghost", "admin-1"))
+    assert db.user_roles.docs == {}
+
+    asyncio.run(service.assign_role_to_user("erin", "instructor", "admin-1"))
+    assert asyncio.run(service.has_permission("erin", "create_course"))
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import pytest
+import websocket_manager
+from fake_redis import FakeRedis
+from services.contact_graph import ContactGraph
+from websocket_broker import InProcessBroker, MessageBroker, RedisBroker
+from websocket_manager import ConnectionManager
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code=None):
+        pass
+
+async def wait_until(predicate, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out waiting for delivery"
+        await asyncio.sleep(0.01)
+
+@pytest.fixture
+def presence(monkeypatch):
+    """Shared presence records, standing in for the user_presence collection."""
+    online = set()
+
+    async def update_user_presence(user_id, is_online, status="online"):
+        (online.add if is_online else online.discard)(user_id)
+
+    async def filter_online(user_ids):
+        return set(user_ids) & online
+
+    async def ensure_contacts_loaded(user_id):
+        pass
+
+    chat_service = websocket_manager.chat_service
+    monkeypatch.setattr(chat_service, "update_user_presence", update_user_presence)
+    monkeypatch.setattr(chat_service, "filter_online", filter_online)
+    monkeypatch.setattr(chat_service, "ensure_contacts_loaded", ensure_contacts_loaded)
+    monkeypatch.setattr(websocket_manager, "contact_graph", ContactGraph())
+    return online
+
+async def start_workers(count: int):
+    server = FakeRedis()
+    managers = []
+    for _ in range(count):
+        manager = ConnectionManager()
+        manager.broker = RedisBroker(server)
+        await manager.start()
+        managers.append(manager)
+    return managers
+
+def test_message_broker_is_abstract():
+    with pytest.raises(TypeError):
+        MessageBroker()
+
+def test_two_managers_deliver_to_each_other(presence):
+    async def run():
+        worker_a, worker_b = await start_workers(2)
+        try:
+            socket_b = FakeWebSocket()
+            await worker_a.connect(FakeWebSocket(), "alice")
+            connection_b = await worker_b.connect(socket_b, "bob")
+            await worker_b.subscribe_to_chat(connection_b, "room")
+
+            await worker_a.broadcast_to_chat({"type": "new_message", "text": "hi"}, "room")
+            await worker_a.send_personal_message({"type": "ping"}, "bob")
+            await wait_until(lambda: len(socket_b.sent) == 2)
+            assert [message["type"] for message in socket_b.sent] == ["new_message", "ping"]
+
+            # The sender's own exclusion is honoured on the other worker
+            await worker_a.broadcast_to_chat({"type": "typing"}, "room", exclude_user="bob")
+            await asyncio.sleep(0.05)
+            assert len(socket_b.sent) == 2
+        finally:
+            await worker_a.shutdown()
+            await worker_b.shutdown()
+
+    asyncio.run(run())
+
+def test_presence_only_reaches_online_contacts(presence):
+    async def run():
+        worker_a, worker_b = await start_workers(2)
+        websocket_manager.contact_graph.add_room("room", ["alice", "bob", "carol"])
+        try:
+            socket_b = FakeWebSocket()
+            await worker_b.connect(socket_b, "bob")
+            published_before = worker_a.broker.published
+
+            await worker_a.connect(FakeWebSocket(), "alice")
+            # bob is online on the other worker; carol is offline and skipped
+            assert worker_a.broker.published - published_before == 1
+            await wait_until(lambda: socket_b.sent)
+            assert socket_b.sent[0]["type"] == "user_status"
+            assert socket_b.sent[0]["user_id"] == "alice"
+        finally:
+            await worker_a.shutdown()
+            await worker_b.shutdown()
+
+    asyncio.run(run())
+
+def test_single_process_presence_skips_the_database(presence, monkeypatch):
+    async def filter_online(user_ids):
+        raise AssertionError("presence records queried with an in-process broker")
+
+    monkeypatch.setattr(websocket_manager.chat_service, "filter_online", filter_online)
+
+    async def run():
+        manager = ConnectionManager()
+        manager.broker = InProcessBroker()
+        await manager.start()
+        websocket_manager.contact_graph.add_room("room", ["alice", "bob", "carol"])
+        try:
+            socket_b = FakeWebSocket()
+            await manager.connect(socket_b, "bob")
+            await manager.connect(FakeWebSocket(), "alice")
+            assert [message["user_id"] for message in socket_b.sent if message["type"] == "user_status"] == ["alice"]
+        finally:
+            await manager.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,161 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+# Called with (channel, data) for every message on a subscribed channel
+MessageHandler = Callable[[str, str], Awaitable[None]]
+
+class MessageBroker(ABC):
+    """Fan-out transport between ConnectionManager instances.
+
+    Channels carry already-serialized payloads. Each process subscribes to
+    the channels of the users and chats it holds connections for and
+    delivers what it receives to its local sockets.
+    """
+
+    # Whether other processes hold connections behind this broker too; if
+    # not, the local connection table is the whole picture
+    shared = False
+
+    def __init__(self):
+        self.handler: Optional[MessageHandler] = None
+        self.channels: Set[str] = set()
+        self.published = 0
+        self.received = 0
+
+    async def start(self, handler: MessageHandler):
+        """Start delivering messages to handler."""
+        self.handler = handler
+
+    @abstractmethod
+    async def publish(self, channel: str, data: str):
+        """Send data to every subscriber of channel, on any process."""
+
+    @abstractmethod
+    async def subscribe(self, channel: str):
+        """Start receiving messages published on channel."""
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str):
+        """Stop receiving messages published on channel."""
+
+    async def close(self):
+        """Stop delivering messages."""
+        self.handler = None
+
+    def stats(self) -> Dict[str, object]:
+        """Get broker counters."""
+        return {
+            "backend": type(self).__name__,
+            "channels": len(self.channels),
+            "published": self.published,
+            "received": self.received
+        }
+
+class InProcessBroker(MessageBroker):
+    """Single-process broker: publishing hands the message straight to the handler."""
+
+    async def publish(self, channel: str, data: str):
+        self.published += 1
+        if channel in self.channels and self.handler is not None:
+            self.received += 1
+            await self.handler(channel, data)
+
+    async def subscribe(self, channel: str):
+        self.channels.add(channel)
+
+    async def unsubscribe(self, channel: str):
+        self.channels.discard(channel)
+
+class RedisBroker(MessageBroker):
+    """Broker over Redis pub/sub, so every worker and node sees every message.
+
+    Works with any client exposing the redis.asyncio interface (publish and
+    pubsub()), which lets tests run against a local stand-in.
+    """
+
+    shared = True
+
+    def __init__(self, client, channel_prefix: str = "prolawh:ws:"):
+        super().__init__()
+        self.client = client
+        self.channel_prefix = channel_prefix
+        self.pubsub = None
+        self.reader_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBroker":
+        """Create a broker connected to a Redis server."""
+        import redis.asyncio as redis
+        return cls(redis.from_url(url, decode_responses=True))
+
+    async def start(self, handler: MessageHandler):
+        await super().start(handler)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        # listen() needs at least one subscription before it yields anything
+        await self.pubsub.subscribe(f"{self.channel_prefix}__control__")
+        self.reader_task = asyncio.create_task(self._reader())
+
+    async def _reader(self):
+        prefix_length = len(self.channel_prefix)
+        while True:
+            try:
+                async for message in self.pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    channel = message["channel"]
+                    data = message["data"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    if isinstance(data, bytes):
+                        data = data.decode()
+
+                    channel = channel[prefix_length:]
+                    if channel in self.channels and self.handler is not None:
+                        self.received += 1
+                        try:
+                            await self.handler(channel, data)
+                        except Exception as e:
+                            print(f"Broker handler error on {channel}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Broker connection error: {e}")
+                await asyncio.sleep(1)
+
+    async def publish(self, channel: str, data: str):
+        self.published += 1
+        await self.client.publish(f"{self.channel_prefix}{channel}", data)
+
+    async def subscribe(self, channel: str):
+        if channel in self.channels:
+            return
+        self.channels.add(channel)
+        await self.pubsub.subscribe(f"{self.channel_prefix}{channel}")
+
+    async def unsubscribe(self, channel: str):
+        if channel not in self.channels:
+            return
+        self.channels.discard(channel)
+        await self.pubsub.unsubscribe(f"{self.channel_prefix}{channel}")
+
+    async def close(self):
+        await super().close()
+        if self.reader_task:
+            self.reader_task.cancel()
+            try:
+                await self.reader_task
+            except asyncio.CancelledError:
+                pass
+            self.reader_task = None
+        if self.pubsub is not None:
+            await self.pubsub.close()
+            self.pubsub = None
+
+def create_broker() -> MessageBroker:
+    """Create the broker configured by WS_BROKER_URL (in-process when unset)."""
+    url = os.environ.get("WS_BROKER_URL")
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisBroker.from_url(url)
+    return InProcessBroker()
@@ -1,33 +1,144 @@
+import asyncio
 import json
+import os
 import uuid
 from typing import Dict, Set, List, Optional
 from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
 from models.chat import TypingIndicator, MessageCreate, MessageType
 from services.chat_service import chat_service
+from services.contact_graph import contact_graph
+from websocket_broker import MessageBroker, create_broker
+
+# Broker channels
+USER_CHANNEL = "user:"
+CHAT_CHANNEL = "chat:"
+ROOMS_CHANNEL = "rooms"
+
+class ClientConnection:
+    """A WebSocket with its own bounded outbound queue and writer task.
+
+    Broadcasts only enqueue pre-serialized payloads, so a slow client fills
+    its own queue instead of delaying everyone else in the room.
+    """
+
+    def __init__(self, websocket: WebSocket, connection_id: str, user_id: str, max_queue_size: int):
+        self.websocket = websocket
+        self.connection_id = connection_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.writer_task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.dropped = 0
+        # Chats this connection has joined
+        self.subscriptions: Set[str] = set()
+
+    def start(self):
+        """Start draining the outbound queue."""
+        self.writer_task = asyncio.create_task(self._writer())
+
+    async def _writer(self):
+        try:
+            while True:
+                payload = await self.queue.get()
+                await self.websocket.send_text(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Socket is gone; the receive loop will run disconnect
+            self.closed = True
+
+    def enqueue(self, payload: str) -> bool:
+        """Queue a serialized message; returns False if it was dropped."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def close(self, code: Optional[int] = None):
+        """Stop the writer and optionally close the socket."""
+        self.closed = True
+        if self.writer_task and not self.writer_task.done():
+            self.writer_task.cancel()
+        if code is not None:
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass
 
 class ConnectionManager:
     def __init__(self):
-        # Active WebSocket connections: {user_id: {connection_id: WebSocket}}
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
-        # User to connection mapping: {connection_id: user_id}
-        self.connection_to_user: Dict[str, str] = {}
-        # Chat room subscriptions: {chat_id: {user_id}}
+        # Active WebSocket connections: {user_id: {connection_id: ClientConnection}}
+        self.active_connections: Dict[str, Dict[str, ClientConnection]] = {}
+        # All connections by ID: {connection_id: ClientConnection}
+        self.connections: Dict[str, ClientConnection] = {}
+        # Chat room subscriptions: {chat_id: {connection_id}}
         self.chat_subscriptions: Dict[str, Set[str]] = {}
         # Typing indicators: {chat_id: {user_id: timestamp}}
         self.typing_indicators: Dict[str, Dict[str, datetime]] = {}
+        # Outbound queue bound per connection and what to do when it overflows
+        self.send_queue_size = int(os.environ.get("WS_SEND_QUEUE_SIZE", "256"))
+        self.slow_consumer_policy = os.environ.get("WS_SLOW_CONSUMER_POLICY", "disconnect")
+        self.messages_dropped = 0
+        self.slow_consumers_disconnected = 0
+        self._background_tasks: Set[asyncio.Task] = set()
+        # Cross-process fan-out for chat, presence and typing events
+        self.broker: MessageBroker = create_broker()
+
+    async def start(self):
+        """Start receiving fan-out messages from the broker."""
+        await self.broker.start(self._on_broker_message)
+        await self.broker.subscribe(ROOMS_CHANNEL)
+
+    async def shutdown(self):
+        """Stop the broker and close every local connection."""
+        await self.broker.close()
+        for connection in list(self.connections.values()):
+            await connection.close(code=1001)
+
+    async def _on_broker_message(self, channel: str, data: str):
+        """Deliver a broker message to the matching local connections."""
+        if channel == ROOMS_CHANNEL:
+            event = json.loads(data)
+            contact_graph.sync_room(event["chat_id"], event["participants"])
+            return
+        
+        # Frame is "<excluded user id>\n<payload>"
+        exclude_user, _, payload = data.partition("\n")
+        if channel.startswith(CHAT_CHANNEL):
+            chat_id = channel[len(CHAT_CHANNEL):]
+            for connection_id in list(self.chat_subscriptions.get(chat_id, ())):
+                connection = self.connections.get(connection_id)
+                if connection is not None and connection.user_id != exclude_user:
+                    self._enqueue(connection, payload)
+        elif channel.startswith(USER_CHANNEL):
+            self._deliver(payload, channel[len(USER_CHANNEL):])
+
+    async def publish_room_membership(self, chat_id: str, participants: List[str]):
+        """Share a room's participants after a change with the contact graphs of every process."""
+        await self.broker.publish(ROOMS_CHANNEL, json.dumps({
+            "chat_id": chat_id,
+            "participants": participants
+        }))
 
     async def connect(self, websocket: WebSocket, user_id: str) -> str:
         """Accept a WebSocket connection and register user."""
         await websocket.accept()
         
         connection_id = str(uuid.uuid4())
+        connection = ClientConnection(websocket, connection_id, user_id, self.send_queue_size)
+        connection.start()
         
         if user_id not in self.active_connections:
             self.active_connections[user_id] = {}
+            await self.broker.subscribe(f"{USER_CHANNEL}{user_id}")
         
-        self.active_connections[user_id][connection_id] = websocket
-        self.connection_to_user[connection_id] = user_id
+        self.active_connections[user_id][connection_id] = connection
+        self.connections[connection_id] = connection
         
         # Update user presence
         await chat_service.update_user_presence(user_id, is_online=True)
@@ -39,74 +150,131 @@ class ConnectionManager:
 
     async def disconnect(self, connection_id: str):
         """Disconnect and unregister user."""
-        if connection_id in self.connection_to_user:
-            user_id = self.connection_to_user[connection_id]
-            
-            # Remove connection
-            if user_id in self.active_connections:
-                self.active_connections[user_id].pop(connection_id, None)
-                if not self.active_connections[user_id]:
-                    del self.active_connections[user_id]
-                    
-                    # Update user presence to offline
-                    await chat_service.update_user_presence(user_id, is_online=False, status="offline")
-                    
-                    # Notify about user going offline
-                    await self.broadcast_user_status(user_id, "offline")
-            
-            del self.connection_to_user[connection_id]
-            
-            # Remove from chat subscriptions
-            for chat_id in list(self.chat_subscriptions.keys()):
-                self.chat_subscriptions[chat_id].discard(user_id)
-                if not self.chat_subscriptions[chat_id]:
-                    del self.chat_subscriptions[chat_id]
-
-    async def subscribe_to_chat(self, user_id: str, chat_id: str):
-        """Subscribe user to a chat room."""
+        connection = self.connections.pop(connection_id, None)
+        if connection is None:
+            return
+        
+        await connection.close()
+        user_id = connection.user_id
+        
+        # Remove this connection's chat subscriptions only
+        for chat_id in list(connection.subscriptions):
+            await self.unsubscribe_from_chat(connection_id, chat_id)
+        connection.subscriptions.clear()
+        
+        # Remove connection
+        if user_id in self.active_connections:
+            self.active_connections[user_id].pop(connection_id, None)
+            if not self.active_connections[user_id]:
+                del self.active_connections[user_id]
+                await self.broker.unsubscribe(f"{USER_CHANNEL}{user_id}")
+                
+                # Update user presence to offline
+                await chat_service.update_user_presence(user_id, is_online=False, status="offline")
+                
+                # Notify about user going offline
+                await self.broadcast_user_status(user_id, "offline")
+                contact_graph.evict_user(user_id)
+
+    async def subscribe_to_chat(self, connection_id: str, chat_id: str):
+        """Subscribe a connection to a chat room."""
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return
+        
         if chat_id not in self.chat_subscriptions:
             self.chat_subscriptions[chat_id] = set()
+            await self.broker.subscribe(f"{CHAT_CHANNEL}{chat_id}")
         
-        self.chat_subscriptions[chat_id].add(user_id)
+        self.chat_subscriptions[chat_id].add(connection_id)
+        connection.subscriptions.add(chat_id)
 
-    async def unsubscribe_from_chat(self, user_id: str, chat_id: str):
-        """Unsubscribe user from a chat room."""
+    async def unsubscribe_from_chat(self, connection_id: str, chat_id: str):
+        """Unsubscribe a connection from a chat room."""
+        connection = self.connections.get(connection_id)
+        if connection is not None:
+            connection.subscriptions.discard(chat_id)
+        
         if chat_id in self.chat_subscriptions:
-            self.chat_subscriptions[chat_id].discard(user_id)
+            self.chat_subscriptions[chat_id].discard(connection_id)
+            if not self.chat_subscriptions[chat_id]:
+                del self.chat_subscriptions[chat_id]
+                await self.broker.unsubscribe(f"{CHAT_CHANNEL}{chat_id}")
+
+    def _enqueue(self, connection: ClientConnection, payload: str):
+        """Queue a payload on one connection, applying the slow consumer policy."""
+        if connection.closed or connection.enqueue(payload):
+            return
+        
+        self.messages_dropped += 1
+        if self.slow_consumer_policy == "disconnect":
+            connection.closed = True
+            self.slow_consumers_disconnected += 1
+            # 1013: try again later; the receive loop then runs disconnect
+            task = asyncio.create_task(connection.close(code=1013))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    def _deliver(self, payload: str, user_id: str):
+        """Queue a serialized payload on every connection of a user."""
+        for connection in list(self.active_connections.get(user_id, {}).values()):
+            self._enqueue(connection, payload)
 
     async def send_personal_message(self, message: dict, user_id: str):
-        """Send message to a specific user (all their connections)."""
-        if user_id in self.active_connections:
-            for websocket in self.active_connections[user_id].values():
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except:
-                    pass
+        """Send message to a specific user (all their connections, on any process)."""
+        await self.broker.publish(f"{USER_CHANNEL}{user_id}", "\n" + json.dumps(message))
+
+    async def send_to_connection(self, message: dict, connection_id: str):
+        """Send message to a single connection."""
+        connection = self.connections.get(connection_id)
+        if connection:
+            self._enqueue(connection, json.dumps(message))
 
     async def broadcast_to_chat(self, message: dict, chat_id: str, exclude_user: Optional[str] = None):
         """Broadcast message to all users in a chat room."""
-        if chat_id in self.chat_subscriptions:
-            for user_id in self.chat_subscriptions[chat_id]:
-                if exclude_user and user_id == exclude_user:
-                    continue
-                await self.send_personal_message(message, user_id)
+        # Serialized once; every process holding subscribers fans it out locally
+        await self.broker.publish(f"{CHAT_CHANNEL}{chat_id}", f"{exclude_user or ''}\n{json.dumps(message)}")
+
+    def stats(self) -> Dict[str, object]:
+        """Get outbound queue metrics."""
+        depths = [connection.queue.qsize() for connection in self.connections.values()]
+        return {
+            "connections": len(self.connections),
+            "users": len(self.active_connections),
+            "subscribed_chats": len(self.chat_subscriptions),
+            "queue_size_limit": self.send_queue_size,
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "messages_dropped": self.messages_dropped,
+            "slow_consumers_disconnected": self.slow_consumers_disconnected,
+            "broker": self.broker.stats()
+        }
 
     async def broadcast_user_status(self, user_id: str, status: str):
         """Broadcast user online/offline status to relevant users."""
-        # Get all chats the user is part of
-        user_chats = await chat_service.get_user_chats(user_id)
-        
-        notified_users = set()
-        for chat in user_chats:
-            for participant_id in chat.participants:
-                if participant_id != user_id and participant_id not in notified_users:
-                    await self.send_personal_message({
-                        "type": "user_status",
-                        "user_id": user_id,
-                        "status": status,
-                        "timestamp": datetime.now().isoformat()
-                    }, participant_id)
-                    notified_users.add(participant_id)
+        # Co-participants come from the in-memory contact graph
+        await chat_service.ensure_contacts_loaded(user_id)
+        contacts = contact_graph.get_contacts(user_id)
+        
+        # Only online contacts are told: those connected here, plus, when the
+        # broker is shared, those the presence records show online elsewhere
+        online_contacts = {contact_id for contact_id in contacts if contact_id in self.active_connections}
+        elsewhere = contacts - online_contacts
+        if elsewhere and self.broker.shared:
+            online_contacts |= await chat_service.filter_online(elsewhere)
+        if not online_contacts:
+            return
+        
+        data = "\n" + json.dumps({
+            "type": "user_status",
+            "user_id": user_id,
+            "status": status,
+            "timestamp": datetime.now().isoformat()
+        })
+        await asyncio.gather(*[
+            self.broker.publish(f"{USER_CHANNEL}{contact_id}", data)
+            for contact_id in online_contacts
+        ])
 
     async def handle_typing_indicator(self, user_id: str, user_name: str, chat_id: str, is_typing: bool):
         """Handle typing indicators."""
@@ -128,27 +296,27 @@ class ConnectionManager:
             "timestamp": datetime.now().isoformat()
         }, chat_id, exclude_user=user_id)
 
-    async def handle_message(self, websocket: WebSocket, user_id: str, user_name: str, data: dict):
+    async def handle_message(self, connection_id: str, user_id: str, user_name: str, data: dict):
         """Handle incoming WebSocket messages."""
         message_type = data.get("type")
         
         if message_type == "join_chat":
             chat_id = data.get("chat_id")
-            await self.subscribe_to_chat(user_id, chat_id)
-            await websocket.send_text(json.dumps({
+            await self.subscribe_to_chat(connection_id, chat_id)
+            await self.send_to_connection({
                 "type": "joined_chat",
                 "chat_id": chat_id,
                 "status": "success"
-            }))
+            }, connection_id)
         
         elif message_type == "leave_chat":
             chat_id = data.get("chat_id")
-            await self.unsubscribe_from_chat(user_id, chat_id)
-            await websocket.send_text(json.dumps({
+            await self.unsubscribe_from_chat(connection_id, chat_id)
+            await self.send_to_connection({
                 "type": "left_chat",
                 "chat_id": chat_id,
                 "status": "success"
-            }))
+            }, connection_id)
         
         elif message_type == "send_message":
             message_data = MessageCreate(